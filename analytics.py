@@ -0,0 +1,239 @@
+"""
+Spend analytics over the invoice records in the archive
+Invoices are kept as NumPy columns in analytics_cache.npz: one row per unique
+(account, invoice), however many purchase snapshots it appears in. update()
+only parses PDFs whose content hasn't been seen before, and the aggregations
+(per month/quarter, per product/account, currency-normalized) are bincounts
+over those columns, so years of invoices take milliseconds.
+
+Usage: python analytics.py [--period month|quarter] [--by product|account] [--base USD]
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+import invoice_parser
+from incremental import record_key
+from pdf_index import PdfIndex
+
+ROOT = Path(__file__).parent
+ANALYTICS_FILE = ROOT / "analytics_cache.npz"
+# Optional {"EUR": 1.08, ...} overrides: value of one unit in USD
+RATES_FILE = ROOT / "fx_rates.json"
+
+MONTH = "month"
+QUARTER = "quarter"
+BASE_CURRENCY = "USD"
+OTHER_PRODUCT = "Other"
+
+# Approximate USD value of one unit - edit fx_rates.json for your books
+DEFAULT_RATES = {
+    "USD": 1.0, "EUR": 1.08, "GBP": 1.27, "CHF": 1.13, "CAD": 0.73, "AUD": 0.66,
+    "INR": 0.012, "JPY": 0.0067, "SEK": 0.095, "NOK": 0.093, "DKK": 0.145, "PLN": 0.25,
+}
+
+class UnknownCurrencyError(ValueError):
+    pass
+
+
+COLUMNS = ("account", "key", "date", "product", "currency", "amount", "tax")
+
+
+def load_rates(path=RATES_FILE):
+    rates = dict(DEFAULT_RATES)
+    try:
+        rates.update({k.upper(): float(v) for k, v in json.loads(Path(path).read_text()).items()})
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, AttributeError) as e:
+        print(f"[ANALYTICS] Ignoring {path}: {e}")
+    return rates
+
+
+def _empty_columns():
+    return {
+        "account": np.array([], dtype=str), "key": np.array([], dtype=str),
+        "date": np.array([], dtype="datetime64[D]"), "product": np.array([], dtype=str),
+        "currency": np.array([], dtype=str), "amount": np.array([], dtype=np.float64),
+        "tax": np.array([], dtype=np.float64),
+    }
+
+
+class SpendTable:
+    """Invoice columns + the PDF contents (sha256) already folded in"""
+
+    def __init__(self, columns=None, seen=()):
+        self.columns = columns or _empty_columns()
+        self.seen = set(seen)
+
+    def __len__(self):
+        return len(self.columns["amount"])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    @classmethod
+    def load(cls, path=ANALYTICS_FILE):
+        """Cached table (empty if missing or written by another parser version)"""
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if int(data["version"]) != invoice_parser.PARSER_VERSION:
+                    return cls()
+                return cls({c: data[c] for c in COLUMNS}, data["seen"].tolist())
+        except (OSError, KeyError, ValueError):
+            return cls()
+
+    def save(self, path=ANALYTICS_FILE):
+        path = Path(path)
+        tmp = path.with_name(f".{path.name}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, version=invoice_parser.PARSER_VERSION,
+                     seen=np.array(sorted(self.seen), dtype=str), **self.columns)
+        os.replace(tmp, path)
+
+    def append(self, records):
+        """Add records ({"account", ...parser fields}) not in the table yet. Returns how many."""
+        known = set(zip(self.columns["account"].tolist(), self.columns["key"].tolist()))
+        new = {}
+        for r in records:
+            if not r.get("date") or r.get("amount") is None:
+                continue
+            ident = (r["account"], record_key(r))
+            if ident not in known and ident not in new:
+                new[ident] = r
+        if not new:
+            return 0
+        rows = list(new.items())
+        added = {
+            "account": np.array([a for (a, _), _ in rows], dtype=str),
+            "key": np.array([k for (_, k), _ in rows], dtype=str),
+            "date": np.array([r["date"] for _, r in rows], dtype="datetime64[D]"),
+            "product": np.array([r.get("product") or OTHER_PRODUCT for _, r in rows], dtype=str),
+            "currency": np.array([(r.get("currency") or BASE_CURRENCY).upper() for _, r in rows], dtype=str),
+            "amount": np.array([r["amount"] for _, r in rows], dtype=np.float64),
+            "tax": np.array([np.nan if r.get("tax") is None else r["tax"] for _, r in rows], dtype=np.float64),
+        }
+        self.columns = {c: np.concatenate([self.columns[c], added[c]]) for c in COLUMNS}
+        return len(rows)
+
+
+def update(index=None, path=ANALYTICS_FILE, cache=None):
+    """Fold PDFs with unseen content into the cached table. Returns (table, invoices added)."""
+    index = index or PdfIndex()
+    cache = cache or invoice_parser.InvoiceCache()
+    table = SpendTable.load(path)
+    index.refresh()
+    rows = [r for r in index.rows() if r["sha256"] not in table.seen]
+    if not rows:
+        return table, 0
+    by_account = {}
+    for r in rows:
+        by_account.setdefault(r["account"], []).append(Path(r["path"]))
+    added = 0
+    for account, pdfs in by_account.items():
+        records = invoice_parser.parse_pdfs(pdfs, cache=cache, index=index)
+        added += table.append([dict(r, account=account) for r in records])
+    # Failures are cached too, so they aren't re-parsed until the parser changes
+    table.seen |= set(cache.get_many({r["sha256"] for r in rows}))
+    table.save(path)
+    return table, added
+
+
+def to_base(table, base=BASE_CURRENCY, rates=None):
+    """Amounts converted to base (NaN where the currency has no rate).
+    Raises UnknownCurrencyError if base itself has no rate."""
+    rates = rates or load_rates()
+    if base not in rates:
+        raise UnknownCurrencyError(f"No exchange rate for {base} (known: {', '.join(sorted(rates))};"
+                                   f" add it to {RATES_FILE.name})")
+    codes, inverse = np.unique(table["currency"], return_inverse=True)
+    factors = np.array([rates.get(c, np.nan) / rates[base] for c in codes.tolist()], dtype=np.float64)
+    return table["amount"] * factors[inverse] if len(codes) else table["amount"].copy()
+
+
+def period_codes(dates, period=MONTH):
+    """Months (or quarters) since 1970 for each date"""
+    months = dates.astype("datetime64[M]").astype(np.int64)
+    return months // 3 if period == QUARTER else months
+
+
+def period_label(code, period=MONTH):
+    if period == QUARTER:
+        return f"{1970 + code // 4}-Q{code % 4 + 1}"
+    return f"{1970 + code // 12}-{code % 12 + 1:02d}"
+
+
+def aggregate(table, period=MONTH, by="product", base=BASE_CURRENCY, rates=None, account=None):
+    """Spend per period x group in base currency.
+    Returns {"periods", "groups", "totals" (periods x groups), "counts", "unconverted"}."""
+    rates = rates or load_rates()
+    amounts = to_base(table, base, rates)
+    mask = np.ones(len(table), dtype=bool) if account is None else table["account"] == account
+    pcodes = period_codes(table["date"][mask], period)
+    periods, p_inv = np.unique(pcodes, return_inverse=True)
+    groups, g_inv = np.unique(table[by][mask], return_inverse=True)
+    amounts = amounts[mask]
+    cells = p_inv * len(groups) + g_inv
+    valid = ~np.isnan(amounts)
+    size = len(periods) * len(groups)
+    totals = np.bincount(cells[valid], weights=amounts[valid], minlength=size).reshape(len(periods), len(groups))
+    counts = np.bincount(cells, minlength=size).reshape(len(periods), len(groups))
+    return {
+        "periods": [period_label(int(c), period) for c in periods],
+        "groups": groups.tolist(),
+        "totals": totals,
+        "counts": counts,
+        "unconverted": sorted(set(table["currency"][mask][~valid].tolist())),
+    }
+
+
+def summary(table, period=MONTH, base=BASE_CURRENCY, rates=None, account=None):
+    """Grand total, per-currency totals and the last two periods (for a trend)"""
+    agg = aggregate(table, period, "account", base, rates, account)
+    per_period = agg["totals"].sum(axis=1)
+    mask = np.ones(len(table), dtype=bool) if account is None else table["account"] == account
+    codes, inverse = np.unique(table["currency"][mask], return_inverse=True)
+    native = np.bincount(inverse, weights=table["amount"][mask], minlength=len(codes))
+    return {
+        "total": float(per_period.sum()),
+        "invoices": int(mask.sum()),
+        "by_currency": dict(zip(codes.tolist(), native.round(2).tolist())),
+        "last_period": agg["periods"][-1] if agg["periods"] else None,
+        "last": float(per_period[-1]) if len(per_period) else 0.0,
+        "previous": float(per_period[-2]) if len(per_period) > 1 else None,
+        "unconverted": agg["unconverted"],
+    }
+
+
+def to_rows(agg):
+    """Long format [{"period", "group", "total", "invoices"}] for tables/charts"""
+    return [
+        {"period": p, "group": g, "total": round(float(agg["totals"][i, j]), 2), "invoices": int(agg["counts"][i, j])}
+        for i, p in enumerate(agg["periods"])
+        for j, g in enumerate(agg["groups"])
+        if agg["counts"][i, j]
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Spend per period from the invoice archive")
+    parser.add_argument("--period", choices=[MONTH, QUARTER], default=MONTH)
+    parser.add_argument("--by", choices=["product", "account"], default="product")
+    parser.add_argument("--base", default=BASE_CURRENCY, help="Currency to normalize to")
+    parser.add_argument("--account", help="Only this account")
+    args = parser.parse_args()
+    base, rates = args.base.upper(), load_rates()
+    if base not in rates:
+        parser.error(f"unknown --base {base} (known: {', '.join(sorted(rates))}; add it to {RATES_FILE.name})")
+    try:
+        table, added = update()
+    except invoice_parser.NoExtractorError as e:
+        sys.exit(str(e))
+    print(f"{len(table)} invoices ({added} new)")
+    for row in to_rows(aggregate(table, args.period, args.by, base, rates, account=args.account)):
+        print(f"{row['period']}  {row['group']:<30} {row['total']:>12,.2f} {base}  ({row['invoices']})")
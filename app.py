@@ -4,78 +4,280 @@ Simple app to extract LinkedIn purchase history as PDF
 """
 
 import streamlit as st
-import json
 import time
+import base64
 from pathlib import Path
 import subprocess
-import sys
-import base64
-from datetime import datetime
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.application import MIMEApplication
+
+import analytics
+import consolidate
+import html_renderer
+import incremental
+import invoice_parser
+import mailer
+import retention
+import s3_sync
+import run_log
+from file_cache import MtimeCache
+from mailer import SENDER_EMAIL
+from outbox import SENT, FAILED
+from pdf_index import PdfIndex
+from pdf_server import PdfServer
+from thumbnails import ThumbnailCache
+from scheduler import DEFAULT_ACCOUNT, JobScheduler, account_slug
+from state_store import MAIN_RUN, StateStore
+from status_channel import SIGNAL, SIGNAL_SOCKET, StatusListener, make_event, send_event, signal_socket_path
 
 # Config
 ROOT = Path(__file__).parent
-STATUS_FILE = ROOT / "status.json"
 SIGNAL_FILE = ROOT / "continue_signal.txt"
 PDF_DIR = ROOT / "pdfs"
+# Pre-state-store files, migrated on first start
+STATUS_FILE = ROOT / "status.json"
 SETTINGS_FILE = ROOT / "user_settings.json"
 
-# Email config (TUG sender)
-SMTP_SERVER = "smtp.mail.me.com"
-SMTP_PORT = 587
-SENDER_EMAIL = "raffael.kultyshev@icloud.com"
-SENDER_PASSWORD = "anoq-rotn-bkrg-vqvk"
+# Max seconds to trust the last status snapshot without a status event
+STATUS_EVENT_TIMEOUT = 30
+# Polling interval when the event channel isn't available
+STATUS_POLL_INTERVAL = 2
+# How often the status panel (only) re-runs while a job is active
+STATUS_REFRESH_INTERVAL = 1
+# PDFs (and thumbnails) listed per page of "All PDFs"
+PDF_LIST_PAGE_SIZE = 20
+# Default archive quota (the max age defaults to unlimited)
+RETENTION_QUOTA_MB = retention.RETENTION_QUOTA // (1024 * 1024)
+# How many recent jobs to show in the status panel
+RECENT_JOBS = 5
+# How the purchases page becomes a PDF (see html_renderer)
+RENDERER_LABELS = {
+    html_renderer.PRINT: "Chrome print dialog (AppleScript)",
+    html_renderer.AUTO: "Direct render (best available)",
+    html_renderer.CHROME: "Direct render: headless Chrome",
+    html_renderer.WEASYPRINT: "Direct render: WeasyPrint",
+}
+
+# Streamlit >= 1.37 has st.fragment; older versions fall back to full reruns
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+
+@st.cache_resource
+def get_file_cache():
+    """mtime-keyed cache shared by all sessions - a rerun costs a stat(), not a read"""
+    return MtimeCache()
+
+@st.cache_resource
+def get_state_store():
+    """Run state + settings (imports the old JSON files once)"""
+    store = StateStore()
+    store.migrate_json(STATUS_FILE, SETTINGS_FILE)
+    return store
+
+@st.cache_resource
+def get_status_listener():
+    """One status socket listener shared by all sessions of this process"""
+    return StatusListener()
+
+@st.cache_resource
+def get_pdf_index():
+    return PdfIndex(PDF_DIR)
+
+@st.cache_resource
+def get_pdf_server():
+    """Local endpoint that streams PDFs (preview + downloads) from disk"""
+    return PdfServer(PDF_DIR)
+
+@st.cache_resource
+def get_thumbnails():
+    return ThumbnailCache()
+
+@st.cache_resource
+def get_outbox():
+    """Background email sender sharing pooled, logged-in SMTP connections"""
+    return mailer.make_outbox()
+
+@st.cache_resource
+def get_ledger():
+    return incremental.Ledger()
+
+@st.cache_resource
+def get_retention():
+    """Background sweeper keeping pdfs/ within the configured quota/age"""
+    settings = load_settings()
+    return retention.Retention(
+        get_pdf_index(), get_state_store(), pdf_dir=PDF_DIR,
+        quota=settings.get("retention_quota_mb", RETENTION_QUOTA_MB) * 1024 * 1024,
+        max_age=settings.get("retention_max_age_days", 0) * 86400,
+    ).start()
+
+@st.cache_resource
+def get_scheduler():
+    """One job scheduler (and worker pool) shared by all sessions"""
+    return JobScheduler(state_file=get_state_store().db_path)
+
+# Reads go through the file cache keyed on the state database, so a rerun
+# without any write in between costs two stat() calls
 
 def load_status():
-    if STATUS_FILE.exists():
-        try:
-            return json.loads(STATUS_FILE.read_text())
-        except:
-            pass
-    return {"step": "", "waiting": False, "button_text": "", "pdf_path": ""}
+    store = get_state_store()
+    return get_file_cache().get("status", store.files, lambda: store.get_status(MAIN_RUN))
+
+def load_job_status(job):
+    store = get_state_store()
+    return get_file_cache().get(("job", job.job_id), store.files, job.load_status)
 
 def load_settings():
-    if SETTINGS_FILE.exists():
-        try:
-            return json.loads(SETTINGS_FILE.read_text())
-        except:
-            pass
-    return {"email": ""}
+    store = get_state_store()
+    return get_file_cache().get("settings", store.files, lambda: dict({"email": ""}, **store.get_settings()))
 
 def save_settings(settings):
-    SETTINGS_FILE.write_text(json.dumps(settings, indent=2))
+    # Only changed keys are written
+    if get_state_store().update_settings(settings):
+        get_file_cache().invalidate("settings")
+
+def send_continue_signal(job=None):
+    # Socket reaches the worker instantly - file is the fallback
+    sock_path = signal_socket_path(job.job_id) if job else SIGNAL_SOCKET
+    if not send_event(sock_path, make_event(SIGNAL)):
+        (job.signal_file if job else SIGNAL_FILE).write_text("continue")
 
-def send_continue_signal():
-    SIGNAL_FILE.write_text("continue")
+def wait_for_status_update(since_version, timeout=STATUS_EVENT_TIMEOUT):
+    """Block until the worker reports a new status (or fall back to polling)"""
+    listener = get_status_listener()
+    if listener.active:
+        listener.wait_for_change(since_version, timeout=timeout)
+    else:
+        time.sleep(STATUS_POLL_INTERVAL)
 
-def clear_files():
-    if STATUS_FILE.exists():
-        STATUS_FILE.unlink()
+def reset_run_state():
+    # PDFs stay - the retention sweeper bounds the archive
+    get_state_store().clear_status(MAIN_RUN)
     if SIGNAL_FILE.exists():
         SIGNAL_FILE.unlink()
-    # Also delete all PDFs
-    if PDF_DIR.exists():
-        import shutil
-        shutil.rmtree(PDF_DIR)
-        PDF_DIR.mkdir(exist_ok=True)
+    get_file_cache().invalidate()
 
 def get_pdfs():
-    """Get all PDFs in the pdfs folder"""
-    PDF_DIR.mkdir(exist_ok=True)
-    return sorted(PDF_DIR.glob("*.pdf"), key=lambda x: x.stat().st_mtime, reverse=True)
+    """Get all PDFs in the pdfs folder (including per-account subfolders), newest first"""
+    index = get_pdf_index()
+    index.refresh()
+    # The listing only changes when the index database (or its WAL) is written
+    db = index.db_path
+    return get_file_cache().get("pdfs", [db, db.with_name(db.name + "-wal")], index.list)
+
+def get_invoices():
+    """Structured invoice records for all PDFs (parsed once per file content)"""
+    index = get_pdf_index()
+    index.refresh()
+    return invoice_parser.parse_pdfs(index.list(), index=index)
+
+def is_running(status):
+    step = status.get("step", "")
+    return status.get("waiting") or (step and "Done" not in step and "Error" not in step)
+
+def read_statuses():
+    """Standalone status and (job, status) for the recent jobs.
+    Reuses the session's last snapshot until a status event arrives or the job list changes."""
+    listener = get_status_listener()
+    version = listener.version
+    recent = get_scheduler().jobs(limit=RECENT_JOBS)
+    key = (version, tuple((job.job_id, job.state) for job in recent))
+    snapshot = st.session_state.get("status_snapshot")
+    if (snapshot and listener.active and snapshot["key"] == key
+            and time.time() - snapshot["read_at"] < STATUS_EVENT_TIMEOUT):
+        return snapshot["status"], snapshot["jobs"]
+    status = load_status()
+    jobs = [(job, load_job_status(job)) for job in recent]
+    st.session_state["status_snapshot"] = {
+        "key": key, "read_at": time.time(), "status": status, "jobs": jobs,
+    }
+    return status, jobs
+
+def any_running(status, jobs):
+    return bool(is_running(status) or any(job.active for job, _ in jobs))
+
+def render_status(status, key, label=""):
+    """Show one status record (with the continue button when it's waiting)"""
+    # Only show login button when script is waiting for user
+    if status.get("waiting"):
+        st.markdown("---")
+        st.warning(f"⏳ {label}**{status.get('step')}**")
+        st.markdown("### 👇 Click when you're done:")
+        clicked = st.button("✅ I'M LOGGED IN - CONTINUE!", type="primary", use_container_width=True, key=f"login_done_{key}")
+        st.markdown("---")
+        return clicked
+    
+    step_text = status.get("step", "")
+    if not step_text:
+        return False
+    if "Error" in step_text:
+        # Truncate long errors for display
+        if len(step_text) > 150:
+            step_text = step_text[:150] + "..."
+        st.error(f"❌ {label}{step_text}")
+    elif "Done" in step_text or "Saved" in step_text:
+        st.success(f"✅ {label}{step_text}")
+    else:
+        st.info(f"⏳ {label}{step_text}")
+    return False
+
+def render_status_panel():
+    """Status of the standalone run and each scheduled job.
+    Runs as a fragment, so while a job is active only this panel re-executes."""
+    status, jobs = read_statuses()
+    
+    # Standalone run (linkedin_automation.py started by hand)
+    if render_status(status, "main"):
+        send_continue_signal()
+        st.success("✅ Signal sent! Script continuing...")
+    
+    # Scheduled jobs, one status record each
+    for job, job_status in jobs:
+        if not job_status.get("step"):
+            job_status = dict(job_status, step=f"Job {job.state}...")
+        if render_status(job_status, job.job_id, label=f"[{job.account}] "):
+            send_continue_signal(job)
+            st.success("✅ Signal sent! Script continuing...")
+    
+    # A run just finished - refresh the whole page once so the new PDF shows up
+    running = any_running(status, jobs)
+    was_running = st.session_state.get("status_running", False)
+    st.session_state["status_running"] = running
+    if was_running and not running:
+        get_retention().trigger()
+        if fragment:
+            st.rerun()
+
+def pdf_links_work():
+    """Whether this session's browser can reach the PDF endpoint (local, or a public URL is set)"""
+    context = getattr(st, "context", None)
+    host = context.headers.get("Host") if context is not None else None
+    return get_pdf_server().reachable_from(host)
+
+def pdf_download_button(label, pdf_path: Path, **kwargs):
+    """Download link to the PDF endpoint. Remote browsers (no LIE_PDF_PUBLIC_URL) pick a
+    file first and get a download button for that one file - the list is never inlined."""
+    if pdf_links_work():
+        # Bytes are only read when the link is clicked
+        st.link_button(label, get_pdf_server().url_for(pdf_path, download=True), **kwargs)
+    elif st.session_state.get("download_pdf") == str(pdf_path):
+        st.download_button(label, pdf_path.read_bytes(), file_name=pdf_path.name,
+                           mime="application/pdf", key=f"dl_{label}_{pdf_path}", **kwargs)
+    elif st.button(label, key=f"pick_{label}_{pdf_path}", help="Prepare this PDF for download", **kwargs):
+        st.session_state["download_pdf"] = str(pdf_path)
+        st.rerun()
 
 def display_pdf(pdf_path: Path):
     """Display PDF in Streamlit"""
     try:
-        with open(pdf_path, "rb") as f:
-            base64_pdf = base64.b64encode(f.read()).decode('utf-8')
+        if pdf_links_work():
+            # The browser fetches the file (with range requests) - nothing is inlined
+            pdf_url = get_pdf_server().url_for(pdf_path)
+        else:
+            st.caption("⚠️ The PDF endpoint isn't reachable from this browser, so the preview is "
+                       "inlined - set LIE_PDF_PUBLIC_URL to stream PDFs to remote browsers.")
+            pdf_url = "data:application/pdf;base64," + base64.b64encode(pdf_path.read_bytes()).decode("utf-8")
         
         pdf_display = f'''
         <iframe 
-            src="data:application/pdf;base64,{base64_pdf}" 
+            src="{pdf_url}" 
             width="100%" 
             height="600px" 
             type="application/pdf">
@@ -89,46 +291,116 @@ def open_folder_in_finder(folder_path: Path):
     """Open folder in Finder (macOS)"""
     subprocess.run(["open", str(folder_path)])
 
+def send_pdfs(recipient_email: str, pdfs, as_zip=False):
+    """Queue PDFs in as few size-capped emails as possible. Returns per-bundle results."""
+    return mailer.send_pdfs(get_outbox(), recipient_email, pdfs, as_zip=as_zip)
+
 def send_email_with_pdf(recipient_email: str, pdf_path: Path):
-    """Send email with PDF attachment via iCloud SMTP"""
-    now = datetime.now()
-    date_str = now.strftime("%d/%m/%Y %H:%M")
-    
-    # Create message
-    msg = MIMEMultipart()
-    msg['From'] = SENDER_EMAIL
-    msg['To'] = recipient_email
-    msg['Subject'] = "Your LinkedIn Invoice PDF"
-    
-    # Email body
-    body = f"""Hi User,
+    """Queue email with PDF attachment for sending via iCloud SMTP.
+    Returns the outbox message id, or an error string if it couldn't be queued."""
+    result = send_pdfs(recipient_email, [pdf_path])[0]
+    return result["msg_id"] or f"Failed to queue email: {result['error']}"
 
-Here is your PDF from your LinkedIn which you asked for on {date_str}.
+def render_step_timings():
+    """p50/p95 per step over recent runs (from the run event log)"""
+    summary = run_log.summarize()
+    if not summary:
+        return
+    with st.expander("⏱️ Step timings (recent runs)"):
+        st.dataframe(
+            [{
+                "Step": s["step"], "Runs": s["count"],
+                "p50 (s)": round(s["p50"], 2), "p95 (s)": round(s["p95"], 2), "Max (s)": round(s["max"], 2),
+                "Timeouts": s["timeouts"], "Errors": s["errors"],
+            } for s in summary],
+            use_container_width=True, hide_index=True,
+        )
 
-Cheers,
-TUG Team"""
-    
-    msg.attach(MIMEText(body, 'plain'))
-    
-    # Attach PDF
-    try:
-        with open(pdf_path, 'rb') as f:
-            pdf_attachment = MIMEApplication(f.read(), _subtype='pdf')
-            pdf_attachment.add_header('Content-Disposition', 'attachment', filename=pdf_path.name)
-            msg.attach(pdf_attachment)
-    except Exception as e:
-        return f"Failed to attach PDF: {e}"
-    
-    # Send email
+def render_retention(settings):
+    """Archive quota / max age and current usage"""
+    sweeper = get_retention()
+    with st.expander("🧹 Storage & retention"):
+        quota_mb = settings.get("retention_quota_mb", RETENTION_QUOTA_MB)
+        age_days = settings.get("retention_max_age_days", 0)
+        usage = sweeper.usage()
+        st.caption(f"Using {usage / 1024 / 1024:.1f} MB"
+                   f"{f' of {quota_mb} MB' if quota_mb else ''} — oldest PDFs are removed first; "
+                   f"📌 pinned PDFs and the newest PDF in each folder are always kept")
+        col_quota, col_age = st.columns(2)
+        with col_quota:
+            new_quota = st.number_input("Quota (MB, 0 = unlimited)", min_value=0, value=int(quota_mb), step=100)
+        with col_age:
+            new_age = st.number_input("Max age (days, 0 = keep)", min_value=0, value=int(age_days), step=30)
+        if (new_quota, new_age) != (quota_mb, age_days):
+            settings["retention_quota_mb"] = new_quota
+            settings["retention_max_age_days"] = new_age
+            save_settings(settings)
+            sweeper.configure(new_quota * 1024 * 1024, new_age * 86400)
+        if sweeper.removed:
+            st.caption(f"Removed {sweeper.removed} old PDFs ({sweeper.freed / 1024 / 1024:.1f} MB freed) since start")
+
+def load_spend_table():
+    """Columnar invoice table - folds in new PDFs only when the PDF index changed"""
+    index = get_pdf_index()
+    index.refresh()
+    db = index.db_path
+    return get_file_cache().get("spend", [db, db.with_name(db.name + "-wal")],
+                                lambda: analytics.update(index)[0])
+
+def render_spend_dashboard():
+    """Monthly/quarterly spend per product or account, normalized to one currency"""
     try:
-        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-        server.starttls()
-        server.login(SENDER_EMAIL, SENDER_PASSWORD)
-        server.send_message(msg)
-        server.quit()
-        return True
-    except Exception as e:
-        return f"SMTP Error: {e}"
+        table = load_spend_table()
+    except invoice_parser.NoExtractorError as e:
+        st.warning(str(e))
+        return
+    if not len(table):
+        st.info("No invoice records yet - they show up here once extracted PDFs contain purchases.")
+        return
+    rates = analytics.load_rates()
+    col_period, col_by, col_base, col_account = st.columns(4)
+    with col_period:
+        period = st.radio("Period", [analytics.MONTH, analytics.QUARTER], format_func=str.title, horizontal=True)
+    with col_by:
+        by = st.radio("Group by", ["product", "account"], format_func=str.title, horizontal=True)
+    with col_base:
+        currencies = sorted(rates)
+        base = st.selectbox("Currency", currencies, index=currencies.index(analytics.BASE_CURRENCY))
+    with col_account:
+        accounts = sorted(set(table["account"].tolist()))
+        account = st.selectbox("Account", ["All"] + accounts)
+    account = None if account == "All" else account
+
+    totals = analytics.summary(table, period, base, rates, account)
+    col_total, col_count, col_last = st.columns(3)
+    col_total.metric(f"Total ({base})", f"{totals['total']:,.2f}")
+    col_count.metric("Invoices", totals["invoices"])
+    if totals["last_period"]:
+        delta = None if totals["previous"] is None else f"{totals['last'] - totals['previous']:,.2f}"
+        col_last.metric(totals["last_period"], f"{totals['last']:,.2f}", delta, delta_color="inverse")
+    if totals["unconverted"]:
+        st.warning(f"No exchange rate for {', '.join(totals['unconverted'])} - add it to fx_rates.json")
+
+    agg = analytics.aggregate(table, period, by, base, rates, account)
+    chart = [dict({"period": p}, **{g: round(float(v), 2) for g, v in zip(agg["groups"], row)})
+             for p, row in zip(agg["periods"], agg["totals"])]
+    st.bar_chart(chart, x="period", y=agg["groups"])
+    rows = analytics.to_rows(agg)
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+    st.caption("Native currency totals: " + ", ".join(f"{v:,.2f} {c}" for c, v in totals["by_currency"].items()))
+
+def render_outbox():
+    """Delivery status of recently queued emails"""
+    messages = get_outbox().recent(limit=5)
+    if not messages:
+        return
+    with st.expander("📬 Outbox"):
+        for m in messages:
+            icon = "✅" if m["status"] == SENT else "❌" if m["status"] == FAILED else "⏳"
+            line = f"{icon} {m['recipients']} — {m['status']}"
+            if m["last_error"]:
+                line += f" ({m['last_error'][:80]})"
+            st.text(line)
 
 def main():
     st.set_page_config(page_title="LinkedIn PDF Extractor", page_icon="📄", layout="wide")
@@ -138,39 +410,68 @@ def main():
     
     st.divider()
     
-    # Status display
-    status = load_status()
+    # Status display (grab the event version first so nothing slips in between)
+    status_version = get_status_listener().version
+    main_status, job_statuses = read_statuses()
+    running = any_running(main_status, job_statuses)
+    # A job waiting for a click must not leave the script blocked on the next event
+    waiting = any(status.get("waiting") for status in [main_status] + [s for _, s in job_statuses])
     settings = load_settings()
+    scheduler = get_scheduler()
     
-    # Only show login button when script is waiting for user
-    if status.get("waiting"):
-        st.markdown("---")
-        st.warning(f"⏳ **{status.get('step')}**")
-        st.markdown("### 👇 Click when you're done:")
-        if st.button("✅ I'M LOGGED IN - CONTINUE!", type="primary", use_container_width=True, key="login_done"):
-            send_continue_signal()
-            st.success("✅ Signal sent! Script continuing...")
-            time.sleep(1)
-            st.rerun()
-        st.markdown("---")
-            
-    elif status.get("step"):
-        step_text = status.get("step", "")
-        if "Error" in step_text:
-            # Truncate long errors for display
-            if len(step_text) > 150:
-                step_text = step_text[:150] + "..."
-            st.error(f"❌ {step_text}")
-        elif "Done" in step_text or "Saved" in step_text:
-            st.success(f"✅ {step_text}")
-        else:
-            st.info(f"⏳ {step_text}")
+    if fragment:
+        fragment(run_every=STATUS_REFRESH_INTERVAL if running else None)(render_status_panel)()
+    else:
+        render_status_panel()
     
     st.divider()
     
     # Two big login buttons
     st.subheader("🚀 Extract PDF from LinkedIn")
     
+    account = st.text_input(
+        "Account",
+        value=settings.get("account", DEFAULT_ACCOUNT),
+        help="Company account to extract - PDFs go to pdfs/<account>/"
+    )
+    if account != settings.get("account", DEFAULT_ACCOUNT):
+        settings["account"] = account
+        save_settings(settings)
+    
+    renderers = list(RENDERER_LABELS)
+    current_renderer = settings.get("renderer", html_renderer.PRINT)
+    renderer = st.selectbox(
+        "PDF rendering",
+        renderers,
+        index=renderers.index(current_renderer) if current_renderer in renderers else 0,
+        format_func=RENDERER_LABELS.get,
+        help="Direct rendering skips the print dialog (needs Chrome's \"Allow JavaScript from Apple Events\")"
+    )
+    if renderer != current_renderer:
+        settings["renderer"] = renderer
+        save_settings(settings)
+    
+    watermark = get_ledger().watermark(account_slug(account))
+    incremental_mode = st.checkbox(
+        "Only new invoices (incremental)",
+        value=settings.get("incremental", False),
+        help=f"Records only invoices newer than the last captured one"
+             f"{f' ({watermark})' if watermark else ''} and keeps a consolidated list per account"
+    )
+    if incremental_mode != settings.get("incremental", False):
+        settings["incremental"] = incremental_mode
+        save_settings(settings)
+    
+    invoices = st.checkbox(
+        "Also download each invoice PDF",
+        value=settings.get("invoices", False),
+        help="Fetches the invoices linked from the purchases page into pdfs/<account>/invoices/ "
+             "(interrupted downloads resume where they stopped)"
+    )
+    if invoices != settings.get("invoices", False):
+        settings["invoices"] = invoices
+        save_settings(settings)
+    
     col_fast, col_validate = st.columns(2)
     
     with col_fast:
@@ -182,16 +483,10 @@ def main():
         """, unsafe_allow_html=True)
         
         if st.button("⚡ Login Fast", type="primary", use_container_width=True, key="fast_login"):
-            clear_files()
-            PDF_DIR.mkdir(exist_ok=True)
-            
-            # Start automation in FAST mode
-            subprocess.Popen(
-                [sys.executable, str(ROOT / "linkedin_automation.py"), "--fast"],
-                cwd=str(ROOT)
-            )
-            st.success("🌐 Browser opening... Login quickly! (10 sec window)")
-            time.sleep(2)
+            # Start automation in FAST mode (same account already running -> same job)
+            job = scheduler.submit(account, fast_mode=True, renderer=renderer,
+                                   incremental=incremental_mode, invoices=invoices)
+            st.success(f"🌐 Job {job.job_id} queued... Login quickly! (10 sec window)")
             st.rerun()
         
         st.caption("🏃 Login → script auto-continues after 10 seconds")
@@ -205,137 +500,232 @@ def main():
         """, unsafe_allow_html=True)
         
         if st.button("✅ Login with Validation Check", use_container_width=True, key="validate_login"):
-            clear_files()
-            PDF_DIR.mkdir(exist_ok=True)
-            
             # Start automation in normal mode
-            subprocess.Popen(
-                [sys.executable, str(ROOT / "linkedin_automation.py")],
-                cwd=str(ROOT)
-            )
-            st.success("🌐 Browser opening... Log in and click the button when ready!")
-            time.sleep(2)
+            job = scheduler.submit(account, fast_mode=False, renderer=renderer,
+                                   incremental=incremental_mode, invoices=invoices)
+            st.success(f"🌐 Job {job.job_id} queued... Log in and click the button when ready!")
             st.rerun()
         
         st.caption("🎯 Login → click \"I'M LOGGED IN\" when ready")
     
+    render_step_timings()
+    
     st.divider()
     
     # Reset button
     col_reset, col_empty = st.columns([1, 3])
     with col_reset:
         if st.button("🔄 Reset / Clear Error", use_container_width=True):
-            clear_files()
+            reset_run_state()
             st.success("Reset complete!")
             time.sleep(1)
             st.rerun()
     
+    render_retention(settings)
+    
     st.divider()
     
     # Display PDFs
-    st.subheader("📁 Extracted PDFs")
+    tab_pdfs, tab_spend = st.tabs(["📁 Extracted PDFs", "📊 Spend analytics"])
+    with tab_pdfs:
+        pdfs = get_pdfs()
     
-    pdfs = get_pdfs()
-    
-    if pdfs:
-        # Show latest PDF
-        latest_pdf = pdfs[0]
-        st.success(f"📄 Latest: **{latest_pdf.name}**")
+        if pdfs:
+            # Show latest PDF
+            latest_pdf = pdfs[0]
+            st.success(f"📄 Latest: **{latest_pdf.name}**")
         
-        # Action buttons for the PDF
-        col_dl, col_folder = st.columns(2)
+            # Action buttons for the PDF
+            col_dl, col_folder = st.columns(2)
         
-        with col_dl:
-            with open(latest_pdf, "rb") as f:
-                st.download_button(
-                    label="⬇️ Download PDF",
-                    data=f.read(),
-                    file_name=latest_pdf.name,
-                    mime="application/pdf",
-                    use_container_width=True
-                )
+            with col_dl:
+                pdf_download_button("⬇️ Download PDF", latest_pdf, use_container_width=True)
         
-        with col_folder:
-            if st.button("📂 Open Folder", use_container_width=True, help="Open the folder where PDFs are saved"):
-                open_folder_in_finder(PDF_DIR)
-                st.toast("📂 Folder opened in Finder!")
+            with col_folder:
+                if st.button("📂 Open Folder", use_container_width=True, help="Open the folder where PDFs are saved"):
+                    open_folder_in_finder(PDF_DIR)
+                    st.toast("📂 Folder opened in Finder!")
         
-        st.divider()
+            st.divider()
         
-        # Email section
-        st.subheader("📧 Send PDF to Email")
+            # Email section
+            st.subheader("📧 Send PDF to Email")
         
-        email_col1, email_col2 = st.columns([2, 1])
+            email_col1, email_col2 = st.columns([2, 1])
         
-        with email_col1:
-            user_email = st.text_input(
-                "Your email address",
-                value=settings.get("email", ""),
-                placeholder="your.email@example.com",
-                help="Enter the email where you want to receive the PDF"
-            )
+            with email_col1:
+                user_email = st.text_input(
+                    "Your email address",
+                    value=settings.get("email", ""),
+                    placeholder="your.email@example.com",
+                    help="Enter the email where you want to receive the PDF"
+                )
             
-            # Save email when it changes
-            if user_email != settings.get("email", ""):
-                settings["email"] = user_email
-                save_settings(settings)
+                # Save email when it changes
+                if user_email != settings.get("email", ""):
+                    settings["email"] = user_email
+                    save_settings(settings)
         
-        with email_col2:
-            st.write("")  # Spacer
-            st.write("")  # Spacer
-            if st.button("📨 Send PDF to Email", type="primary", use_container_width=True, disabled=not user_email):
-                if user_email:
-                    with st.spinner("Sending email..."):
+            with email_col2:
+                st.write("")  # Spacer
+                st.write("")  # Spacer
+                if st.button("📨 Send PDF to Email", type="primary", use_container_width=True, disabled=not user_email):
+                    if user_email:
                         result = send_email_with_pdf(user_email, latest_pdf)
                     
-                    if result is True:
-                        st.success("✅ Successfully sent the email with the PDF in it!")
-                        st.balloons()
+                        if get_outbox().status(result):
+                            st.success("📤 Email queued - it's being sent in the background!")
+                        else:
+                            st.error(f"❌ {result}")
                     else:
-                        st.error(f"❌ {result}")
-                else:
-                    st.warning("⚠️ Please enter your email address first")
+                        st.warning("⚠️ Please enter your email address first")
         
-        st.caption(f"📬 Email will be sent from **{SENDER_EMAIL}** (TUG Team)")
+            st.caption(f"📬 Email will be sent from **{SENDER_EMAIL}** (TUG Team)")
         
-        st.divider()
+            # Batch send - month-end: many PDFs, few emails
+            with st.expander("📦 Send several PDFs"):
+                selected = st.multiselect(
+                    "PDFs to send (leave empty for all)",
+                    options=pdfs,
+                    format_func=lambda p: p.name,
+                )
+                as_zip = st.checkbox("Zip attachments", value=False)
+                if st.button("📨 Send selected/all", disabled=not user_email):
+                    results = send_pdfs(user_email, selected or pdfs, as_zip=as_zip)
+                    for n, r in enumerate(results, 1):
+                        size_mb = r["size"] / (1024 * 1024)
+                        if r["msg_id"]:
+                            st.success(f"📤 Email {n}/{len(results)}: {len(r['files'])} PDF(s), ~{size_mb:.1f} MB queued")
+                        else:
+                            st.error(f"❌ Email {n}/{len(results)}: {r['error']}")
+            render_outbox()
         
-        # Display PDF
-        st.subheader("👀 PDF Preview")
-        display_pdf(latest_pdf)
+            st.divider()
         
-        # Show all PDFs
-        if len(pdfs) > 1:
-            with st.expander(f"📚 All PDFs ({len(pdfs)})"):
-                for pdf in pdfs:
-                    col1, col2, col3 = st.columns([3, 1, 1])
-                    with col1:
-                        st.text(pdf.name)
-                    with col2:
-                        with open(pdf, "rb") as f:
-                            st.download_button(
-                                label="⬇️",
-                                data=f.read(),
-                                file_name=pdf.name,
-                                mime="application/pdf",
-                                key=f"dl_{pdf.name}"
-                            )
-                    with col3:
-                        if st.button("📨", key=f"email_{pdf.name}", help="Send this PDF to email"):
-                            if settings.get("email"):
-                                result = send_email_with_pdf(settings["email"], pdf)
-                                if result is True:
-                                    st.toast("✅ Email sent!")
-                                else:
-                                    st.toast(f"❌ {result}")
+            # Display PDF
+            st.subheader("👀 PDF Preview")
+            display_pdf(latest_pdf)
+        
+            # Structured records
+            with st.expander("🧾 Invoice records"):
+                try:
+                    records = get_invoices()
+                except invoice_parser.NoExtractorError as e:
+                    st.warning(str(e))
+                    records = []
+                if records:
+                    st.dataframe(records, use_container_width=True)
+                    col_csv, col_json = st.columns(2)
+                    with col_csv:
+                        st.download_button("⬇️ CSV", invoice_parser.to_csv(records), file_name="invoices.csv", mime="text/csv")
+                    with col_json:
+                        st.download_button("⬇️ JSON", invoice_parser.to_json(records), file_name="invoices.json", mime="application/json")
+                else:
+                    st.caption("No invoice records found in the saved PDFs yet.")
+        
+            # One optimized file per period (auditors)
+            with st.expander("🗂️ Consolidated archive"):
+                period = st.text_input("Period", placeholder="2025-Q1, 2025-03 or 2025")
+                archive_account = st.text_input("Only account (optional)", key="archive_account")
+                if st.button("🗂️ Build archive PDF", disabled=not period):
+                    try:
+                        with st.spinner("Merging PDFs..."):
+                            stats = consolidate.consolidate_period(period, archive_account or None, index=get_pdf_index())
+                        st.session_state["archive"] = stats
+                    except consolidate.ConsolidateError as e:
+                        st.error(f"❌ {e}")
+                stats = st.session_state.get("archive")
+                if stats and Path(stats["path"]).exists():
+                    archive = Path(stats["path"])
+                    st.success(f"📄 {archive.name}: {stats['inputs']} PDFs, "
+                               f"{stats['input_bytes'] / 1024:.0f} KB → {stats['size'] / 1024:.0f} KB")
+                    col_dl_archive, col_mail_archive = st.columns(2)
+                    with col_dl_archive:
+                        # The bytes only go to the browser after an explicit click, once
+                        if st.session_state.get("archive_download") == str(archive):
+                            st.download_button("⬇️ Download archive", archive.read_bytes(),
+                                               file_name=archive.name, mime="application/pdf",
+                                               on_click=lambda: st.session_state.pop("archive_download", None))
+                        elif st.button("⬇️ Prepare download"):
+                            st.session_state["archive_download"] = str(archive)
+                            st.rerun()
+                    with col_mail_archive:
+                        if st.button("📨 Email archive", disabled=not user_email):
+                            result = send_email_with_pdf(user_email, archive)
+                            if get_outbox().status(result):
+                                st.success("📤 Email queued!")
                             else:
-                                st.toast("⚠️ Enter email first")
-    else:
-        st.info("No PDFs yet. Click one of the login buttons above to extract your LinkedIn purchases.")
+                                st.error(f"❌ {result}")
+        
+            with st.expander("☁️ Off-box copy (S3)"):
+                bucket = st.text_input("Bucket", value=settings.get("s3_bucket", s3_sync.S3_BUCKET))
+                prefix = st.text_input("Key prefix", value=settings.get("s3_prefix", s3_sync.S3_PREFIX))
+                endpoint = st.text_input("Endpoint URL (MinIO etc., optional)",
+                                         value=settings.get("s3_endpoint", s3_sync.S3_ENDPOINT or ""))
+                if st.button("☁️ Sync now", disabled=not bucket):
+                    settings.update(s3_bucket=bucket, s3_prefix=prefix, s3_endpoint=endpoint)
+                    save_settings(settings)
+                    try:
+                        with st.spinner("Syncing..."):
+                            syncer = s3_sync.S3Sync(bucket, prefix, endpoint_url=endpoint or None,
+                                                    index=get_pdf_index(), pdf_dir=PDF_DIR)
+                            stats = syncer.sync()
+                    except s3_sync.SyncError as e:
+                        st.error(f"❌ {e}")
+                    else:
+                        message = (f"{stats['uploaded']} uploaded ({stats['bytes'] / 1024 / 1024:.1f} MB), "
+                                   f"{stats['copied']} copied, {stats['skipped']} already there")
+                        if stats["failed"]:
+                            st.warning(f"{message}, {stats['failed']} failed")
+                        else:
+                            st.success(f"✅ {message}")
+        
+            # Show all PDFs
+            if len(pdfs) > 1:
+                with st.expander(f"📚 All PDFs ({len(pdfs)})"):
+                    pinned_paths = get_state_store().pinned()
+                    # One page at a time: the body runs on every rerun, even collapsed
+                    pages = (len(pdfs) + PDF_LIST_PAGE_SIZE - 1) // PDF_LIST_PAGE_SIZE
+                    page = st.number_input("Page", 1, pages, 1, key="pdf_list_page") if pages > 1 else 1
+                    for pdf in pdfs[(page - 1) * PDF_LIST_PAGE_SIZE:page * PDF_LIST_PAGE_SIZE]:
+                        col0, col1, col2, col3, col4 = st.columns([1, 3, 1, 1, 1])
+                        with col0:
+                            thumb = get_thumbnails().get(pdf)
+                            if thumb:
+                                st.image(get_file_cache().read_bytes(thumb), width=60)
+                        with col1:
+                            st.text(pdf.name)
+                        with col2:
+                            pdf_download_button("⬇️", pdf)
+                        with col3:
+                            if st.button("📨", key=f"email_{pdf}", help="Send this PDF to email"):
+                                if settings.get("email"):
+                                    result = send_email_with_pdf(settings["email"], pdf)
+                                    if get_outbox().status(result):
+                                        st.toast("📤 Email queued!")
+                                    else:
+                                        st.toast(f"❌ {result}")
+                                else:
+                                    st.toast("⚠️ Enter email first")
+                        with col4:
+                            pinned = str(pdf) in pinned_paths
+                            if st.button("📌" if pinned else "📍", key=f"pin_{pdf}",
+                                         help="Unpin (allow cleanup)" if pinned else "Pin (never clean up)"):
+                                if pinned:
+                                    get_retention().unpin(pdf)
+                                else:
+                                    get_retention().pin(pdf)
+                                st.rerun()
+                    get_thumbnails().evict()
+        else:
+            st.info("No PDFs yet. Click one of the login buttons above to extract your LinkedIn purchases.")
+    
+    with tab_spend:
+        render_spend_dashboard()
     
-    # Auto-refresh when waiting or processing
-    if status.get("waiting") or (status.get("step") and "Done" not in status.get("step", "") and "Error" not in status.get("step", "")):
-        time.sleep(2)
+    # Without fragments: rerun the whole page once the status actually changed
+    if not fragment and running:
+        wait_for_status_update(status_version, STATUS_POLL_INTERVAL if waiting else STATUS_EVENT_TIMEOUT)
         st.rerun()
 
 if __name__ == "__main__":
@@ -0,0 +1,260 @@
+"""
+Benchmarks for the extraction pipeline and the UI data path
+Runs headless (no Chrome, no Streamlit needed) and writes machine-readable
+results so runs can be compared.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--output results.json] [--compare old.json] [--quick]
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import linkedin_automation  # noqa: E402
+import mail_bundle  # noqa: E402
+from browser_driver import FakeDriver  # noqa: E402
+from pdf_index import PdfIndex  # noqa: E402
+from pdf_server import PdfServer  # noqa: E402
+from status_channel import STATUS, SignalReceiver, StatusListener, make_event, send_event  # noqa: E402
+
+DEFAULT_OUTPUT = ROOT / "benchmarks" / "results.json"
+
+
+def timed(fn, repeat):
+    """Run fn repeat times, return stats in seconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "max": max(samples),
+        "runs": repeat,
+    }
+
+
+def bench_extraction(tmp, repeat):
+    """End-to-end run_automation against the fake driver (isolated dirs)"""
+    pdf_root = tmp / "pdfs"
+    linkedin_automation.configure("bench", tmp / "job", pdf_root / "bench")
+    linkedin_automation.PDF_ROOT = pdf_root
+    linkedin_automation.BLOB_DIR = pdf_root / ".blobs"
+    linkedin_automation.INDEX_FILE = tmp / "index.sqlite3"
+    linkedin_automation.RUN_LOG_FILE = tmp / "events.jsonl"
+    linkedin_automation.STATE_FILE = tmp / "state.sqlite3"
+    linkedin_automation.SESSION_FILE = tmp / "session_cache"
+    linkedin_automation.KEY_FILE = tmp / "session_key"
+    # Don't wake a running app with the benchmark's status events
+    linkedin_automation.STATUS_SOCKET = tmp / "status.sock"
+    devnull = open(os.devnull, "w")
+
+    def run():
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            linkedin_automation.run_automation(fast_mode=True, driver=FakeDriver())
+        finally:
+            sys.stdout = stdout
+        # Runs within the same second would reuse the timestamped filename
+        for pdf in (pdf_root / "bench").glob("*.pdf"):
+            pdf.unlink()
+
+    return timed(run, repeat)
+
+
+def bench_status_latency(tmp, repeat):
+    """Worker status event -> UI wake-up, socket channel vs. 2s file polling"""
+    listener = StatusListener(tmp / "status.sock")
+    if not listener.active:
+        return {"skipped": "AF_UNIX sockets not available"}
+    samples = []
+    for _ in range(repeat):
+        version = listener.version
+        start = time.perf_counter()
+        threading.Timer(0, send_event, args=(listener.sock_path, make_event(STATUS, step="bench"))).start()
+        listener.wait_for_change(version, timeout=5)
+        samples.append(time.perf_counter() - start)
+
+    receiver = SignalReceiver(tmp / "signal.txt", tmp / "signal.sock")
+    signal_samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        threading.Timer(0, send_event, args=(receiver.sock_path, make_event("signal"))).start()
+        receiver.wait(timeout=5)
+        signal_samples.append(time.perf_counter() - start)
+    receiver.close()
+    return {
+        "status_event_median": statistics.median(samples),
+        "status_event_max": max(samples),
+        "signal_median": statistics.median(signal_samples),
+        "signal_max": max(signal_samples),
+        "file_polling_expected_median": 1.0,  # old loop: 2s rerun / 1s signal poll
+    }
+
+
+def _fill(pdf_dir, count, start):
+    for i in range(start, count):
+        (pdf_dir / f"LinkedIn_Purchases_{20200101 + i // 1000:08d}_{i % 1000:06d}.pdf").write_bytes(b"%PDF-1.4\n%%EOF\n")
+
+
+def bench_library(tmp, sizes, repeat):
+    """get_pdfs() cost as the archive grows: old glob+stat vs. the index"""
+    pdf_dir = tmp / "library"
+    pdf_dir.mkdir()
+    index = PdfIndex(pdf_dir, tmp / "library.sqlite3")
+    server = PdfServer(pdf_dir, port=0)
+    results = {}
+    have = 0
+    try:
+        for size in sizes:
+            _fill(pdf_dir, size, have)
+            have = size
+
+            def glob_stat():
+                sorted(pdf_dir.glob("*.pdf"), key=lambda x: x.stat().st_mtime, reverse=True)
+
+            cold = timed(index.refresh, 1)  # picks up the newly added files
+            latest = index.latest()
+
+            def preview():
+                with urllib.request.urlopen(server.url_for(latest)) as r:
+                    r.read()
+
+            results[str(size)] = {
+                "glob_stat": timed(glob_stat, repeat),
+                "index_refresh_incremental": cold,
+                "index_list": timed(lambda: (index.refresh(), index.list()), repeat),
+                "index_latest": timed(index.latest, repeat),
+                "preview_fetch": timed(preview, repeat),
+            }
+    finally:
+        server.shutdown()
+    return results
+
+
+def bench_email(tmp, sizes_mb, repeat):
+    """Streaming MIME construction for large attachments"""
+    results = {}
+    for mb in sizes_mb:
+        pdf = tmp / f"attachment_{mb}mb.pdf"
+        with open(pdf, "wb") as f:
+            for _ in range(mb):
+                f.write(os.urandom(1024 * 1024))
+        out = tmp / "message.eml"
+
+        def build():
+            with open(out, "wb") as fp:
+                mail_bundle.write_message(fp, "a@example.com", "b@example.com", "bench", "body",
+                                          [(pdf, pdf.name, "application/pdf")])
+
+        results[f"{mb}MB"] = timed(build, repeat)
+        pdf.unlink()
+    return results
+
+
+# Runs in a subprocess: app.py and everything it imports come from the copy in argv[1]
+APP_RERUN_SCRIPT = """
+import json, statistics, sys, time
+sys.path.insert(0, sys.argv[1])
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1] + "/app.py", default_timeout=30)
+at.run()  # warm up caches/resources
+samples = []
+for _ in range(int(sys.argv[2])):
+    start = time.perf_counter()
+    at.run()
+    samples.append(time.perf_counter() - start)
+print(json.dumps({"min": min(samples), "median": statistics.median(samples), "max": max(samples),
+                  "runs": len(samples)}))
+"""
+
+
+def bench_app_rerun(tmp, repeat):
+    """Full app.py script run via Streamlit's AppTest (skipped without streamlit).
+    Runs a copy of the app in tmp, so its state DB, pdfs/ and retention sweeper
+    aren't this checkout's."""
+    try:
+        import streamlit.testing.v1  # noqa: F401
+    except ImportError:
+        return {"skipped": "streamlit not installed"}
+    app_dir = tmp / "app"
+    app_dir.mkdir()
+    for src in ROOT.glob("*.py"):
+        shutil.copy2(src, app_dir / src.name)
+    result = subprocess.run([sys.executable, "-c", APP_RERUN_SCRIPT, str(app_dir), str(repeat)],
+                            cwd=str(app_dir), capture_output=True, text=True)
+    if result.returncode != 0:
+        return {"skipped": f"app run failed: {(result.stderr.strip().splitlines() or [''])[-1]}"}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def compare(current, previous_path):
+    """Print median changes vs. a previous results file"""
+    previous = json.loads(Path(previous_path).read_text())
+
+    def walk(cur, prev, prefix=""):
+        for key, value in cur.items():
+            if key not in prev:
+                continue
+            if isinstance(value, dict) and "median" in value and "median" in prev[key]:
+                old, new = prev[key]["median"], value["median"]
+                change = (new - old) / old * 100 if old else 0.0
+                flag = "  <-- slower" if change > 20 else ""
+                print(f"{prefix}{key}: {old * 1000:.2f}ms -> {new * 1000:.2f}ms ({change:+.0f}%){flag}")
+            elif isinstance(value, dict) and isinstance(prev[key], dict):
+                walk(value, prev[key], f"{prefix}{key}.")
+
+    walk(current["results"], previous["results"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the extraction pipeline and UI data path")
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT), help="Where to write the JSON results")
+    parser.add_argument("--compare", help="Previous results file to compare against")
+    parser.add_argument("--quick", action="store_true", help="Fewer repeats and smaller sizes")
+    args = parser.parse_args()
+
+    repeat = 3 if args.quick else 10
+    library_sizes = [10, 100, 1000] if args.quick else [10, 100, 1000, 10000]
+    email_sizes = [1, 5] if args.quick else [1, 10, 25]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        results = {
+            "extraction_fake_driver": bench_extraction(tmp, 3 if args.quick else 5),
+            "status_latency": bench_status_latency(tmp, repeat),
+            "library": bench_library(tmp, library_sizes, repeat),
+            "email_build": bench_email(tmp, email_sizes, 3),
+            "app_rerun": bench_app_rerun(tmp, repeat),
+        }
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    Path(args.output).write_text(json.dumps(report, indent=2))
+    print(f"Results written to {args.output}")
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
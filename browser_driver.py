@@ -0,0 +1,424 @@
+"""
+Browser drivers for the automation
+AppleScriptDriver controls the real Chrome on macOS, FakeDriver simulates it
+with scripted latencies so the whole flow runs (and can be timed) on Linux.
+"""
+
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+LOGIN_URL = "https://www.linkedin.com/login"
+PURCHASES_URL = "https://www.linkedin.com/manage/purchases-payments/purchases/"
+
+# URL fragments that mean we're still on a login/verification page
+LOGIN_MARKERS = ("/login", "/checkpoint", "/uas/", "/authwall")
+
+# Compiled scripts kept per process (scripts embed URLs/paths, so keep it bounded)
+SCRIPT_CACHE_SIZE = 64
+# Apple event descriptor types osascript prints as true/false
+_BOOLEAN_TYPES = {int.from_bytes(code, "big") for code in (b"true", b"fals", b"bool")}
+
+# Profile link of the logged-in member (the nav bar's "Me" menu, else the first /in/ link)
+_IDENTITY_JS = (
+    "Array.from((document.querySelector('.global-nav__me') || document).querySelectorAll('a'))"
+    ".map(a => a.href).find(h => h.includes('/in/')) || ''"
+)
+
+# AppleScript snippet: finds the LinkedIn tab and binds it to `t` (window `w`)
+_FIND_LINKEDIN_TAB = '''
+    repeat with w in windows
+        set tabIndex to 1
+        repeat with t in tabs of w
+            if URL of t contains "linkedin.com" then
+                %s
+            end if
+            set tabIndex to tabIndex + 1
+        end repeat
+    end repeat
+'''
+
+
+def _osascript(script):
+    result = subprocess.run(
+        ["osascript", "-e", script],
+        capture_output=True,
+        text=True
+    )
+    return result.stdout.strip()
+
+
+class AppleScriptRunner:
+    """Runs AppleScript in-process through PyObjC's NSAppleScript, compiling
+    each distinct script once. Without PyObjC every call spawns osascript."""
+
+    def __init__(self, cache_size=SCRIPT_CACHE_SIZE):
+        try:
+            from Foundation import NSAppleScript
+        except ImportError:
+            NSAppleScript = None
+        self._ns = NSAppleScript
+        self.cache_size = cache_size
+        self._compiled = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def in_process(self):
+        return self._ns is not None
+
+    def _compile(self, script):
+        compiled = self._compiled.pop(script, None)
+        if compiled is None:
+            compiled = self._ns.alloc().initWithSource_(script)
+            ok, error = compiled.compileAndReturnError_(None)
+            if not ok:
+                print(f"[APPLESCRIPT] Compile error: {error}")
+                return None
+        self._compiled[script] = compiled
+        while len(self._compiled) > self.cache_size:
+            self._compiled.popitem(last=False)
+        return compiled
+
+    def __call__(self, script):
+        if self._ns is None:
+            return _osascript(script)
+        # NSAppleScript isn't thread-safe - one script at a time
+        with self._lock:
+            compiled = self._compile(script)
+            if compiled is None:
+                return ""
+            result, error = compiled.executeAndReturnError_(None)
+        if result is None:
+            return ""
+        if result.descriptorType() in _BOOLEAN_TYPES:
+            return "true" if result.booleanValue() else "false"
+        return (result.stringValue() or "").strip()
+
+
+_runner = None
+
+
+def run_applescript(script):
+    """Run AppleScript to control Chrome"""
+    global _runner
+    if _runner is None:
+        _runner = AppleScriptRunner()
+    return _runner(script)
+
+
+class BrowserDriver:
+    """Interface the step engine talks to"""
+
+    # Where the browser keeps its session (cached sessions are only reused by the same kind)
+    profile = None
+
+    def warm_up(self):
+        """Get the browser running ahead of the first job (optional)"""
+
+    def open_login(self):
+        raise NotImplementedError
+
+    def current_url(self):
+        """URL of the LinkedIn tab ("" if there is none)"""
+        raise NotImplementedError
+
+    def is_loading(self):
+        raise NotImplementedError
+
+    def navigate(self, url):
+        raise NotImplementedError
+
+    def open_print_dialog(self):
+        raise NotImplementedError
+
+    def print_dialog_open(self):
+        raise NotImplementedError
+
+    def choose_save_as_pdf(self):
+        """Pick "Save as PDF" in the print dialog and confirm"""
+        raise NotImplementedError
+
+    def save_panel_open(self):
+        raise NotImplementedError
+
+    def save_to(self, pdf_path):
+        """Type the target path in the save panel and confirm"""
+        raise NotImplementedError
+
+    def page_html(self):
+        """Rendered DOM of the LinkedIn tab as HTML ("" if unavailable)"""
+        raise NotImplementedError
+
+    def cookie_header(self):
+        """Cookie header value for requests made on behalf of the tab's session"""
+        return ""
+
+    def identity(self):
+        """Who the tab is logged in as (their profile URL), "" if unknown"""
+        return ""
+
+    def is_logged_in(self):
+        url = self.current_url()
+        return "linkedin.com" in url and not any(m in url for m in LOGIN_MARKERS)
+
+    def page_ready(self, url_part):
+        return url_part in self.current_url() and not self.is_loading()
+
+
+class AppleScriptDriver(BrowserDriver):
+    profile = "chrome"
+
+    def __init__(self, run=run_applescript):
+        self.run = run
+
+    def warm_up(self):
+        # Starts Chrome without stealing focus; compiles the polling scripts
+        self.run('tell application "Google Chrome" to launch')
+        self.current_url()
+        self.is_loading()
+
+    def open_login(self):
+        self.run(f'''
+            tell application "Google Chrome"
+                activate
+                open location "{LOGIN_URL}"
+            end tell
+        ''')
+
+    def current_url(self):
+        return self.run('''
+            tell application "Google Chrome"
+            %s
+            end tell
+            return ""
+        ''' % (_FIND_LINKEDIN_TAB % "return URL of t"))
+
+    def is_loading(self):
+        out = self.run('''
+            tell application "Google Chrome"
+            %s
+            end tell
+            return "false"
+        ''' % (_FIND_LINKEDIN_TAB % "return loading of t"))
+        return out == "true"
+
+    def navigate(self, url):
+        # Switch to the LinkedIn tab and point it at the new URL directly
+        self.run('''
+            tell application "Google Chrome"
+            %s
+            end tell
+        ''' % (_FIND_LINKEDIN_TAB % f'''
+                set index of w to 1
+                set active tab index of w to tabIndex
+                activate
+                set URL of t to "{url}"
+                return
+        '''))
+
+    def open_print_dialog(self):
+        self.run('''
+            tell application "Google Chrome"
+            %s
+            end tell
+        ''' % (_FIND_LINKEDIN_TAB % '''
+                set index of w to 1
+                set active tab index of w to tabIndex
+                activate
+                tell application "System Events"
+                    -- Press Escape to close any search bar/popup
+                    key code 53
+                    -- Click in the middle of the page to focus it
+                    tell process "Google Chrome"
+                        click at {640, 400}
+                    end tell
+                    key code 53
+                    -- Now Command+P to print
+                    keystroke "p" using command down
+                end tell
+                return
+        '''))
+
+    def _sheet_exists(self, spec):
+        out = self.run(f'''
+            tell application "System Events"
+                tell process "Google Chrome"
+                    return exists {spec}
+                end tell
+            end tell
+        ''')
+        return out == "true"
+
+    def print_dialog_open(self):
+        return self._sheet_exists("pop up button 1 of sheet 1 of window 1")
+
+    def choose_save_as_pdf(self):
+        self.run('''
+            tell application "System Events"
+                tell process "Google Chrome"
+                    try
+                        click pop up button 1 of sheet 1 of window 1
+                        click menu item "Save as PDF" of menu 1 of pop up button 1 of sheet 1 of window 1
+                    end try
+                    keystroke return
+                end tell
+            end tell
+        ''')
+
+    def save_panel_open(self):
+        return self._sheet_exists("text field 1 of sheet 1 of window 1")
+
+    def save_to(self, pdf_path):
+        self.run(f'''
+            tell application "System Events"
+                tell process "Google Chrome"
+                    -- Go-to-folder field takes the full path
+                    keystroke "g" using {{command down, shift down}}
+                    delay 0.3
+                    keystroke "{pdf_path}"
+                    keystroke return
+                    delay 0.3
+                    keystroke return
+                end tell
+            end tell
+        ''')
+
+    def page_html(self):
+        # Needs Chrome's View > Developer > "Allow JavaScript from Apple Events"
+        return self.run('''
+            tell application "Google Chrome"
+            %s
+            end tell
+            return ""
+        ''' % (_FIND_LINKEDIN_TAB % 'return execute t javascript "document.documentElement.outerHTML"'))
+
+    def cookie_header(self):
+        # Only cookies visible to scripts - HttpOnly ones need a cookie file (see invoice_downloader)
+        return self.run('''
+            tell application "Google Chrome"
+            %s
+            end tell
+            return ""
+        ''' % (_FIND_LINKEDIN_TAB % 'return execute t javascript "document.cookie"'))
+
+    def identity(self):
+        # The "Me" menu in the nav bar links to the logged-in member's profile
+        url = self.run('''
+            tell application "Google Chrome"
+            %s
+            end tell
+            return ""
+        ''' % (_FIND_LINKEDIN_TAB % 'return execute t javascript "%s"' % _IDENTITY_JS))
+        return url.split("?")[0].rstrip("/")
+
+
+# Minimal valid PDF written by the fake driver
+FAKE_PDF = (
+    b"%PDF-1.4\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n"
+    b"2 0 obj<</Type/Pages/Kids[3 0 R]/Count 1>>endobj\n"
+    b"3 0 obj<</Type/Page/Parent 2 0 R/MediaBox[0 0 612 792]>>endobj\n"
+    b"trailer<</Root 1 0 R>>\n%%EOF\n"
+)
+
+# Snapshot returned by FakeDriver.page_html()
+FAKE_HTML = """<!DOCTYPE html>
+<html><head><title>Purchases</title><script>window.tracking = 1;</script></head>
+<body><h1>Purchase history</h1>
+<table><tr><td>Invoice INV-0001</td><td>15 Jan 2025</td><td>Premium Business</td><td>59.99 EUR</td></tr></table>
+</body></html>
+"""
+
+
+class FakeDriver(BrowserDriver):
+    """Scripted stand-in for Chrome.
+
+    Every transition becomes visible `delays[name]` seconds after the action
+    that triggers it: login, page_load, print_dialog, save_panel, file_write.
+    logged_in=True starts with a live session (as if Chrome kept its cookies);
+    member is who that session belongs to.
+    """
+
+    profile = "fake"
+
+    DEFAULT_DELAYS = {
+        "login": 0.2,
+        "page_load": 0.1,
+        "print_dialog": 0.05,
+        "save_panel": 0.05,
+        "file_write": 0.05,
+    }
+
+    def __init__(self, delays=None, pdf_bytes=FAKE_PDF, html=FAKE_HTML, logged_in=False,
+                 member="https://www.linkedin.com/in/fake-member"):
+        self.member = member
+        self.delays = dict(self.DEFAULT_DELAYS, **(delays or {}))
+        self.pdf_bytes = pdf_bytes
+        self.html = html
+        self.calls = []
+        self._url = ""
+        self._loaded_at = 0.0
+        self._logged_in_at = None
+        self._logged_in = logged_in
+        self._print_at = None
+        self._panel_at = None
+
+    def _after(self, t):
+        return t is not None and time.monotonic() >= t
+
+    def open_login(self):
+        self.calls.append("open_login")
+        self._url = LOGIN_URL
+        self._loaded_at = time.monotonic() + self.delays["page_load"]
+        self._logged_in_at = time.monotonic() + self.delays["login"]
+
+    def current_url(self):
+        if self._url == LOGIN_URL and self._after(self._logged_in_at):
+            self._url = "https://www.linkedin.com/feed/"
+            self._logged_in = True
+        return self._url
+
+    def is_loading(self):
+        return not self._after(self._loaded_at)
+
+    def navigate(self, url):
+        self.calls.append("navigate")
+        self.current_url()  # settles a pending login
+        # Without a session LinkedIn bounces every page to the login form
+        self._url = url if self._logged_in else f"{LOGIN_URL}?session_redirect={url}"
+        self._loaded_at = time.monotonic() + self.delays["page_load"]
+
+    def open_print_dialog(self):
+        self.calls.append("open_print_dialog")
+        self._print_at = time.monotonic() + self.delays["print_dialog"]
+
+    def print_dialog_open(self):
+        return self._after(self._print_at)
+
+    def choose_save_as_pdf(self):
+        self.calls.append("choose_save_as_pdf")
+        self._panel_at = time.monotonic() + self.delays["save_panel"]
+
+    def save_panel_open(self):
+        return self._after(self._panel_at)
+
+    def save_to(self, pdf_path):
+        self.calls.append("save_to")
+        data = self.pdf_bytes
+        timer = threading.Timer(self.delays["file_write"], Path(pdf_path).write_bytes, args=(data,))
+        timer.daemon = True
+        timer.start()
+
+    def page_html(self):
+        self.calls.append("page_html")
+        return self.html if self.page_ready("purchases") else ""
+
+    def identity(self):
+        return self.member if self.is_logged_in() else ""
+
+
+def get_driver(name="applescript"):
+    if name == "fake":
+        return FakeDriver()
+    return AppleScriptDriver()
@@ -0,0 +1,249 @@
+"""
+Headless command line for schedulers (cron, launchd, CI)
+Every subcommand prints JSON lines on stdout: one object per progress event,
+each with an "event" and a "ts" field. Anything else (library log lines) goes
+to stderr. Modules are imported by the subcommand that needs them, so `list`
+doesn't pay for SMTP or PDF libraries.
+
+Usage:
+    python cli.py extract [--account A ...] [--accounts-file accounts.txt] [--renderer chrome] [--incremental]
+    python cli.py list [--account A] [--limit N]
+    python cli.py send --to you@example.com [--account A] [--all | FILE ...] [--zip]
+    python cli.py consolidate 2025-Q1 [--account A]
+    python cli.py sync [--bucket B] [--prefix P] [--endpoint-url URL] [--account A]
+
+accounts.txt: one account per line, or a JSON object per line with
+"account" and any of "renderer", "incremental", "invoices".
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+# Seconds between job status checks while extracting
+POLL_INTERVAL = 0.2
+# Max seconds `send` waits for the outbox to deliver
+SEND_TIMEOUT = 300
+
+# Where JSON lines go (main() points plain stdout at stderr while a command runs)
+_events = None
+
+
+def emit(event, **fields):
+    print(json.dumps(dict(event=event, ts=round(time.time(), 3), **fields), default=str),
+          file=_events or sys.stdout, flush=True)
+
+
+def read_accounts_file(path):
+    """[{"account": ..., **options}] from a plain or JSON-lines accounts file"""
+    jobs = []
+    for line in Path(path).read_text().splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        jobs.append(json.loads(line) if line.startswith("{") else {"account": line})
+    return jobs
+
+
+def cmd_extract(args):
+    from scheduler import DEFAULT_ACCOUNT, FINISHED, JobScheduler
+
+    specs = [{"account": a} for a in args.account or []]
+    if args.accounts_file:
+        specs += read_accounts_file(args.accounts_file)
+    if not specs:
+        specs = [{"account": DEFAULT_ACCOUNT}]
+
+    # Nobody is around to save a PDF by hand - fail instead of waiting for a click
+    extra = ["--no-manual-save"] + (["--fake-driver"] if args.fake_driver else [])
+    scheduler = JobScheduler(max_workers=args.workers, extra_args=extra)
+    jobs = []
+    for spec in specs:
+        job = scheduler.submit(
+            spec["account"], fast_mode=True,
+            renderer=spec.get("renderer", args.renderer),
+            incremental=spec.get("incremental", args.incremental),
+            invoices=spec.get("invoices", args.invoices),
+        )
+        if job not in jobs:
+            jobs.append(job)
+            emit("job_queued", job_id=job.job_id, account=job.account)
+
+    last = {}
+    try:
+        while True:
+            for job in jobs:
+                step = job.load_status().get("step", "")
+                if step and last.get(job.job_id) != step:
+                    last[job.job_id] = step
+                    emit("status", job_id=job.job_id, account=job.account, step=step)
+            if not any(job.active for job in jobs):
+                break
+            time.sleep(POLL_INTERVAL)
+    finally:
+        scheduler.shutdown()
+
+    failed = 0
+    for job in jobs:
+        status = job.load_status()
+        failed += job.state != FINISHED
+        emit("job_done", job_id=job.job_id, account=job.account, state=job.state,
+             returncode=job.returncode, pdf_path=status.get("pdf_path") or None,
+             duration=round((job.finished or time.time()) - job.created, 3))
+    emit("done", jobs=len(jobs), failed=failed)
+    return 1 if failed else 0
+
+
+def cmd_list(args):
+    from pdf_index import PdfIndex
+
+    index = PdfIndex()
+    index.refresh()
+    paths = index.list(account=args.account, limit=args.limit)
+    for path in paths:
+        row = index.get(path)
+        emit("pdf", path=str(path), name=path.name, account=row["account"], size=row["size"],
+             extracted_at=row["extracted_at"], sha256=row["sha256"])
+    emit("done", count=len(paths))
+    return 0
+
+
+def cmd_send(args):
+    from pdf_index import PdfIndex
+
+    if args.files:
+        pdfs = [Path(f) for f in args.files]
+    else:
+        index = PdfIndex()
+        index.refresh()
+        pdfs = index.list(account=args.account, limit=None if args.all else 1)
+    missing = [str(p) for p in pdfs if not p.exists()]
+    if not pdfs or missing:
+        emit("error", message="No PDFs to send" if not pdfs else f"Not found: {', '.join(missing)}")
+        return 2
+
+    import mailer
+    from outbox import FAILED, SENT
+
+    # Only our own messages: the app's outbox (if running) keeps delivering its own
+    outbox = mailer.make_outbox(own_only=True)
+    results = mailer.send_pdfs(outbox, args.to, pdfs, as_zip=args.zip)
+    pending = {}
+    for r in results:
+        emit("queued" if r["msg_id"] else "error", msg_id=r["msg_id"], files=r["files"],
+             size=r["size"], message=r["error"] or None)
+        if r["msg_id"]:
+            pending[r["msg_id"]] = r
+    failed = len(results) - len(pending)
+
+    # The outbox sends from this process - stay until it's done (or give up waiting)
+    deadline = time.monotonic() + args.timeout
+    try:
+        while pending and time.monotonic() < deadline:
+            for msg_id in list(pending):
+                message = outbox.status(msg_id)
+                if message["status"] in (SENT, FAILED):
+                    pending.pop(msg_id)
+                    failed += message["status"] == FAILED
+                    emit(message["status"], msg_id=msg_id, attempts=message["attempts"],
+                         message=message["last_error"] or None)
+            time.sleep(POLL_INTERVAL)
+    finally:
+        outbox.stop()
+    for msg_id in pending:
+        emit("still_queued", msg_id=msg_id)
+    emit("done", emails=len(results), failed=failed, queued=len(pending))
+    return 1 if failed or pending else 0
+
+
+def cmd_consolidate(args):
+    import consolidate
+
+    emit("started", period=args.period, account=args.account)
+    try:
+        stats = consolidate.consolidate_period(args.period, args.account, args.out, args.backend)
+    except consolidate.ConsolidateError as e:
+        emit("error", message=str(e))
+        return 1
+    emit("done", **stats)
+    return 0
+
+
+def cmd_sync(args):
+    import s3_sync
+
+    try:
+        syncer = s3_sync.S3Sync(args.bucket, args.prefix, endpoint_url=args.endpoint_url)
+        stats = syncer.sync(args.account, on_file=lambda path, key, action, error: emit(
+            "file", path=path, key=key, action=action, message=error))
+    except s3_sync.SyncError as e:
+        emit("error", message=str(e))
+        return 2
+    emit("done", **stats)
+    return 1 if stats[s3_sync.FAILED] else 0
+
+
+def build_parser():
+    from html_renderer import PRINT, RENDERERS
+
+    parser = argparse.ArgumentParser(description="LinkedIn Invoice PDF Extractor (headless)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("extract", help="Run extractions (fast mode - no login button)")
+    p.add_argument("--account", action="append", help="Account to extract (repeatable)")
+    p.add_argument("--accounts-file", help="File with one account (or JSON job) per line")
+    p.add_argument("--renderer", choices=RENDERERS, default=PRINT)
+    p.add_argument("--incremental", action="store_true", help="Only record new invoices")
+    p.add_argument("--invoices", action="store_true", help="Also download individual invoice PDFs")
+    p.add_argument("--workers", type=int, default=2,
+                   help="Concurrent extractions (fake driver only - the browser runs one at a time)")
+    p.add_argument("--fake-driver", action="store_true", help="Use the scripted fake browser")
+    p.set_defaults(func=cmd_extract)
+
+    p = sub.add_parser("list", help="List archived PDFs, newest first")
+    p.add_argument("--account")
+    p.add_argument("--limit", type=int)
+    p.set_defaults(func=cmd_list)
+
+    p = sub.add_parser("send", help="Email PDFs (latest by default)")
+    p.add_argument("--to", required=True, help="Recipient address")
+    p.add_argument("--account", help="Pick PDFs from this account")
+    p.add_argument("--all", action="store_true", help="Send all PDFs instead of the latest")
+    p.add_argument("--zip", action="store_true", help="Zip the attachments")
+    p.add_argument("--timeout", type=float, default=SEND_TIMEOUT, help="Max seconds to wait for delivery")
+    p.add_argument("files", nargs="*", help="Specific PDFs to send")
+    p.set_defaults(func=cmd_send)
+
+    p = sub.add_parser("consolidate", help="Merge a period's PDFs into one archive file")
+    p.add_argument("period", help="YYYY, YYYY-Qn or YYYY-MM")
+    p.add_argument("--account")
+    p.add_argument("--out")
+    p.add_argument("--backend", default="auto", help="auto, pypdf or qpdf")
+    p.set_defaults(func=cmd_consolidate)
+
+    p = sub.add_parser("sync", help="Push new/changed PDFs to an S3-compatible bucket")
+    p.add_argument("--bucket", default=os.environ.get("LIE_S3_BUCKET", ""))
+    p.add_argument("--prefix", default=os.environ.get("LIE_S3_PREFIX", ""))
+    p.add_argument("--endpoint-url", default=os.environ.get("LIE_S3_ENDPOINT") or None)
+    p.add_argument("--account")
+    p.set_defaults(func=cmd_sync)
+    return parser
+
+
+def main(argv=None):
+    global _events
+    args = build_parser().parse_args(argv)
+    _events = sys.stdout
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            return args.func(args)
+    finally:
+        _events = None
+
+
+if __name__ == "__main__":
+    sys.exit(main())
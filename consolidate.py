@@ -0,0 +1,209 @@
+"""
+Consolidated archive PDFs
+Merges the archived purchase printouts of a period (e.g. 2025-Q1 or 2025)
+into one document: identical files are skipped, pages repeated across
+overlapping snapshots are kept once, shared fonts/images are stored once and
+content streams are compressed. Inputs are opened one at a time.
+
+Usage: python consolidate.py 2025-Q1 [--account NAME] [--out file.pdf] [--backend pypdf|qpdf]
+"""
+
+import argparse
+import hashlib
+import re
+import shutil
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from pdf_index import PdfIndex
+
+ROOT = Path(__file__).parent
+ARCHIVE_DIR = ROOT / "archives"
+
+PYPDF = "pypdf"
+QPDF = "qpdf"
+AUTO = "auto"
+
+# Merge shared objects after this many inputs so the writer doesn't keep
+# a copy of every input's fonts until the end
+DEDUPE_EVERY = 25
+
+_PERIOD_RE = re.compile(r"^(\d{4})(?:-(?:Q([1-4])|(\d{2})))?$", re.IGNORECASE)
+
+
+class ConsolidateError(Exception):
+    pass
+
+
+def period_range(period):
+    """'2025' / '2025-Q1' / '2025-03' -> (start, end) epoch seconds, end exclusive"""
+    match = _PERIOD_RE.match(period.strip())
+    if not match:
+        raise ConsolidateError(f"Unknown period {period!r} (use YYYY, YYYY-Qn or YYYY-MM)")
+    year, quarter, month = int(match.group(1)), match.group(2), match.group(3)
+    if quarter:
+        first, months = (int(quarter) - 1) * 3 + 1, 3
+    elif month:
+        first, months = int(month), 1
+    else:
+        first, months = 1, 12
+    start = datetime(year, first, 1)
+    end_month = first + months
+    end = datetime(year + (end_month - 1) // 12, (end_month - 1) % 12 + 1, 1)
+    return start.timestamp(), end.timestamp()
+
+
+def select_pdfs(index, start=None, end=None, account=None):
+    """Index rows extracted in [start, end), oldest first"""
+    rows = [index.get(p) for p in index.list(account=account)]
+    rows = [r for r in rows if r and (start is None or r["extracted_at"] >= start)
+            and (end is None or r["extracted_at"] < end)]
+    return sorted(rows, key=lambda r: r["extracted_at"])
+
+
+def _unique_files(rows):
+    """Drop inputs with identical bytes (hard-linked re-extractions)"""
+    seen, files = set(), []
+    for row in rows:
+        if row["sha256"] in seen:
+            continue
+        seen.add(row["sha256"])
+        files.append(Path(row["path"]))
+    return files
+
+
+def _hash_object(obj, h, seen):
+    """Feed a PDF object (following references, streams by content) into h"""
+    from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, StreamObject
+
+    if isinstance(obj, IndirectObject):
+        ref = (obj.idnum, obj.generation)
+        if ref in seen:
+            h.update(f"R{ref}".encode())
+            return
+        seen.add(ref)
+        obj = obj.get_object()
+    if isinstance(obj, StreamObject):
+        h.update(obj.get_data())
+    if isinstance(obj, DictionaryObject):
+        for key, value in sorted(dict.items(obj)):
+            if key != "/Parent":
+                h.update(key.encode())
+                _hash_object(value, h, seen)
+    elif isinstance(obj, ArrayObject):
+        for value in list.__iter__(obj):
+            _hash_object(value, h, seen)
+    else:
+        h.update(repr(obj).encode())
+
+
+def _page_key(page):
+    """Identity of a page's visible content (same page in two snapshots -> same key):
+    content stream, resources (fonts, images, ...) and size"""
+    h = hashlib.sha256()
+    contents = page.get_contents()
+    h.update(contents.get_data() if contents is not None else b"")
+    _hash_object(page.get("/Resources"), h, set())
+    h.update(repr([float(v) for v in page.mediabox]).encode())
+    return h.hexdigest()
+
+
+def consolidate_pypdf(files, out_path):
+    from pypdf import PdfReader, PdfWriter
+
+    writer = PdfWriter()
+    # pypdf >= 4; older versions still merge, just without sharing identical objects
+    dedupe = getattr(writer, "compress_identical_objects", None)
+    seen = set()
+    stats = {"pages": 0, "duplicate_pages": 0}
+    for n, path in enumerate(files, 1):
+        with open(path, "rb") as f:
+            reader = PdfReader(f)
+            for page in reader.pages:
+                key = _page_key(page)
+                if key in seen:
+                    stats["duplicate_pages"] += 1
+                    continue
+                seen.add(key)
+                writer.add_page(page)
+                stats["pages"] += 1
+        if dedupe and n % DEDUPE_EVERY == 0:
+            dedupe(remove_identicals=True, remove_orphans=True)
+    for page in writer.pages:
+        page.compress_content_streams(level=9)
+    if dedupe:
+        dedupe(remove_identicals=True, remove_orphans=True)
+    tmp = out_path.with_name(f".{out_path.name}.tmp")
+    with open(tmp, "wb") as f:
+        writer.write(f)
+    tmp.replace(out_path)
+    return stats
+
+
+def consolidate_qpdf(files, out_path):
+    """qpdf streams inputs from disk; it can't spot repeated pages, only whole files"""
+    qpdf = shutil.which("qpdf")
+    if not qpdf:
+        raise ConsolidateError("Neither pypdf nor qpdf is available (pip install pypdf)")
+    tmp = out_path.with_name(f".{out_path.name}.tmp")
+    cmd = [qpdf, "--empty", "--pages", *[str(p) for p in files], "--",
+           "--object-streams=generate", "--compress-streams=y", "--recompress-flate",
+           "--compression-level=9", "--remove-unreferenced-resources=yes", str(tmp)]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    # Exit code 3 = finished with warnings
+    if result.returncode not in (0, 3):
+        tmp.unlink(missing_ok=True)
+        raise ConsolidateError(f"qpdf failed: {result.stderr.strip()[-300:]}")
+    tmp.replace(out_path)
+    return {"pages": None, "duplicate_pages": None}
+
+
+def consolidate(rows, out_path, backend=AUTO):
+    """Merge the given index rows into out_path. Returns stats."""
+    if not rows:
+        raise ConsolidateError("No PDFs in the selected range")
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    files = _unique_files(rows)
+    if backend == AUTO:
+        try:
+            import pypdf  # noqa: F401
+            backend = PYPDF
+        except ImportError:
+            backend = QPDF
+    if backend == PYPDF:
+        stats = consolidate_pypdf(files, out_path)
+    else:
+        stats = consolidate_qpdf(files, out_path)
+    stats.update(
+        backend=backend, inputs=len(rows), duplicate_files=len(rows) - len(files),
+        input_bytes=sum(r["size"] for r in rows), size=out_path.stat().st_size, path=str(out_path),
+    )
+    return stats
+
+
+def consolidate_period(period, account=None, out_path=None, backend=AUTO, index=None):
+    index = index or PdfIndex()
+    index.refresh()
+    start, end = period_range(period)
+    name = f"LinkedIn_Purchases_{period.upper()}{f'_{account}' if account else ''}.pdf"
+    return consolidate(select_pdfs(index, start, end, account), out_path or ARCHIVE_DIR / name, backend)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge a period's PDFs into one optimized archive file")
+    parser.add_argument("period", help="YYYY, YYYY-Qn or YYYY-MM")
+    parser.add_argument("--account", help="Only this account")
+    parser.add_argument("--out", help="Output file (default archives/LinkedIn_Purchases_<period>.pdf)")
+    parser.add_argument("--backend", choices=[AUTO, PYPDF, QPDF], default=AUTO)
+    args = parser.parse_args()
+    try:
+        stats = consolidate_period(args.period, args.account, args.out, args.backend)
+    except ConsolidateError as e:
+        sys.exit(str(e))
+    print(f"{stats['path']}: {stats['inputs']} PDFs ({stats['duplicate_files']} identical skipped), "
+          f"{stats['input_bytes'] / 1024:.0f} KB -> {stats['size'] / 1024:.0f} KB via {stats['backend']}")
+    if stats["pages"] is not None:
+        print(f"{stats['pages']} pages kept, {stats['duplicate_pages']} duplicate pages dropped")
@@ -0,0 +1,81 @@
+"""
+mtime-keyed memoization for file-backed data
+A cached value is reused while the (mtime, size) of every file it depends on
+is unchanged, so a rerun costs a stat() instead of a read + parse. Cached
+file bytes are bounded by a byte budget; files above a size threshold are
+read every time rather than pinned in memory.
+"""
+
+import copy
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+MAX_ENTRIES = 512
+# Total bytes of cached file contents, and the largest file worth caching
+MAX_BYTES = 64 * 1024 * 1024
+MAX_ITEM_BYTES = 4 * 1024 * 1024
+
+
+def _stamp(paths):
+    stamps = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            stamps.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            stamps.append(None)
+    return tuple(stamps)
+
+
+class MtimeCache:
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES, max_item_bytes=MAX_ITEM_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, paths, loader):
+        """Value for key, reloaded only when one of paths changed on disk.
+        Returns a copy so callers can't mutate the cached value."""
+        stamp = _stamp(paths)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                return copy.copy(entry[1])
+        value = loader()
+        size = len(value) if isinstance(value, bytes) else 0
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (stamp, value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+        return copy.copy(value)
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def read_bytes(self, path):
+        path = Path(path)
+        try:
+            if path.stat().st_size > self.max_item_bytes:
+                return path.read_bytes()
+        except OSError:
+            pass
+        return self.get(("bytes", str(path)), [path], path.read_bytes)
+
+    def invalidate(self, key=None):
+        """Drop one entry (or everything)"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._bytes = 0
+            else:
+                self._pop(key)
@@ -0,0 +1,172 @@
+"""
+HTML -> PDF rendering without the print dialog
+Renders a captured snapshot of the purchases page with headless Chrome
+(--print-to-pdf) or WeasyPrint, writing the PDF straight to its final path.
+
+Usage (e.g. with a saved HTML fixture):
+    python html_renderer.py purchases.html out.pdf [--backend chrome|weasyprint|auto]
+"""
+
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from browser_driver import PURCHASES_URL
+
+PRINT = "print"  # the AppleScript print dialog path (not handled here)
+CHROME = "chrome"
+WEASYPRINT = "weasyprint"
+AUTO = "auto"
+RENDERERS = (PRINT, AUTO, CHROME, WEASYPRINT)
+
+RENDER_TIMEOUT = 60
+
+CHROME_CANDIDATES = (
+    "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+    "/Applications/Chromium.app/Contents/MacOS/Chromium",
+    "google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome",
+)
+
+_SCRIPT_RE = re.compile(r"<script\b[^>]*>.*?</script\s*>", re.IGNORECASE | re.DOTALL)
+_HEAD_RE = re.compile(r"<head\b[^>]*>", re.IGNORECASE)
+
+
+class RenderError(Exception):
+    """No backend could turn the HTML into a PDF"""
+
+
+def find_chrome():
+    """Path of a Chrome/Chromium binary (LIE_CHROME overrides), or None"""
+    override = os.environ.get("LIE_CHROME")
+    if override:
+        return override
+    for candidate in CHROME_CANDIDATES:
+        if os.path.isabs(candidate):
+            if os.path.exists(candidate):
+                return candidate
+        else:
+            found = shutil.which(candidate)
+            if found:
+                return found
+    return None
+
+
+def has_weasyprint():
+    try:
+        import weasyprint  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def available_backends():
+    backends = []
+    if find_chrome():
+        backends.append(CHROME)
+    if has_weasyprint():
+        backends.append(WEASYPRINT)
+    return backends
+
+
+def prepare_html(html, base_url=PURCHASES_URL):
+    """Static snapshot: drop scripts (the DOM is already rendered) and pin a <base>
+    so relative stylesheet/image URLs resolve against the live site"""
+    html = _SCRIPT_RE.sub("", html)
+    if "<base " not in html.lower():
+        base = f'<base href="{base_url}">'
+        html, n = _HEAD_RE.subn(lambda m: m.group(0) + base, html, count=1)
+        if not n:
+            html = base + html
+    return html
+
+
+def _replace_into(tmp, pdf_path):
+    if not tmp.exists() or tmp.stat().st_size == 0:
+        raise RenderError("renderer produced no output")
+    os.replace(tmp, pdf_path)
+
+
+def render_chrome(html, pdf_path, base_url=PURCHASES_URL, chrome=None, timeout=RENDER_TIMEOUT):
+    chrome = chrome or find_chrome()
+    if not chrome:
+        raise RenderError("Chrome/Chromium not found")
+    pdf_path = Path(pdf_path)
+    tmp = pdf_path.with_name(f".{pdf_path.name}.part")
+    with tempfile.TemporaryDirectory() as work:
+        page = Path(work) / "page.html"
+        page.write_text(prepare_html(html, base_url), encoding="utf-8")
+        cmd = [
+            chrome, "--headless=new", "--disable-gpu", "--no-first-run",
+            "--disable-extensions", "--hide-scrollbars",
+            f"--user-data-dir={Path(work) / 'profile'}",
+            "--no-pdf-header-footer",
+            f"--print-to-pdf={tmp}",
+            page.as_uri(),
+        ]
+        if hasattr(os, "geteuid") and os.geteuid() == 0:
+            cmd.insert(1, "--no-sandbox")  # Chrome refuses to run sandboxed as root
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            raise RenderError(f"Chrome did not finish within {timeout}s")
+        except OSError as e:
+            raise RenderError(f"Could not start Chrome: {e}")
+        if result.returncode != 0:
+            raise RenderError(f"Chrome exited with {result.returncode}: {result.stderr.strip()[-200:]}")
+    _replace_into(tmp, pdf_path)
+
+
+def render_weasyprint(html, pdf_path, base_url=PURCHASES_URL):
+    try:
+        import weasyprint
+    except ImportError:
+        raise RenderError("weasyprint is not installed")
+    pdf_path = Path(pdf_path)
+    tmp = pdf_path.with_name(f".{pdf_path.name}.part")
+    try:
+        weasyprint.HTML(string=prepare_html(html, base_url), base_url=base_url).write_pdf(str(tmp))
+    except Exception as e:
+        raise RenderError(f"weasyprint failed: {e}")
+    _replace_into(tmp, pdf_path)
+
+
+def render_html(html, pdf_path, backend=AUTO, base_url=PURCHASES_URL):
+    """Render html to pdf_path. Returns the backend that was used."""
+    if backend == AUTO:
+        backends = available_backends()
+        if not backends:
+            raise RenderError("No HTML renderer available (install Chrome or weasyprint)")
+    else:
+        backends = [backend]
+    errors = []
+    for name in backends:
+        try:
+            if name == CHROME:
+                render_chrome(html, pdf_path, base_url)
+            elif name == WEASYPRINT:
+                render_weasyprint(html, pdf_path, base_url)
+            else:
+                raise RenderError(f"Unknown renderer: {name}")
+            return name
+        except RenderError as e:
+            errors.append(f"{name}: {e}")
+    raise RenderError("; ".join(errors))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render a saved purchases page to PDF")
+    parser.add_argument("html", help="Saved HTML snapshot")
+    parser.add_argument("pdf", help="Output PDF path")
+    parser.add_argument("--backend", choices=[AUTO, CHROME, WEASYPRINT], default=AUTO)
+    parser.add_argument("--base-url", default=PURCHASES_URL)
+    args = parser.parse_args()
+    try:
+        used = render_html(Path(args.html).read_text(encoding="utf-8"), args.pdf, args.backend, args.base_url)
+    except RenderError as e:
+        sys.exit(f"Render failed: {e}")
+    print(f"Rendered {args.pdf} with {used}")
@@ -0,0 +1,176 @@
+"""
+Incremental extraction: per-account watermark + consolidated invoice ledger
+The watermark is the date of the newest invoice already captured for an
+account. After a run only records at or after it that aren't in the ledger
+yet are new - those become the run's delta, and the ledger is the
+consolidated view across all runs.
+
+Usage: python incremental.py [--account NAME] [--csv out.csv]
+"""
+
+import argparse
+import html as html_lib
+import json
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import invoice_parser
+from pdf_index import file_sha256
+
+ROOT = Path(__file__).parent
+LEDGER_FILE = ROOT / "invoice_ledger.sqlite3"
+DELTA_DIR_NAME = "deltas"
+CONSOLIDATED_NAME = "invoices.csv"
+
+
+class ParseFailed(Exception):
+    """The run's PDF couldn't be read - as opposed to having no new invoices"""
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS watermarks (
+    account TEXT PRIMARY KEY,
+    last_date TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS invoices (
+    account TEXT NOT NULL,
+    key TEXT NOT NULL,
+    date TEXT NOT NULL,
+    record TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    PRIMARY KEY (account, key)
+);
+CREATE INDEX IF NOT EXISTS invoices_account_date ON invoices (account, date DESC);
+"""
+
+# Table rows / list items of the captured page, for trimming old purchases
+_ROW_RE = re.compile(r"<(tr|li)\b[^>]*>.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+def record_key(record):
+    """Stable identity of an invoice across runs"""
+    if record.get("invoice_number"):
+        return record["invoice_number"]
+    return "|".join(str(record.get(f) or "") for f in ("date", "product", "amount", "currency"))
+
+
+class Ledger:
+    def __init__(self, db_path=LEDGER_FILE):
+        self.db_path = Path(db_path)
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(str(self.db_path), timeout=10)
+        db.execute("PRAGMA journal_mode=WAL")
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def watermark(self, account):
+        """ISO date of the newest captured invoice, or None before the first run"""
+        with self._connect() as db:
+            row = db.execute("SELECT last_date FROM watermarks WHERE account = ?", (account,)).fetchone()
+        return row[0] if row else None
+
+    def apply(self, account, records):
+        """Add a run's records; returns only the new ones (the delta), oldest first"""
+        now = time.time()
+        with self._connect() as db:
+            row = db.execute("SELECT last_date FROM watermarks WHERE account = ?", (account,)).fetchone()
+            mark = row[0] if row else None
+            candidates = [r for r in records if mark is None or r["date"] >= mark]
+            # Only invoices on/after the watermark can already be known - no full scan
+            known = {k for (k,) in db.execute(
+                "SELECT key FROM invoices WHERE account = ? AND date >= ?", (account, mark or ""))}
+            delta = []
+            for record in sorted(candidates, key=lambda r: r["date"]):
+                key = record_key(record)
+                if key in known:
+                    continue
+                known.add(key)
+                delta.append(record)
+                db.execute("INSERT OR IGNORE INTO invoices VALUES (?, ?, ?, ?, ?)",
+                           (account, key, record["date"], json.dumps(record), now))
+            if delta:
+                newest = max(r["date"] for r in delta)
+                if mark is None or newest > mark:
+                    db.execute("INSERT OR REPLACE INTO watermarks VALUES (?, ?, ?)", (account, newest, now))
+        return delta
+
+    def records(self, account=None):
+        """Consolidated view, newest first"""
+        with self._connect() as db:
+            if account:
+                rows = db.execute("SELECT record FROM invoices WHERE account = ? ORDER BY date DESC", (account,))
+            else:
+                rows = db.execute("SELECT record FROM invoices ORDER BY date DESC")
+            return [json.loads(r) for (r,) in rows]
+
+    def reset(self, account):
+        with self._connect() as db:
+            db.execute("DELETE FROM watermarks WHERE account = ?", (account,))
+            db.execute("DELETE FROM invoices WHERE account = ?", (account,))
+
+
+def trim_html(html, watermark):
+    """Drop table rows/list items dated before the watermark so a rendered
+    PDF only holds the new purchases. Rows without a date are kept."""
+    if not watermark:
+        return html
+
+    def keep(match):
+        text = html_lib.unescape(_TAG_RE.sub(" ", match.group(0)))
+        date, _ = invoice_parser.parse_date(text)
+        return "" if date and date < watermark else match.group(0)
+
+    return _ROW_RE.sub(keep, html)
+
+
+def apply_run(account, pdf_path, ledger=None, index=None):
+    """Parse a freshly saved PDF, record the delta next to it and refresh the
+    account's consolidated CSV. Returns the delta records.
+    Raises ParseFailed (and records nothing) if the PDF couldn't be parsed."""
+    ledger = ledger or Ledger()
+    pdf_path = Path(pdf_path)
+    cache = invoice_parser.InvoiceCache()
+    try:
+        records = invoice_parser.parse_pdfs([pdf_path], cache=cache, index=index)
+    except invoice_parser.NoExtractorError as e:
+        raise ParseFailed(str(e))
+    if not records:
+        row = index.get(pdf_path) if index else None
+        sha = row["sha256"] if row else file_sha256(pdf_path)
+        error = cache.failures([sha]).get(sha)
+        if error:
+            raise ParseFailed(error)
+    delta = ledger.apply(account, records)
+
+    delta_dir = pdf_path.parent / DELTA_DIR_NAME
+    delta_dir.mkdir(exist_ok=True)
+    (delta_dir / f"{pdf_path.stem}.json").write_text(invoice_parser.to_json(delta))
+    (pdf_path.parent / CONSOLIDATED_NAME).write_text(invoice_parser.to_csv(ledger.records(account)))
+    return delta
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show the consolidated invoice ledger")
+    parser.add_argument("--account", help="Only this account")
+    parser.add_argument("--csv", help="Write the consolidated view as CSV")
+    args = parser.parse_args()
+    ledger = Ledger()
+    records = ledger.records(args.account)
+    if args.csv:
+        Path(args.csv).write_text(invoice_parser.to_csv(records))
+    else:
+        if args.account:
+            print(f"Watermark: {ledger.watermark(args.account) or '-'}")
+        print(invoice_parser.to_json(records))
@@ -0,0 +1,303 @@
+"""
+Per-invoice PDF downloader
+Finds the invoice links on the captured purchases page and fetches them on a
+small thread pool. Each worker thread keeps one keep-alive connection per
+host, failed requests are retried with backoff, and every finished file is
+appended to a manifest so an interrupted run only fetches what's missing.
+The session cookies only ever go to https://linkedin.com (and subdomains):
+links to other hosts are ignored, and a redirect off LinkedIn or to plain
+http is followed without them.
+
+Usage:
+    python invoice_downloader.py purchases.html --dest pdfs/acme/invoices [--cookie-file cookies.txt]
+"""
+
+import argparse
+import hashlib
+import http.client
+import json
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urljoin, urlsplit
+
+from browser_driver import PURCHASES_URL
+
+MANIFEST_NAME = ".manifest.jsonl"
+WORKERS = 4
+MAX_ATTEMPTS = 4
+RETRY_BASE = 0.5
+RETRY_MAX = 30
+REQUEST_TIMEOUT = 30
+MAX_REDIRECTS = 5
+CHUNK_SIZE = 64 * 1024
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko)"
+
+# The only host (and its subdomains) invoices are fetched from / cookies are sent to
+LINKEDIN_DOMAIN = "linkedin.com"
+
+# What counts as an invoice link on the purchases page
+INVOICE_LINK_RE = re.compile(r"invoice|receipt|\.pdf(?:$|\?)", re.IGNORECASE)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+DONE = "done"
+FAILED = "failed"
+
+
+class DownloadError(Exception):
+    def __init__(self, message, retry=True, retry_after=None):
+        super().__init__(message)
+        self.retry = retry
+        self.retry_after = retry_after
+
+
+class _LinkParser(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.hrefs = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            href = dict(attrs).get("href")
+            if href:
+                self.hrefs.append(href)
+
+
+def on_domain(url, domain=LINKEDIN_DOMAIN):
+    """Whether url's host is domain or one of its subdomains"""
+    host = (urlsplit(url).hostname or "").lower()
+    return host == domain or host.endswith("." + domain)
+
+
+def find_invoice_links(html, base_url=PURCHASES_URL, domain=LINKEDIN_DOMAIN):
+    """Absolute, de-duplicated invoice URLs on domain, in page order"""
+    parser = _LinkParser()
+    parser.feed(html)
+    links = []
+    for href in parser.hrefs:
+        url = urljoin(base_url, href.strip())
+        if (urlsplit(url).scheme in ("http", "https") and on_domain(url, domain)
+                and INVOICE_LINK_RE.search(url) and url not in links):
+            links.append(url)
+    return links
+
+
+def filename_for(url):
+    """Stable local name for an invoice URL (the same on every run, so resume works)"""
+    parts = urlsplit(url)
+    query = parse_qs(parts.query)
+    ident = next((query[k][0] for k in ("invoiceId", "invoice_id", "id", "orderId") if k in query), None)
+    stem = ident or unquote(parts.path.rstrip("/").rsplit("/", 1)[-1])
+    stem = re.sub(r"[^A-Za-z0-9._-]+", "_", stem).strip("._")
+    if stem.lower().endswith(".pdf"):
+        stem = stem[:-4]
+    if not stem or stem.lower() in ("invoice", "download", "receipt"):
+        stem = hashlib.sha1(url.encode()).hexdigest()[:12]
+    return f"Invoice_{stem}.pdf"
+
+
+class Manifest:
+    """Append-only JSON lines: the last line for a URL wins"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.entries = {}
+        if self.path.exists():
+            for line in self.path.read_text().splitlines():
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn last line from an interrupted run
+                self.entries[entry["url"]] = entry
+
+    def is_done(self, url, dest_dir):
+        entry = self.entries.get(url)
+        return bool(entry and entry["status"] == DONE and (Path(dest_dir) / entry["file"]).exists())
+
+    def record(self, url, **fields):
+        entry = dict(fields, url=url, ts=time.time())
+        with self._lock:
+            self.entries[url] = entry
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+
+
+class Downloader:
+    """Fetches URLs with per-thread keep-alive connections"""
+
+    def __init__(self, cookies="", workers=WORKERS, max_attempts=MAX_ATTEMPTS, timeout=REQUEST_TIMEOUT,
+                 cookie_domain=LINKEDIN_DOMAIN, https_only=True):
+        self.cookies = cookies
+        self.cookie_domain = cookie_domain
+        self.https_only = https_only
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self._local = threading.local()
+        self._all = []
+        self._all_lock = threading.Lock()
+
+    def _connection(self, scheme, netloc):
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = {}
+        key = (scheme, netloc)
+        if key not in conns:
+            cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            conns[key] = cls(netloc, timeout=self.timeout)
+            with self._all_lock:
+                self._all.append(conns[key])
+        return conns[key]
+
+    def _sends_cookies(self, url):
+        if self.https_only and urlsplit(url).scheme != "https":
+            return False
+        return on_domain(url, self.cookie_domain)
+
+    def _drop_connection(self, scheme, netloc):
+        conn = getattr(self._local, "conns", {}).pop((scheme, netloc), None)
+        if conn:
+            conn.close()
+
+    def _fetch_once(self, url, dest):
+        for _ in range(MAX_REDIRECTS + 1):
+            parts = urlsplit(url)
+            path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+            conn = self._connection(parts.scheme, parts.netloc)
+            headers = {"User-Agent": USER_AGENT, "Accept": "application/pdf,*/*"}
+            if self.cookies and self._sends_cookies(url):
+                headers["Cookie"] = self.cookies
+            try:
+                conn.request("GET", path, headers=headers)
+                resp = conn.getresponse()
+            except (OSError, http.client.HTTPException) as e:
+                self._drop_connection(parts.scheme, parts.netloc)
+                raise DownloadError(f"{type(e).__name__}: {e}")
+            if resp.status in (301, 302, 303, 307, 308):
+                resp.read()
+                url = urljoin(url, resp.getheader("Location", ""))
+                if "/login" in url or "/authwall" in url:
+                    raise DownloadError("session expired (redirected to login)", retry=False)
+                continue
+            if resp.status != 200:
+                resp.read()
+                retry_after = resp.getheader("Retry-After")
+                raise DownloadError(
+                    f"HTTP {resp.status}", retry=resp.status in RETRY_STATUSES,
+                    retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+                )
+            tmp = dest.with_name(f".{dest.name}.part")
+            size = 0
+            try:
+                with open(tmp, "wb") as f:
+                    first = resp.read(CHUNK_SIZE)
+                    if not first.startswith(b"%PDF"):
+                        resp.read()
+                        raise DownloadError("response is not a PDF", retry=False)
+                    chunk = first
+                    while chunk:
+                        f.write(chunk)
+                        size += len(chunk)
+                        chunk = resp.read(CHUNK_SIZE)
+            except (OSError, http.client.HTTPException) as e:
+                self._drop_connection(parts.scheme, parts.netloc)
+                tmp.unlink(missing_ok=True)
+                raise DownloadError(f"{type(e).__name__}: {e}")
+            except DownloadError:
+                tmp.unlink(missing_ok=True)
+                raise
+            os.replace(tmp, dest)
+            return size
+        raise DownloadError("too many redirects", retry=False)
+
+    def fetch(self, url, dest):
+        """Download url to dest with retries. Returns (bytes, attempts)."""
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return self._fetch_once(url, dest), attempt
+            except DownloadError as e:
+                if not e.retry or attempt >= self.max_attempts:
+                    e.attempts = attempt
+                    raise
+                delay = e.retry_after or min(RETRY_BASE * 2 ** (attempt - 1), RETRY_MAX)
+                time.sleep(delay * random.uniform(0.8, 1.2))
+
+    def close(self):
+        with self._all_lock:
+            for conn in self._all:
+                conn.close()
+            self._all.clear()
+
+
+def download_invoices(urls, dest_dir, cookies="", workers=WORKERS, on_file=None, downloader=None):
+    """Fetch every URL not already in dest_dir's manifest.
+    on_file(path) is called for each newly downloaded file; if it raises, that
+    file counts as failed and the others carry on.
+    Returns {"downloaded", "skipped", "failed": [(url, error)]}."""
+    dest_dir = Path(dest_dir)
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    manifest = Manifest(dest_dir / MANIFEST_NAME)
+    todo = [u for u in urls if not manifest.is_done(u, dest_dir)]
+    result = {"downloaded": 0, "skipped": len(urls) - len(todo), "failed": []}
+    if not todo:
+        return result
+    downloader = downloader or Downloader(cookies, workers)
+    lock = threading.Lock()
+
+    def failed(url, dest, error, attempts):
+        manifest.record(url, file=dest.name, status=FAILED, error=error, attempts=attempts)
+        with lock:
+            result["failed"].append((url, error))
+
+    def one(url):
+        dest = dest_dir / filename_for(url)
+        try:
+            size, attempts = downloader.fetch(url, dest)
+        except DownloadError as e:
+            failed(url, dest, str(e), getattr(e, "attempts", 1))
+            return
+        except OSError as e:
+            failed(url, dest, f"{type(e).__name__}: {e}", 1)
+            return
+        # A file the caller couldn't take (store full, ...) fails alone - and is fetched again next run
+        if on_file:
+            try:
+                on_file(dest)
+            except Exception as e:
+                failed(url, dest, f"{type(e).__name__}: {e}", attempts)
+                return
+        manifest.record(url, file=dest.name, status=DONE, size=size, attempts=attempts)
+        with lock:
+            result["downloaded"] += 1
+
+    try:
+        with ThreadPoolExecutor(max_workers=min(workers, len(todo)), thread_name_prefix="invoice") as pool:
+            list(pool.map(one, todo))
+    finally:
+        downloader.close()
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download the invoices linked from a saved purchases page")
+    parser.add_argument("html", help="Saved purchases page HTML")
+    parser.add_argument("--dest", required=True, help="Directory for the invoice PDFs")
+    parser.add_argument("--base-url", default=PURCHASES_URL, help="URL the page was saved from")
+    parser.add_argument("--cookie-file", help="File with the Cookie header value of a logged-in session")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    args = parser.parse_args()
+    links = find_invoice_links(Path(args.html).read_text(encoding="utf-8"), args.base_url)
+    cookies = Path(args.cookie_file).read_text().strip() if args.cookie_file else ""
+    summary = download_invoices(links, args.dest, cookies, args.workers)
+    print(f"{len(links)} invoice links: {summary['downloaded']} downloaded, "
+          f"{summary['skipped']} already had, {len(summary['failed'])} failed")
+    for url, error in summary["failed"]:
+        print(f"  {url}: {error}")
@@ -0,0 +1,332 @@
+"""
+Structured invoice extraction from saved PDFs
+Pulls invoice number, date, product, amount, currency and tax out of the
+archived purchase printouts. Results are cached by content hash, so a file
+is only ever parsed once, and big backlogs are parsed on a process pool.
+Files that fail to parse are cached too (as failures, with the error), so
+they aren't retried until the parser version changes; I/O errors and timeouts
+aren't cached and are retried on the next run.
+
+Usage: python invoice_parser.py [--csv out.csv] [--json out.json]
+"""
+
+import argparse
+import csv
+import importlib.util
+import io
+import json
+import os
+import re
+import shutil
+import sqlite3
+import subprocess
+import sys
+import time
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from pdf_index import PdfIndex, file_sha256
+
+ROOT = Path(__file__).parent
+CACHE_FILE = ROOT / "invoice_cache.sqlite3"
+
+# Bump when the parsing rules change so cached results get refreshed
+PARSER_VERSION = 1
+# Below this many files, a process pool costs more than it saves
+POOL_THRESHOLD = 4
+
+# Errors that say nothing about the file's content - not cached as failures
+TRANSIENT_ERRORS = (OSError, subprocess.TimeoutExpired, BrokenExecutor)
+
+FIELDS = ["invoice_number", "date", "product", "amount", "currency", "tax", "source", "sha256"]
+
+CURRENCY_SYMBOLS = {"€": "EUR", "$": "USD", "£": "GBP", "₹": "INR", "¥": "JPY"}
+_CODES = "USD|EUR|GBP|CHF|CAD|AUD|INR|JPY|SEK|NOK|DKK|PLN"
+_NUMBER = r"\d{1,3}(?:[.,\s]\d{3})*(?:[.,]\d{2})?|\d+(?:[.,]\d{2})?"
+AMOUNT_RE = re.compile(
+    rf"(?P<sym>[€$£₹¥])\s?(?P<n1>{_NUMBER})"
+    rf"|(?P<code1>{_CODES})\s?(?P<n2>{_NUMBER})"
+    rf"|(?P<n3>{_NUMBER})\s?(?P<code2>{_CODES}|[€£])"
+)
+TAX_RE = re.compile(r"\b(?:tax|vat|gst|mwst)\b[^\d€$£₹¥]*", re.IGNORECASE)
+INVOICE_RE = re.compile(
+    r"\b(?:invoice|receipt|order|transaction)\s*(?:#|no\.?|number|id)?\s*:?\s*#?\s*(?P<num>[A-Z0-9][A-Z0-9-]{3,})",
+    re.IGNORECASE,
+)
+DATE_PATTERNS = [
+    (re.compile(r"\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.? \d{1,2}, \d{4}\b"), ("%b %d, %Y", "%B %d, %Y")),
+    (re.compile(r"\b\d{1,2} (?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]* \d{4}\b"), ("%d %b %Y", "%d %B %Y")),
+    (re.compile(r"\b\d{4}-\d{2}-\d{2}\b"), ("%Y-%m-%d",)),
+    (re.compile(r"\b\d{1,2}/\d{1,2}/\d{4}\b"), ("%m/%d/%Y", "%d/%m/%Y")),
+]
+PRODUCT_RE = re.compile(
+    r"(Premium(?: Career| Business| Company Page)?|Sales Navigator(?: Core| Advanced(?: Plus)?)?"
+    r"|Recruiter(?: Lite)?|LinkedIn Learning|Job (?:post|posting|slot)s?|Sponsored \w+|Ads?|Promoted \w+)",
+    re.IGNORECASE,
+)
+
+
+class NoExtractorError(RuntimeError):
+    pass
+
+
+def have_extractor():
+    return importlib.util.find_spec("pypdf") is not None or shutil.which("pdftotext") is not None
+
+
+def extract_text(pdf_path):
+    """Text of a PDF via pypdf, falling back to poppler's pdftotext"""
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        PdfReader = None
+    if PdfReader is not None:
+        reader = PdfReader(str(pdf_path))
+        return "\n".join(page.extract_text() or "" for page in reader.pages)
+    if shutil.which("pdftotext"):
+        result = subprocess.run(
+            ["pdftotext", "-layout", str(pdf_path), "-"],
+            capture_output=True, text=True, timeout=60, check=True,
+        )
+        return result.stdout
+    raise NoExtractorError("No PDF text extractor available (pip install pypdf)")
+
+
+def parse_amount(text):
+    """'1,234.56' / '1.234,56' / '59.99' -> float"""
+    text = text.replace(" ", "")
+    if "," in text and "." in text:
+        if text.rfind(",") > text.rfind("."):
+            text = text.replace(".", "").replace(",", ".")
+        else:
+            text = text.replace(",", "")
+    elif "," in text:
+        head, _, tail = text.rpartition(",")
+        text = f"{head.replace(',', '')}.{tail}" if len(tail) == 2 else text.replace(",", "")
+    return float(text)
+
+
+def _money(match):
+    number = match.group("n1") or match.group("n2") or match.group("n3")
+    code = match.group("code1") or match.group("code2") or match.group("sym")
+    return parse_amount(number), CURRENCY_SYMBOLS.get(code, code)
+
+
+def parse_date(line):
+    for pattern, formats in DATE_PATTERNS:
+        match = pattern.search(line)
+        if not match:
+            continue
+        raw = match.group(0).replace(".", "")
+        for fmt in formats:
+            try:
+                return datetime.strptime(raw, fmt).date().isoformat(), match
+            except ValueError:
+                continue
+    return None, None
+
+
+def parse_records(text):
+    """Split the page text into one block per dated line and pull fields out of each"""
+    blocks = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        date, _ = parse_date(line)
+        if date or not blocks:
+            blocks.append({"date": date, "lines": [line]})
+        else:
+            blocks[-1]["lines"].append(line)
+
+    records = []
+    for block in blocks:
+        if not block["date"]:
+            continue
+        record = dict.fromkeys(FIELDS)
+        record["date"] = block["date"]
+        for line in block["lines"]:
+            # Anything after a tax label is the tax, not the invoice amount
+            amount_part = line
+            tax_match = TAX_RE.search(line)
+            if tax_match:
+                amount_part = line[:tax_match.start()]
+                money = AMOUNT_RE.search(line, tax_match.end())
+                if money and record["tax"] is None:
+                    record["tax"] = _money(money)[0]
+            _, date_match = parse_date(amount_part)
+            if date_match:
+                # Keep the year from being read as an amount
+                amount_part = amount_part.replace(date_match.group(0), " ")
+            if record["amount"] is None:
+                money = AMOUNT_RE.search(amount_part)
+                if money:
+                    record["amount"], record["currency"] = _money(money)
+            if record["invoice_number"] is None:
+                inv = INVOICE_RE.search(line)
+                if inv:
+                    record["invoice_number"] = inv.group("num")
+            if record["product"] is None:
+                product = PRODUCT_RE.search(line)
+                if product:
+                    record["product"] = product.group(0)
+        if record["amount"] is not None:
+            records.append(record)
+    return records
+
+
+def parse_pdf(pdf_path):
+    """Records from one PDF (top-level so it can run in a worker process)"""
+    return parse_records(extract_text(pdf_path))
+
+
+class InvoiceCache:
+    """Parsed records keyed by (content hash, parser version)"""
+
+    def __init__(self, db_path=CACHE_FILE):
+        self.db_path = Path(db_path)
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS parsed ("
+                " sha256 TEXT NOT NULL, version INTEGER NOT NULL,"
+                " records TEXT NOT NULL, parsed_at REAL NOT NULL, error TEXT,"
+                " PRIMARY KEY (sha256, version))"
+            )
+            columns = {row[1] for row in db.execute("PRAGMA table_info(parsed)")}
+            if "error" not in columns:
+                db.execute("ALTER TABLE parsed ADD COLUMN error TEXT")
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(str(self.db_path), timeout=10)
+        db.execute("PRAGMA journal_mode=WAL")
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def get_many(self, hashes):
+        """{sha256: records} for cached hashes (failures have no records)"""
+        found = {}
+        hashes = list(hashes)
+        with self._connect() as db:
+            for i in range(0, len(hashes), 500):
+                chunk = hashes[i:i + 500]
+                rows = db.execute(
+                    f"SELECT sha256, records FROM parsed WHERE version = ? AND sha256 IN ({','.join('?' * len(chunk))})",
+                    [PARSER_VERSION] + chunk,
+                )
+                found.update((sha, json.loads(records)) for sha, records in rows)
+        return found
+
+    def failures(self, hashes):
+        """{sha256: error} for the hashes that failed to parse"""
+        hashes = list(hashes)
+        found = {}
+        with self._connect() as db:
+            for i in range(0, len(hashes), 500):
+                chunk = hashes[i:i + 500]
+                rows = db.execute(
+                    "SELECT sha256, error FROM parsed WHERE version = ? AND error IS NOT NULL"
+                    f" AND sha256 IN ({','.join('?' * len(chunk))})",
+                    [PARSER_VERSION] + chunk,
+                )
+                found.update(rows)
+        return found
+
+    def put(self, sha256, records, error=None):
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO parsed VALUES (?, ?, ?, ?, ?)",
+                (sha256, PARSER_VERSION, json.dumps(records), time.time(), error),
+            )
+
+
+def parse_pdfs(pdfs, cache=None, index=None, max_workers=None):
+    """Records for the given PDFs, parsing only files whose content isn't cached yet.
+    Raises NoExtractorError (before parsing anything) if nothing can read PDFs."""
+    cache = cache or InvoiceCache()
+    hashes = {}
+    for pdf in pdfs:
+        row = index.get(pdf) if index else None
+        hashes[Path(pdf)] = row["sha256"] if row else file_sha256(pdf)
+
+    cached = cache.get_many(set(hashes.values()))
+    todo = {}
+    for pdf, sha in hashes.items():
+        if sha not in cached and sha not in todo:
+            todo[sha] = pdf
+
+    if todo:
+        if not have_extractor():
+            raise NoExtractorError("No PDF text extractor available (pip install pypdf)")
+        items = list(todo.items())
+        if len(items) >= POOL_THRESHOLD:
+            with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as pool:
+                futures = [(sha, pool.submit(parse_pdf, pdf)) for sha, pdf in items]
+                results = [(sha, _result(f, todo[sha])) for sha, f in futures]
+        else:
+            results = [(sha, _result(None, pdf)) for sha, pdf in items]
+        for sha, (records, error) in results:
+            if records is None and error is None:
+                continue  # transient - try again next time
+            cache.put(sha, records or [], error)
+            cached[sha] = records or []
+
+    out = []
+    for pdf, sha in hashes.items():
+        for record in cached.get(sha, []):
+            out.append(dict(record, source=pdf.name, sha256=sha))
+    return out
+
+
+def _result(future, pdf):
+    """(records, None), (None, error) if the file couldn't be parsed,
+    or (None, None) if reading it failed for reasons worth retrying"""
+    try:
+        return (future.result() if future else parse_pdf(pdf)), None
+    except TRANSIENT_ERRORS as e:
+        print(f"[PARSE] {pdf}: {e} (will retry)")
+        return None, None
+    except Exception as e:
+        print(f"[PARSE] {pdf}: {e}")
+        return None, f"{type(e).__name__}: {e}"
+
+
+def get_invoices(index=None):
+    """Invoice records for every PDF in the library, newest file first"""
+    index = index or PdfIndex()
+    index.refresh()
+    return parse_pdfs(index.list(), index=index)
+
+
+def to_csv(records):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    writer.writerows(records)
+    return buf.getvalue()
+
+
+def to_json(records):
+    return json.dumps(records, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract invoice records from the PDF archive")
+    parser.add_argument("--csv", help="Write records as CSV")
+    parser.add_argument("--json", help="Write records as JSON")
+    args = parser.parse_args()
+    try:
+        records = get_invoices()
+    except NoExtractorError as e:
+        sys.exit(str(e))
+    if args.csv:
+        Path(args.csv).write_text(to_csv(records))
+    if args.json:
+        Path(args.json).write_text(to_json(records))
+    if not args.csv and not args.json:
+        print(to_json(records))
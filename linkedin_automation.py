@@ -3,235 +3,350 @@ LinkedIn Invoice PDF Extractor
 YOU only login - script does EVERYTHING else using AppleScript to control Chrome!
 """
 
-import json
+import argparse
 import time
-import subprocess
-import shutil
-import sys
 from pathlib import Path
 from datetime import datetime
 
+import incremental
+import pdf_store
+import session_cache
+import state_store
+from html_renderer import PRINT, RENDERERS, RenderError, render_html
+from invoice_downloader import download_invoices, find_invoice_links
+from pdf_index import DEFAULT_ACCOUNT, INDEX_FILE, PdfIndex
+from pdf_watcher import PdfWatcher
+from run_log import EVENTS_FILE, RunLog
+from browser_driver import LOGIN_MARKERS, PURCHASES_URL, get_driver
+from step_engine import Step, StepEngine, StepTimeout
+from status_channel import STATUS, STATUS_SOCKET, SignalReceiver, make_event, send_event, signal_socket_path
+
 ROOT = Path(__file__).parent
-STATUS_FILE = ROOT / "status.json"
+STATE_FILE = state_store.STATE_FILE
 SIGNAL_FILE = ROOT / "continue_signal.txt"
 PDF_DIR = ROOT / "pdfs"
+# Library-wide locations (shared by all jobs)
+PDF_ROOT = ROOT / "pdfs"
+BLOB_DIR = pdf_store.BLOB_DIR
+RUN_LOG_FILE = EVENTS_FILE
+LEDGER_FILE = incremental.LEDGER_FILE
+# Session cookies for invoice downloads when the browser can't hand them over
+COOKIE_FILE = ROOT / "cookies.txt"
+SESSION_FILE = session_cache.SESSION_FILE
+KEY_FILE = session_cache.KEY_FILE
+
+# Per-step deadlines (seconds) - steps finish as soon as they're ready
+FAST_LOGIN_TIMEOUT = 10
+LOGIN_TIMEOUT = 300
+PAGE_TIMEOUT = 30
+DIALOG_TIMEOUT = 10
+PDF_TIMEOUT = 15
+MANUAL_SAVE_TIMEOUT = 120
+
+JOB_ID = None
+
+_signal_receiver = None
+
+_state = None
+
+def configure(job_id=None, job_dir=None, pdf_dir=None, state_file=None):
+    """Point this process at a job's own status record and output directory"""
+    global JOB_ID, SIGNAL_FILE, PDF_DIR, STATE_FILE, _state, _signal_receiver
+    JOB_ID = job_id
+    # A long-lived worker runs many jobs - release the previous job's signal socket
+    if _signal_receiver is not None:
+        _signal_receiver.close()
+        _signal_receiver = None
+    if job_dir:
+        job_dir = Path(job_dir)
+        job_dir.mkdir(parents=True, exist_ok=True)
+        SIGNAL_FILE = job_dir / "continue_signal.txt"
+    if pdf_dir:
+        PDF_DIR = Path(pdf_dir)
+    if state_file:
+        STATE_FILE = Path(state_file)
+    _state = None
+
+def get_state():
+    global _state
+    if _state is None or _state.db_path != Path(STATE_FILE):
+        _state = state_store.StateStore(STATE_FILE)
+    return _state
+
+def run_key():
+    return JOB_ID or state_store.MAIN_RUN
 
 def update_status(step, waiting=False, button_text="", pdf_path=""):
     print(f"[STATUS] {step}")
-    STATUS_FILE.write_text(json.dumps({
-        "step": step,
-        "waiting": waiting,
-        "button_text": button_text,
-        "pdf_path": pdf_path
-    }))
+    # The state store is the source of truth (and the fallback), the event just wakes the UI
+    get_state().set_status(run_key(), step, waiting, button_text, pdf_path, account=current_account())
+    send_event(STATUS_SOCKET, make_event(
+        STATUS, step=step, waiting=waiting, button_text=button_text, pdf_path=pdf_path, job_id=JOB_ID
+    ))
+
+def get_signal_receiver():
+    """Bind the signal socket once per process, before the UI can show the button"""
+    global _signal_receiver
+    if _signal_receiver is None:
+        _signal_receiver = SignalReceiver(SIGNAL_FILE, signal_socket_path(JOB_ID))
+    return _signal_receiver
 
 def wait_for_user_signal(timeout=300):
-    start = time.time()
-    while time.time() - start < timeout:
-        if SIGNAL_FILE.exists():
-            SIGNAL_FILE.unlink()
+    return get_signal_receiver().wait(timeout)
+
+def current_account():
+    """Account this run extracts for (pdfs/<account>/, or the library root)"""
+    try:
+        parts = PDF_DIR.relative_to(PDF_ROOT).parts
+    except ValueError:
+        return PDF_DIR.name
+    return parts[0] if parts else DEFAULT_ACCOUNT
+
+def record_pdf(path):
+    """Add a saved PDF to the library index so the app sees it without a rescan"""
+    try:
+        PdfIndex(PDF_ROOT, INDEX_FILE).add(path, extracted_at=time.time())
+    except Exception as e:
+        print(f"[INDEX] Could not index {path}: {e}")
+
+def store_pdf(src, dest, move=None):
+    """Ingest into the content store (moving files we own, cloning/copying others)"""
+    if move is None:
+        move = src.parent == PDF_DIR
+    dest, digest, method = pdf_store.ingest(src, dest, move=move, blob_dir=BLOB_DIR)
+    print(f"[STORE] {dest.name} -> {digest[:12]} ({method})")
+    record_pdf(dest)
+    return dest
+
+def session_cookies(driver, cached=""):
+    parts = [driver.cookie_header(), cached]
+    if COOKIE_FILE.exists():
+        parts.append(COOKIE_FILE.read_text().strip())
+    return "; ".join(p for p in parts if p)
+
+def resume_session(driver, cache, engine, found):
+    """Reuse a cached login: open the purchases page directly and see whether
+    LinkedIn still lets us in - as the member the session was saved for.
+    Returns True if the login steps can be skipped."""
+    account = current_account()
+    session = cache.load(account)
+    if not session or session.get("profile") != driver.profile:
+        return False
+    bounced = lambda: any(m in driver.current_url() for m in LOGIN_MARKERS)
+    engine.run_step(Step(
+        "resume_session", action=lambda: driver.navigate(PURCHASES_URL),
+        ready=lambda: driver.page_ready("purchases") or bounced(),
+        timeout=PAGE_TIMEOUT, required=False, status="Checking saved session...",
+    ))
+    if driver.page_ready("purchases") and driver.is_logged_in():
+        identity = driver.identity()
+        if identity and identity == session.get("identity"):
+            found["cookies"] = session.get("cookies", "")
+            print("[SESSION] Saved session still valid - skipping login")
             return True
-        time.sleep(1)
+        print(f"[SESSION] Browser is logged in as {identity or 'an unknown member'}, "
+              f"not {session.get('identity') or 'the saved member'} - logging in")
+    else:
+        print("[SESSION] Saved session expired - logging in")
+    cache.clear(account)
     return False
 
-def run_applescript(script):
-    """Run AppleScript to control Chrome"""
-    result = subprocess.run(
-        ["osascript", "-e", script],
-        capture_output=True,
-        text=True
+def remember_session(driver, cache):
+    if driver.is_logged_in():
+        identity = driver.identity()
+        if not identity:
+            # Chrome only runs our JavaScript with View > Developer > "Allow JavaScript from Apple Events"
+            print("[SESSION] Can't tell who is logged in (enable Chrome's \"Allow JavaScript from "
+                  "Apple Events\") - the next run will log in again")
+        cache.save(current_account(), cookies=session_cookies(driver), profile=driver.profile,
+                   identity=identity)
+
+def fetch_invoices(driver, found):
+    """Download the individual invoice PDFs linked from the purchases page"""
+    links = find_invoice_links(driver.page_html())
+    if not links:
+        print("[INVOICES] No invoice links on the page")
+        found["invoices"] = None
+        return
+    result = download_invoices(
+        links, PDF_DIR / "invoices", session_cookies(driver, found.get("cookies", "")),
+        on_file=lambda path: store_pdf(path, path, move=True),
     )
-    return result.stdout.strip()
+    print(f"[INVOICES] {len(links)} links: {result['downloaded']} downloaded, "
+          f"{result['skipped']} already had, {len(result['failed'])} failed")
+    for url, error in result["failed"]:
+        print(f"[INVOICES] {url}: {error}")
+    found["invoices"] = result
 
-def run_automation(fast_mode=False):
-    PDF_DIR.mkdir(exist_ok=True)
-    
-    if STATUS_FILE.exists():
-        STATUS_FILE.unlink()
-    if SIGNAL_FILE.exists():
-        SIGNAL_FILE.unlink()
-    
-    # STEP 1: Open LinkedIn login in Chrome
-    update_status("Opening LinkedIn in Chrome...")
-    
-    run_applescript('''
-        tell application "Google Chrome"
-            activate
-            open location "https://www.linkedin.com/login"
-        end tell
-    ''')
-    
+def login_steps(driver, fast_mode, found):
+    """Open LinkedIn, wait for the user to log in, go to the purchases page"""
+    steps = [
+        Step("open_login", action=driver.open_login,
+             ready=lambda: not driver.is_loading(), timeout=PAGE_TIMEOUT, required=False,
+             status="Opening LinkedIn in Chrome..."),
+    ]
     if fast_mode:
-        # Fast mode: assume user is already logged in or will be quickly
-        update_status("⚡ Fast Mode: Waiting 10 seconds for login...")
-        time.sleep(10)  # Give user 10 seconds to login
+        # Fast mode: carry on as soon as we see a logged-in page (or after the window)
+        steps.append(Step("login", ready=driver.is_logged_in, timeout=FAST_LOGIN_TIMEOUT,
+                          required=False,
+                          status=f"⚡ Fast Mode: Waiting up to {FAST_LOGIN_TIMEOUT} seconds for login..."))
     else:
-        # Normal mode: wait for user confirmation
-        time.sleep(3)
-        
-        # STEP 2: Wait for user to login (ONLY thing user does!)
-        update_status(
-            "Log in with fingerprint/saved password. Click button when you're logged in.",
-            waiting=True,
-            button_text="I'm logged in ✅"
-        )
-        
-        if not wait_for_user_signal(timeout=300):
-            update_status("Error: Timeout waiting for login")
-            return
-        
-        time.sleep(2)
-    
-    # STEP 3: Navigate to purchases page (AUTOMATIC!)
-    update_status("Navigating to purchases page...")
-    
-    # Find LinkedIn tab, switch to it, use Command+L to select URL bar, type new URL
-    run_applescript('''
-        tell application "Google Chrome"
-            -- Find the LinkedIn tab
-            repeat with w in windows
-                set tabIndex to 1
-                repeat with t in tabs of w
-                    if URL of t contains "linkedin.com" then
-                        -- Switch to this window and tab
-                        set index of w to 1
-                        set active tab index of w to tabIndex
-                        activate
-                        delay 1
-                        
-                        -- Use Command+L to select URL bar (not Ctrl+F!)
-                        tell application "System Events"
-                            keystroke "l" using command down
-                            delay 0.5
-                            -- Type the new URL
-                            keystroke "https://www.linkedin.com/manage/purchases-payments/purchases/"
-                            delay 0.3
-                            -- Press Enter to navigate
-                            keystroke return
-                        end tell
-                        return
-                    end if
-                    set tabIndex to tabIndex + 1
-                end repeat
-            end repeat
-        end tell
-    ''')
-    
-    time.sleep(5)
+        # Normal mode: wait for user confirmation (ONLY thing user does!)
+        def wait_login():
+            update_status(
+                "Log in with fingerprint/saved password. Click button when you're logged in.",
+                waiting=True,
+                button_text="I'm logged in ✅"
+            )
+            found["signal"] = wait_for_user_signal(timeout=LOGIN_TIMEOUT)
+        steps.append(Step("login", action=wait_login, ready=lambda: found.get("signal"), timeout=0))
+    steps.append(
+        Step("navigate", action=lambda: driver.navigate(PURCHASES_URL),
+             ready=lambda: driver.page_ready("purchases"), timeout=PAGE_TIMEOUT, required=False,
+             status="Navigating to purchases page..."),
+    )
+    return steps
+
+def build_steps(driver, fast_mode, pdf_path, watch_dirs, found, renderer=PRINT, watermark=None,
+                invoices=False, resumed=False):
+    """The extraction flow as a list of readiness-driven steps.
+    renderer=PRINT drives Chrome's print dialog, anything else renders the
+    captured page HTML directly (see html_renderer) - trimmed to purchases
+    since the watermark when one is given. invoices=True also downloads the
+    individual invoice PDFs. resumed=True (a cached session already got us
+    to the purchases page) skips login and navigation."""
+    def save():
+        # Arm the watcher before the save so the new file can't slip past it
+        found["watcher"] = PdfWatcher(watch_dirs)
+        driver.save_to(pdf_path)
+
+    def locate_pdf():
+        found["pdf"] = found["watcher"].poll()
+        return found["pdf"] is not None
+
+    steps = []
+    if not resumed:
+        steps += login_steps(driver, fast_mode, found)
+    if invoices:
+        steps.append(Step("download_invoices", action=lambda: fetch_invoices(driver, found),
+                          required=False, status="Downloading invoices..."))
+    if renderer != PRINT:
+        def capture_html():
+            found["html"] = driver.page_html()
+            return bool(found["html"])
+
+        def render():
+            html = incremental.trim_html(found.get("html") or "", watermark)
+            try:
+                used = render_html(html, pdf_path, backend=renderer)
+                print(f"[RENDER] {pdf_path.name} via {used}")
+            except RenderError as e:
+                print(f"[RENDER] Failed: {e}")
+                # The manual fallback will ask the user to save it - catch that file
+                found["watcher"] = PdfWatcher(watch_dirs)
+
+        return steps + [
+            Step("capture_html", ready=capture_html, timeout=PAGE_TIMEOUT, required=False,
+                 status="Capturing purchases page..."),
+            Step("render_pdf", action=render, ready=pdf_path.exists, timeout=0, required=False,
+                 status="Rendering PDF..."),
+        ]
+    steps += [
+        Step("print_dialog", action=driver.open_print_dialog,
+             ready=driver.print_dialog_open, timeout=DIALOG_TIMEOUT, required=False,
+             status="Saving page as PDF..."),
+        Step("save_panel", action=driver.choose_save_as_pdf,
+             ready=driver.save_panel_open, timeout=DIALOG_TIMEOUT, required=False),
+        Step("save", action=save),
+        Step("locate_pdf", ready=locate_pdf, timeout=PDF_TIMEOUT, required=False,
+             status="Looking for saved PDF..."),
+    ]
+    return steps
+
+def run_automation(fast_mode=False, driver=None, renderer=PRINT, incremental_mode=False, invoices=False,
+                   use_session=True, manual_save=True):
+    PDF_DIR.mkdir(parents=True, exist_ok=True)
+    driver = driver or get_driver()
     
-    # STEP 4: Save as PDF using AppleScript (AUTOMATIC!)
-    update_status("Saving page as PDF...")
+    get_state().clear_status(run_key())
+    if SIGNAL_FILE.exists():
+        SIGNAL_FILE.unlink()
+    get_signal_receiver()
     
     # Create unique filename
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     pdf_name = f"LinkedIn_Purchases_{timestamp}.pdf"
     pdf_path = PDF_DIR / pdf_name
     
-    # Click on page first to dismiss any search bar, then Command+P
-    run_applescript('''
-        tell application "Google Chrome"
-            repeat with w in windows
-                set tabIndex to 1
-                repeat with t in tabs of w
-                    if URL of t contains "linkedin.com" then
-                        -- Switch to LinkedIn tab
-                        set index of w to 1
-                        set active tab index of w to tabIndex
-                        activate
-                        delay 1
-                        
-                        tell application "System Events"
-                            -- Press Escape to close any search bar/popup
-                            key code 53
-                            delay 0.5
-                            
-                            -- Click in the middle of the page to focus it
-                            tell process "Google Chrome"
-                                click at {640, 400}
-                            end tell
-                            delay 0.5
-                            
-                            -- Press Escape again just to be safe
-                            key code 53
-                            delay 0.5
-                            
-                            -- Now Command+P to print
-                            keystroke "p" using command down
-                        end tell
-                        return
-                    end if
-                    set tabIndex to tabIndex + 1
-                end repeat
-            end repeat
-        end tell
-    ''')
-    
-    time.sleep(2)
-    
-    # Click on the PDF dropdown and select "Save as PDF"
-    # Then save to our folder
-    run_applescript(f'''
-        tell application "System Events"
-            tell process "Google Chrome"
-                -- Wait for print dialog
-                delay 1
-                
-                -- Click the destination dropdown (usually shows "Save as PDF")
-                -- Try to find and click Save as PDF option
-                try
-                    click pop up button 1 of sheet 1 of window 1
-                    delay 0.5
-                    click menu item "Save as PDF" of menu 1 of pop up button 1 of sheet 1 of window 1
-                    delay 0.5
-                end try
-                
-                -- Click Save button
-                delay 1
-                keystroke return
-                delay 1
-                
-                -- Type the filename
-                keystroke "g" using {{command down, shift down}}
-                delay 0.5
-                keystroke "{pdf_path}"
-                delay 0.5
-                keystroke return
-                delay 0.5
-                keystroke return
-            end tell
-        end tell
-    ''')
-    
-    time.sleep(3)
-    
-    # Alternative: Check Desktop for recent PDF
-    update_status("Looking for saved PDF...")
-    
     desktop = Path.home() / "Desktop"
     downloads = Path.home() / "Downloads"
+    found = {}
+    ledger = incremental.Ledger(LEDGER_FILE) if incremental_mode else None
+    watermark = ledger.watermark(current_account()) if ledger else None
     
-    # Wait a bit for file to be saved
-    time.sleep(2)
-    
-    # Look for recent PDFs
-    found_pdf = None
-    for folder in [desktop, downloads, PDF_DIR]:
-        if folder.exists():
-            pdfs = list(folder.glob("*.pdf"))
-            if pdfs:
-                recent = max(pdfs, key=lambda p: p.stat().st_mtime)
-                # Check if it's recent (last 60 seconds)
-                if time.time() - recent.stat().st_mtime < 60:
-                    found_pdf = recent
-                    break
+    run_log = RunLog(path=RUN_LOG_FILE, job_id=JOB_ID, mode="fast" if fast_mode else "validate",
+                     renderer=renderer, incremental=incremental_mode, invoices=invoices, pdf_name=pdf_name)
+    engine = StepEngine(on_status=update_status, run_log=run_log)
+    outcome = "error"
+    sessions = session_cache.SessionCache(SESSION_FILE, KEY_FILE) if use_session else None
+    try:
+        resumed = bool(sessions) and resume_session(driver, sessions, engine, found)
+        run_log.emit("session", resumed=resumed)
+        steps = build_steps(driver, fast_mode, pdf_path, [desktop, downloads, PDF_DIR], found,
+                            renderer, watermark, invoices, resumed)
+        if sessions and not resumed:
+            # Remember the login as soon as it worked, even if a later step fails
+            steps.insert(next(i for i, step in enumerate(steps) if step.name == "navigate") + 1,
+                         Step("remember_session", action=lambda: remember_session(driver, sessions)))
+        engine.run(steps)
+        with run_log.span("finish"):
+            outcome = finish_pdf(found, pdf_name, ledger, manual_save)
+    except StepTimeout as e:
+        outcome = "timeout"
+        if e.step.name == "login":
+            update_status("Error: Timeout waiting for login")
+        else:
+            update_status(f"Error: {e}")
+    finally:
+        run_log.end(outcome)
+        print("[TIMING] " + ", ".join(f"{name}={secs:.2f}s" for name, secs, _ in engine.timings))
+        if found.get("watcher"):
+            found["watcher"].close()
+
+def apply_delta(dest, ledger):
+    """Incremental mode: record the run's new invoices. Returns the status suffix."""
+    if ledger is None:
+        return ""
+    try:
+        delta = incremental.apply_run(current_account(), dest, ledger)
+    except incremental.ParseFailed as e:
+        print(f"[INCREMENTAL] Could not parse {dest.name}: {e}")
+        return " (could not parse invoices - ledger not updated)"
+    except Exception as e:
+        print(f"[INCREMENTAL] Could not update ledger: {e}")
+        return " (ledger not updated)"
+    print(f"[INCREMENTAL] {len(delta)} new invoice(s)")
+    return f" ({len(delta)} new invoice{'' if len(delta) == 1 else 's'})"
+
+def finish_pdf(found, pdf_name, ledger=None, manual_save=True):
+    """Move the detected PDF into place, or ask the user to save it by hand
+    (unattended runs, manual_save=False, fail right away instead).
+    Returns the run outcome: "saved", "saved_manual", "not_found" or "timeout"."""
+    pdf_path = PDF_DIR / pdf_name
     
-    if found_pdf and found_pdf.parent != PDF_DIR:
-        # Copy to our folder
-        dest = PDF_DIR / pdf_name
-        shutil.copy(found_pdf, dest)
-        update_status(f"Done! Saved: {pdf_name}", pdf_path=str(dest))
-    elif (PDF_DIR / pdf_name).exists():
-        update_status(f"Done! Saved: {pdf_name}", pdf_path=str(PDF_DIR / pdf_name))
+    found_pdf = found.get("pdf")
+    if found_pdf and found_pdf != pdf_path:
+        # Bring it into our folder
+        dest = store_pdf(found_pdf, PDF_DIR / pdf_name)
+        update_status(f"Done! Saved: {pdf_name}{apply_delta(dest, ledger)}", pdf_path=str(dest))
+        return "saved"
+    elif pdf_path.exists():
+        store_pdf(pdf_path, pdf_path)
+        update_status(f"Done! Saved: {pdf_name}{apply_delta(pdf_path, ledger)}", pdf_path=str(pdf_path))
+        return "saved"
+    elif not manual_save:
+        update_status("Error: No PDF was saved (nobody to save it by hand in an unattended run)")
+        return "not_found"
     else:
         # Manual fallback
         update_status(
@@ -240,23 +355,44 @@ def run_automation(fast_mode=False):
             button_text="I saved the PDF ✅"
         )
         
-        if wait_for_user_signal(timeout=120):
-            # Find the PDF
-            for folder in [desktop, downloads]:
-                pdfs = list(folder.glob("*.pdf"))
-                if pdfs:
-                    recent = max(pdfs, key=lambda p: p.stat().st_mtime)
-                    if time.time() - recent.stat().st_mtime < 120:
-                        dest = PDF_DIR / pdf_name
-                        shutil.copy(recent, dest)
-                        update_status(f"Done! Saved: {pdf_name}", pdf_path=str(dest))
-                        return
+        if wait_for_user_signal(timeout=MANUAL_SAVE_TIMEOUT):
+            # The watcher is still armed - it saw the file if it was saved
+            recent = found["watcher"].wait(timeout=5) if found.get("watcher") else None
+            if recent:
+                dest = store_pdf(recent, PDF_DIR / pdf_name)
+                update_status(f"Done! Saved: {pdf_name}{apply_delta(dest, ledger)}", pdf_path=str(dest))
+                return "saved_manual"
             
             update_status("Done! Check your Desktop for the PDF.")
+            return "not_found"
         else:
             update_status("Timeout. Check Desktop for the PDF.")
+            return "timeout"
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Extract LinkedIn purchases as PDF")
+    parser.add_argument("--fast", action="store_true", help="Don't wait for the login button")
+    parser.add_argument("--fake-driver", action="store_true", help="Run against the scripted fake browser")
+    parser.add_argument("--job-id", help="Job ID (set by the scheduler)")
+    parser.add_argument("--job-dir", help="Directory for this job's status record")
+    parser.add_argument("--pdf-dir", help="Output directory for the PDF")
+    parser.add_argument("--state-file", help="Run state database (default state.sqlite3)")
+    parser.add_argument("--renderer", choices=RENDERERS, default=PRINT,
+                        help="print = Chrome's print dialog, otherwise render the page HTML directly")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only record invoices newer than this account's watermark")
+    parser.add_argument("--invoices", action="store_true",
+                        help="Also download each invoice PDF linked from the purchases page")
+    parser.add_argument("--no-session", action="store_true",
+                        help="Ignore the saved login session and log in again")
+    parser.add_argument("--no-manual-save", action="store_true",
+                        help="Fail instead of waiting for the PDF to be saved by hand (unattended runs)")
+    return parser.parse_args(argv)
 
 if __name__ == "__main__":
-    # Check for --fast flag
-    fast_mode = "--fast" in sys.argv
-    run_automation(fast_mode=fast_mode)
+    args = parse_args()
+    configure(args.job_id, args.job_dir, args.pdf_dir, args.state_file)
+    driver = get_driver("fake" if args.fake_driver else "applescript")
+    run_automation(fast_mode=args.fast, driver=driver, renderer=args.renderer, incremental_mode=args.incremental,
+                   invoices=args.invoices, use_session=not args.no_session,
+                   manual_save=not args.no_manual_save)
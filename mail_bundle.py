@@ -0,0 +1,122 @@
+"""
+Batch email of many PDFs
+PDFs are packed into as few messages as possible under an attachment size
+cap (optionally zipped), and each message is written to disk as a stream -
+attachments are base64-encoded chunk by chunk, never read whole.
+"""
+
+import base64
+import os
+import tempfile
+import uuid
+import zipfile
+from email.utils import formatdate, make_msgid
+from email.header import Header
+from pathlib import Path
+from urllib.parse import quote
+
+# iCloud rejects messages over 20 MB - leave room for encoding overhead
+MAX_ATTACHMENT_BYTES = 14 * 1024 * 1024
+# 57 raw bytes -> one 76-char base64 line; read many lines per chunk
+_B64_LINE = 57
+_READ_CHUNK = _B64_LINE * 1024
+
+
+def encoded_size(raw_size):
+    """Size of a base64 attachment on the wire (with CRLF line breaks)"""
+    lines = (raw_size + _B64_LINE - 1) // _B64_LINE
+    return lines * 78
+
+
+def plan_bundles(pdfs, max_bytes=MAX_ATTACHMENT_BYTES):
+    """First-fit-decreasing: group files so each group's encoded size fits max_bytes.
+    A single file bigger than the cap gets a bundle of its own."""
+    sized = sorted(((encoded_size(os.path.getsize(p)), Path(p)) for p in pdfs), reverse=True)
+    bundles = []
+    for size, path in sized:
+        for bundle in bundles:
+            if bundle["size"] + size <= max_bytes:
+                bundle["files"].append(path)
+                bundle["size"] += size
+                break
+        else:
+            bundles.append({"files": [path], "size": size})
+    return bundles
+
+
+def _header(name, value):
+    try:
+        value.encode("ascii")
+    except UnicodeEncodeError:
+        value = Header(value, "utf-8").encode()
+    return f"{name}: {value}\r\n".encode("ascii")
+
+
+def _write_base64(fp, src):
+    while True:
+        chunk = src.read(_READ_CHUNK)
+        if not chunk:
+            break
+        for i in range(0, len(chunk), _B64_LINE):
+            fp.write(base64.b64encode(chunk[i:i + _B64_LINE]) + b"\r\n")
+
+
+def write_message(fp, sender, recipient, subject, body, attachments):
+    """Stream a multipart/mixed message to fp.
+    attachments: (path, filename, mime type) tuples."""
+    boundary = f"=={uuid.uuid4().hex}"
+    fp.write(_header("From", sender))
+    fp.write(_header("To", recipient))
+    fp.write(_header("Subject", subject))
+    fp.write(_header("Date", formatdate(localtime=True)))
+    fp.write(_header("Message-ID", make_msgid()))
+    fp.write(b"MIME-Version: 1.0\r\n")
+    fp.write(f'Content-Type: multipart/mixed; boundary="{boundary}"\r\n\r\n'.encode("ascii"))
+
+    fp.write(f"--{boundary}\r\n".encode("ascii"))
+    fp.write(b'Content-Type: text/plain; charset="utf-8"\r\nContent-Transfer-Encoding: base64\r\n\r\n')
+    text = body.replace("\r\n", "\n").replace("\n", "\r\n").encode("utf-8")
+    for i in range(0, len(text), _B64_LINE):
+        fp.write(base64.b64encode(text[i:i + _B64_LINE]) + b"\r\n")
+
+    for path, filename, mime in attachments:
+        fp.write(f"--{boundary}\r\n".encode("ascii"))
+        fp.write(f"Content-Type: {mime}\r\nContent-Transfer-Encoding: base64\r\n".encode("ascii"))
+        fp.write(f"Content-Disposition: attachment; filename*=UTF-8''{quote(filename)}\r\n\r\n".encode("ascii"))
+        with open(path, "rb") as src:
+            _write_base64(fp, src)
+    fp.write(f"--{boundary}--\r\n".encode("ascii"))
+
+
+def zip_files(files, dest):
+    """Zip files into dest (zipfile streams each member from disk)"""
+    with zipfile.ZipFile(dest, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for path in files:
+            zf.write(path, arcname=Path(path).name)
+    return dest
+
+
+def send_batch(outbox, sender, recipient, pdfs, body, subject="Your LinkedIn Invoice PDFs",
+               max_bytes=MAX_ATTACHMENT_BYTES, as_zip=False):
+    """Queue the PDFs as few size-capped messages. Returns one result per bundle:
+    {"files": [...], "size": encoded bytes, "msg_id": id or None, "error": str}"""
+    results = []
+    bundles = plan_bundles(pdfs, max_bytes)
+    for n, bundle in enumerate(bundles, 1):
+        part_subject = subject if len(bundles) == 1 else f"{subject} ({n}/{len(bundles)})"
+        result = {"files": [p.name for p in bundle["files"]], "size": bundle["size"], "msg_id": None, "error": ""}
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                if as_zip:
+                    zip_path = zip_files(bundle["files"], Path(tmp) / f"LinkedIn_Invoices_{n}.zip")
+                    attachments = [(zip_path, zip_path.name, "application/zip")]
+                else:
+                    attachments = [(p, p.name, "application/pdf") for p in bundle["files"]]
+                result["msg_id"] = outbox.enqueue_stream(
+                    sender, [recipient], part_subject,
+                    lambda fp: write_message(fp, sender, recipient, part_subject, body, attachments),
+                )
+        except Exception as e:
+            result["error"] = str(e)
+        results.append(result)
+    return results
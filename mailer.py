@@ -0,0 +1,42 @@
+"""
+Invoice email: sender account and message text
+Shared by the Streamlit app and the CLI.
+"""
+
+from datetime import datetime
+
+import mail_bundle
+from outbox import Outbox, SmtpPool
+
+# Email config (TUG sender)
+SMTP_SERVER = "smtp.mail.me.com"
+SMTP_PORT = 587
+SENDER_EMAIL = "raffael.kultyshev@icloud.com"
+SENDER_PASSWORD = "anoq-rotn-bkrg-vqvk"
+
+
+def make_outbox(**kwargs):
+    """Outbox delivering over pooled, logged-in connections to the TUG account"""
+    pool = SmtpPool(SMTP_SERVER, SMTP_PORT, SENDER_EMAIL, SENDER_PASSWORD)
+    return Outbox(pool, **kwargs)
+
+
+def email_body(count=1):
+    """Plain-text body for the invoice email"""
+    date_str = datetime.now().strftime("%d/%m/%Y %H:%M")
+    what = "your PDF" if count == 1 else f"your {count} PDFs"
+    return f"""Hi User,
+
+Here is {what} from your LinkedIn which you asked for on {date_str}.
+
+Cheers,
+TUG Team"""
+
+
+def send_pdfs(outbox, recipient_email, pdfs, as_zip=False):
+    """Queue PDFs in as few size-capped emails as possible. Returns per-bundle results."""
+    subject = "Your LinkedIn Invoice PDF" if len(pdfs) == 1 else "Your LinkedIn Invoice PDFs"
+    return mail_bundle.send_batch(
+        outbox, SENDER_EMAIL, recipient_email, pdfs,
+        body=email_body(len(pdfs)), subject=subject, as_zip=as_zip,
+    )
@@ -0,0 +1,355 @@
+"""
+Persistent email outbox
+Messages are written to disk and queued in SQLite, enqueue() returns right
+away, and background senders deliver them over pooled, already
+authenticated SMTP connections with retry/backoff.
+"""
+
+import os
+import smtplib
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+ROOT = Path(__file__).parent
+OUTBOX_DIR = ROOT / "outbox"
+OUTBOX_DB = OUTBOX_DIR / "outbox.sqlite3"
+
+QUEUED = "queued"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+MAX_ATTEMPTS = 5
+RETRY_BASE = 5          # seconds, doubled per attempt
+RETRY_MAX = 300
+POOL_SIZE = 2           # connections = sender threads
+SEND_BUFFER = 64 * 1024
+IDLE_TIMEOUT = 60       # close connections unused for this long
+CLAIM_LEASE = 15 * 60   # a "sending" claim older than this is taken back
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id TEXT PRIMARY KEY,
+    sender TEXT NOT NULL,
+    recipients TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    eml_path TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT NOT NULL DEFAULT '',
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    sent_at REAL,
+    claimed_by INTEGER,
+    claimed_at REAL
+);
+CREATE INDEX IF NOT EXISTS messages_due ON messages (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS messages_created ON messages (created_at DESC);
+"""
+# Columns added after the first release (ALTERed into older databases)
+CLAIM_COLUMNS = {"claimed_by": "INTEGER", "claimed_at": "REAL"}
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # exists, owned by someone else
+    return True
+
+
+class SmtpPool:
+    """Small pool of logged-in SMTP connections, reused across messages"""
+
+    def __init__(self, host, port, username=None, password=None, use_tls=True,
+                 size=POOL_SIZE, idle_timeout=IDLE_TIMEOUT, smtp_class=smtplib.SMTP):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.idle_timeout = idle_timeout
+        self.smtp_class = smtp_class
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self):
+        conn = self.smtp_class(self.host, self.port, timeout=30)
+        if self.use_tls:
+            conn.starttls()
+        if self.username:
+            conn.login(self.username, self.password)
+        return conn
+
+    def _alive(self, conn):
+        try:
+            return conn.noop()[0] == 250
+        except smtplib.SMTPException:
+            return False
+        except OSError:
+            return False
+
+    @contextmanager
+    def connection(self):
+        """Borrow a live connection; it goes back to the pool unless it broke"""
+        self._slots.acquire()
+        conn = None
+        try:
+            with self._lock:
+                while self._idle and conn is None:
+                    candidate, last_used = self._idle.pop()
+                    if time.monotonic() - last_used < self.idle_timeout and self._alive(candidate):
+                        conn = candidate
+                    else:
+                        self._close(candidate)
+            if conn is None:
+                conn = self._connect()
+            yield conn
+        except Exception:
+            if conn is not None:
+                self._close(conn)
+            conn = None
+            raise
+        finally:
+            if conn is not None:
+                with self._lock:
+                    self._idle.append((conn, time.monotonic()))
+            self._slots.release()
+
+    def _close(self, conn):
+        try:
+            conn.quit()
+        except Exception:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._close(conn)
+
+
+def send_streaming(conn, sender, recipients, eml_path):
+    """SMTP transaction that streams the DATA phase from a file on disk
+    (CRLF line endings + dot-stuffing applied on the fly)."""
+    conn.ehlo_or_helo_if_needed()
+    code, resp = conn.mail(sender)
+    if code != 250:
+        raise smtplib.SMTPSenderRefused(code, resp, sender)
+    refused = {}
+    for rcpt in recipients:
+        code, resp = conn.rcpt(rcpt)
+        if code not in (250, 251):
+            refused[rcpt] = (code, resp)
+    if len(refused) == len(recipients):
+        conn.rset()
+        raise smtplib.SMTPRecipientsRefused(refused)
+    conn.putcmd("data")
+    code, resp = conn.getreply()
+    if code != 354:
+        raise smtplib.SMTPDataError(code, resp)
+    buf = bytearray()
+    with open(eml_path, "rb") as f:
+        for line in f:
+            line = line.rstrip(b"\r\n")
+            if line.startswith(b"."):
+                buf += b"."
+            buf += line + b"\r\n"
+            if len(buf) >= SEND_BUFFER:
+                conn.send(bytes(buf))
+                buf.clear()
+    buf += b".\r\n"
+    conn.send(bytes(buf))
+    code, resp = conn.getreply()
+    if code != 250:
+        raise smtplib.SMTPDataError(code, resp)
+    return refused
+
+
+class Outbox:
+    def __init__(self, pool, outbox_dir=OUTBOX_DIR, workers=POOL_SIZE, start=True, own_only=False):
+        self.pool = pool
+        # own_only: deliver only what this instance queued (a short-lived CLI
+        # next to the app's outbox shouldn't pick up the app's messages)
+        self._own = set() if own_only else None
+        self.outbox_dir = Path(outbox_dir)
+        self.outbox_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.outbox_dir / OUTBOX_DB.name
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._claim_lock = threading.Lock()
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+            columns = {r["name"] for r in db.execute("PRAGMA table_info(messages)")}
+            for name, kind in CLAIM_COLUMNS.items():
+                if name not in columns:
+                    db.execute(f"ALTER TABLE messages ADD COLUMN {name} {kind}")
+        self._recover_stale()
+        self._threads = []
+        if start:
+            for i in range(workers):
+                t = threading.Thread(target=self._worker, name=f"outbox-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(str(self.db_path), timeout=10)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.row_factory = sqlite3.Row
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def enqueue(self, msg):
+        """Store an email.message.Message and queue it. Returns the message id."""
+        recipients = [a for a in (msg.get("To"), msg.get("Cc")) if a]
+        return self.enqueue_stream(
+            msg.get("From", ""), recipients, msg.get("Subject", ""),
+            lambda fp: fp.write(msg.as_bytes()),
+        )
+
+    def enqueue_stream(self, sender, recipients, subject, write):
+        """Queue a message whose raw bytes write(fp) streams to disk. Returns the id."""
+        msg_id = uuid.uuid4().hex
+        eml_path = self.outbox_dir / f"{msg_id}.eml"
+        tmp_path = eml_path.with_suffix(".tmp")
+        try:
+            with open(tmp_path, "wb") as fp:
+                write(fp)
+            tmp_path.replace(eml_path)
+        except Exception:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO messages (id, sender, recipients, subject, eml_path, status,"
+                " next_attempt_at, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (msg_id, sender, ", ".join(recipients), subject, str(eml_path), QUEUED, now, now),
+            )
+        if self._own is not None:
+            self._own.add(msg_id)
+        self._wake.set()
+        return msg_id
+
+    def status(self, msg_id):
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM messages WHERE id = ?", (msg_id,)).fetchone()
+        return dict(row) if row else None
+
+    def recent(self, limit=10):
+        with self._connect() as db:
+            rows = db.execute("SELECT * FROM messages ORDER BY created_at DESC LIMIT ?", (limit,))
+            return [dict(r) for r in rows]
+
+    def _recover_stale(self):
+        """Requeue "sending" messages whose sender process died or whose lease ran out.
+        Claims held by live processes (e.g. the app while the CLI starts) are left alone."""
+        with self._connect() as db:
+            rows = db.execute("SELECT id, claimed_by, claimed_at FROM messages WHERE status = ?",
+                              (SENDING,)).fetchall()
+            cutoff = time.time() - CLAIM_LEASE
+            for row in rows:
+                owner, claimed_at = row["claimed_by"], row["claimed_at"] or 0
+                if owner is not None and _pid_alive(owner) and claimed_at > cutoff:
+                    continue
+                db.execute(
+                    "UPDATE messages SET status = ?, claimed_by = NULL, claimed_at = NULL"
+                    " WHERE id = ? AND status = ? AND claimed_by IS ? AND claimed_at IS ?",
+                    (QUEUED, row["id"], SENDING, row["claimed_by"], row["claimed_at"]),
+                )
+
+    def _claim(self):
+        """Move the next due message to "sending" - the conditional UPDATE makes the
+        claim atomic across processes sharing the database"""
+        with self._claim_lock, self._connect() as db:
+            while True:
+                sql = "SELECT * FROM messages WHERE status = ? AND next_attempt_at <= ?"
+                params = [QUEUED, time.time()]
+                if self._own is not None:
+                    if not self._own:
+                        return None
+                    sql += f" AND id IN ({','.join('?' * len(self._own))})"
+                    params += sorted(self._own)
+                row = db.execute(sql + " ORDER BY next_attempt_at LIMIT 1", params).fetchone()
+                if row is None:
+                    return None
+                claimed = db.execute(
+                    "UPDATE messages SET status = ?, claimed_by = ?, claimed_at = ? WHERE id = ? AND status = ?",
+                    (SENDING, os.getpid(), time.time(), row["id"], QUEUED),
+                )
+                if claimed.rowcount == 1:
+                    return dict(row)
+
+    def _next_due_in(self):
+        sql = "SELECT MIN(next_attempt_at) FROM messages WHERE status = ?"
+        params = [QUEUED]
+        if self._own is not None:
+            sql += f" AND id IN ({','.join('?' * len(self._own))})"
+            params += sorted(self._own)
+        with self._connect() as db:
+            row = db.execute(sql, params).fetchone()
+        if row[0] is None:
+            return None
+        return max(row[0] - time.time(), 0)
+
+    def _deliver(self, message):
+        recipients = [r.strip() for r in message["recipients"].split(",") if r.strip()]
+        with self.pool.connection() as conn:
+            send_streaming(conn, message["sender"], recipients, message["eml_path"])
+
+    def _worker(self):
+        while not self._stop.is_set():
+            message = self._claim()
+            if message is None:
+                self._recover_stale()
+                wait = self._next_due_in()
+                self._wake.wait(timeout=min(wait, 30) if wait is not None else 30)
+                self._wake.clear()
+                continue
+            try:
+                self._deliver(message)
+            except Exception as e:
+                self._record_failure(message, e)
+            else:
+                with self._connect() as db:
+                    db.execute(
+                        "UPDATE messages SET status = ?, attempts = attempts + 1, sent_at = ?,"
+                        " last_error = '' WHERE id = ?",
+                        (SENT, time.time(), message["id"]),
+                    )
+                Path(message["eml_path"]).unlink(missing_ok=True)
+
+    def _record_failure(self, message, error):
+        attempts = message["attempts"] + 1
+        # Rejected recipients won't get better by retrying
+        permanent = isinstance(error, (smtplib.SMTPRecipientsRefused, FileNotFoundError))
+        status = FAILED if permanent or attempts >= MAX_ATTEMPTS else QUEUED
+        delay = min(RETRY_BASE * 2 ** (attempts - 1), RETRY_MAX)
+        with self._connect() as db:
+            db.execute(
+                "UPDATE messages SET status = ?, attempts = ?, last_error = ?, next_attempt_at = ?"
+                " WHERE id = ?",
+                (status, attempts, str(error)[:500], time.time() + delay, message["id"]),
+            )
+        print(f"[OUTBOX] {message['id']} attempt {attempts} failed: {error}")
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout=5)
+        self.pool.close_all()
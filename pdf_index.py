@@ -0,0 +1,189 @@
+"""
+Persistent index of extracted PDFs (SQLite)
+Rows are added/removed as files come and go; refresh() only rescans folders
+whose mtime changed, so listing and "latest PDF" are plain indexed queries.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).parent
+PDF_DIR = ROOT / "pdfs"
+INDEX_FILE = ROOT / "pdf_index.sqlite3"
+DEFAULT_ACCOUNT = "default"
+
+_TIMESTAMP_RE = re.compile(r"(\d{8}_\d{6})")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pdfs (
+    path TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    dir TEXT NOT NULL,
+    account TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    sha256 TEXT NOT NULL,
+    extracted_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pdfs_extracted ON pdfs (extracted_at DESC);
+CREATE INDEX IF NOT EXISTS pdfs_account_extracted ON pdfs (account, extracted_at DESC);
+CREATE INDEX IF NOT EXISTS pdfs_dir ON pdfs (dir);
+CREATE INDEX IF NOT EXISTS pdfs_sha256 ON pdfs (sha256);
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL
+);
+"""
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def extracted_at_from_name(name, default):
+    """LinkedIn_Purchases_YYYYmmdd_HHMMSS.pdf -> epoch seconds"""
+    match = _TIMESTAMP_RE.search(name)
+    if match:
+        try:
+            return datetime.strptime(match.group(1), "%Y%m%d_%H%M%S").timestamp()
+        except ValueError:
+            pass
+    return default
+
+
+class PdfIndex:
+    def __init__(self, pdf_dir=PDF_DIR, db_path=INDEX_FILE):
+        self.pdf_dir = Path(pdf_dir)
+        self.db_path = Path(db_path)
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(str(self.db_path), timeout=10)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.row_factory = sqlite3.Row
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _account_for(self, path):
+        parent = path.parent
+        if parent == self.pdf_dir:
+            return DEFAULT_ACCOUNT
+        try:
+            return parent.relative_to(self.pdf_dir).parts[0]
+        except ValueError:
+            return parent.name
+
+    def _row_for(self, path, st, account=None, extracted_at=None, sha256=None):
+        return (
+            str(path), path.name, str(path.parent),
+            account or self._account_for(path),
+            st.st_size, st.st_mtime,
+            sha256 or file_sha256(path),
+            extracted_at or extracted_at_from_name(path.name, st.st_mtime),
+        )
+
+    def add(self, path, account=None, extracted_at=None, sha256=None):
+        """Index (or re-index) one file"""
+        path = Path(path)
+        row = self._row_for(path, path.stat(), account, extracted_at, sha256)
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO pdfs VALUES (?, ?, ?, ?, ?, ?, ?, ?)", row)
+
+    def remove(self, path):
+        with self._connect() as db:
+            db.execute("DELETE FROM pdfs WHERE path = ?", (str(path),))
+
+    def refresh(self):
+        """Bring the index in line with disk, rescanning only folders that changed"""
+        self.pdf_dir.mkdir(exist_ok=True)
+        with self._connect() as db:
+            known_dirs = {r["path"]: r["mtime_ns"] for r in db.execute("SELECT path, mtime_ns FROM dirs")}
+            pending = [str(self.pdf_dir)] + [d for d in known_dirs if d != str(self.pdf_dir)]
+            seen = set()
+            while pending:
+                folder = pending.pop()
+                if folder in seen:
+                    continue
+                seen.add(folder)
+                try:
+                    mtime_ns = os.stat(folder).st_mtime_ns
+                except FileNotFoundError:
+                    db.execute("DELETE FROM dirs WHERE path = ?", (folder,))
+                    db.execute("DELETE FROM pdfs WHERE dir = ?", (folder,))
+                    continue
+                if known_dirs.get(folder) == mtime_ns:
+                    continue
+                self._rescan_dir(db, folder, pending)
+                db.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?)", (folder, mtime_ns))
+
+    def _rescan_dir(self, db, folder, pending):
+        indexed = {
+            r["path"]: (r["size"], r["mtime"])
+            for r in db.execute("SELECT path, size, mtime FROM pdfs WHERE dir = ?", (folder,))
+        }
+        on_disk = set()
+        with os.scandir(folder) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if not entry.name.startswith("."):
+                        pending.append(entry.path)
+                    continue
+                if not entry.name.lower().endswith(".pdf"):
+                    continue
+                on_disk.add(entry.path)
+                st = entry.stat()
+                if indexed.get(entry.path) == (st.st_size, st.st_mtime):
+                    continue
+                row = self._row_for(Path(entry.path), st)
+                db.execute("INSERT OR REPLACE INTO pdfs VALUES (?, ?, ?, ?, ?, ?, ?, ?)", row)
+        for gone in set(indexed) - on_disk:
+            db.execute("DELETE FROM pdfs WHERE path = ?", (gone,))
+
+    def list(self, account=None, limit=None):
+        """Indexed PDFs, newest first"""
+        sql = "SELECT path FROM pdfs"
+        params = []
+        if account:
+            sql += " WHERE account = ?"
+            params.append(account)
+        # Names in the content store share an inode (and mtime) with older
+        # copies of the same page, so order by when the file was extracted
+        sql += " ORDER BY extracted_at DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._connect() as db:
+            return [Path(r["path"]) for r in db.execute(sql, params)]
+
+    def latest(self, account=None):
+        pdfs = self.list(account=account, limit=1)
+        return pdfs[0] if pdfs else None
+
+    def get(self, path):
+        """Index row for one file as a dict (None if it isn't indexed)"""
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM pdfs WHERE path = ?", (str(path),)).fetchone()
+        return dict(row) if row else None
+
+    def rows(self):
+        """Every index row as a dict, oldest extraction first"""
+        with self._connect() as db:
+            return [dict(r) for r in db.execute("SELECT * FROM pdfs ORDER BY extracted_at")]
+
+    def count(self):
+        with self._connect() as db:
+            return db.execute("SELECT COUNT(*) FROM pdfs").fetchone()[0]
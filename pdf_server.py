@@ -0,0 +1,148 @@
+"""
+Local PDF file endpoint
+Serves files from PDF_DIR over HTTP (with Range support) so the preview and
+downloads stream straight from disk instead of going through the websocket.
+Links point at 127.0.0.1, which only works in a browser on this machine. For
+remote operators set LIE_PDF_PUBLIC_URL to where the endpoint is reachable
+(e.g. a reverse proxy, with LIE_PDF_SERVER_HOST=0.0.0.0); without it the app
+falls back to inlining files for non-local clients.
+"""
+
+import mimetypes
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, quote, unquote, urlparse
+
+ROOT = Path(__file__).parent
+PDF_DIR = ROOT / "pdfs"
+PDF_SERVER_HOST = os.environ.get("LIE_PDF_SERVER_HOST", "127.0.0.1")
+PDF_SERVER_PORT = 3941
+# Base URL browsers use to reach the endpoint ("" = http://host:port, local only)
+PDF_PUBLIC_URL = os.environ.get("LIE_PDF_PUBLIC_URL", "")
+LOCAL_HOSTS = ("localhost", "127.0.0.1", "::1")
+
+CHUNK_SIZE = 64 * 1024
+_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header, size):
+    """Parse a single "bytes=start-end" range. Returns (start, end) or None if unsatisfiable."""
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if start == "":
+        if end == "":
+            return None
+        # Suffix range: the last N bytes
+        length = int(end)
+        if length == 0:
+            return None
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = int(end) if end else size - 1
+    if start >= size or end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+class PdfRequestHandler(BaseHTTPRequestHandler):
+    root = PDF_DIR
+
+    def log_message(self, format, *args):
+        pass
+
+    def _resolve(self):
+        rel = unquote(urlparse(self.path).path).lstrip("/")
+        path = (self.root / rel).resolve()
+        root = self.root.resolve()
+        if root not in path.parents or not path.is_file():
+            return None
+        # Hidden files/folders (caches, stores) are never served
+        if any(part.startswith(".") for part in path.relative_to(root).parts):
+            return None
+        return path
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def _serve(self, send_body):
+        path = self._resolve()
+        if path is None:
+            self.send_error(404)
+            return
+        size = path.stat().st_size
+        start, end = 0, size - 1
+        status = 200
+        if "Range" in self.headers:
+            byte_range = parse_range(self.headers["Range"], size)
+            if byte_range is None:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.end_headers()
+                return
+            start, end = byte_range
+            status = 206
+        length = end - start + 1 if size else 0
+
+        self.send_response(status)
+        self.send_header("Content-Type", mimetypes.guess_type(path.name)[0] or "application/octet-stream")
+        self.send_header("Content-Length", str(length))
+        self.send_header("Accept-Ranges", "bytes")
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        query = parse_qs(urlparse(self.path).query)
+        disposition = "attachment" if query.get("download") else "inline"
+        self.send_header("Content-Disposition", f"{disposition}; filename*=UTF-8''{quote(path.name)}")
+        self.end_headers()
+        if not send_body or not length:
+            return
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = length
+            while remaining:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+
+class PdfServer:
+    """Runs the endpoint in a background thread"""
+
+    def __init__(self, root=PDF_DIR, host=PDF_SERVER_HOST, port=PDF_SERVER_PORT, public_url=PDF_PUBLIC_URL):
+        self.root = Path(root)
+        self.public_url = public_url.rstrip("/")
+        handler = type("Handler", (PdfRequestHandler,), {"root": self.root})
+        try:
+            self.httpd = ThreadingHTTPServer((host, port), handler)
+        except OSError:
+            # Port taken (e.g. a second app instance) - let the OS pick one
+            self.httpd = ThreadingHTTPServer((host, 0), handler)
+        self.httpd.daemon_threads = True
+        self.host, self.port = self.httpd.server_address[:2]
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def url_for(self, pdf_path, download=False):
+        rel = Path(pdf_path).resolve().relative_to(self.root.resolve())
+        base = self.public_url or f"http://{self.host}:{self.port}"
+        url = f"{base}/{quote(rel.as_posix())}"
+        return url + "?download=1" if download else url
+
+    def reachable_from(self, client_host):
+        """Whether a browser that reached the app as client_host can open our URLs"""
+        if self.public_url:
+            return True
+        hostname = urlparse(f"//{client_host}").hostname if client_host else None
+        return hostname is None or hostname in LOCAL_HOSTS
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,155 @@
+"""
+Content-addressed PDF store
+Every saved PDF becomes a read-only blob under pdfs/.blobs/ named by its
+content hash; the visible LinkedIn_Purchases_*.pdf files are hard links to
+those blobs. Re-extracting an unchanged purchases page adds a name, not a copy.
+Ingest and garbage collection take a lock on the store (shared/exclusive), so
+a blob is never collected between ingest finding it and linking to it.
+"""
+
+import contextlib
+import errno
+import fcntl
+import hashlib
+import os
+import re
+import shutil
+import sys
+import uuid
+from pathlib import Path
+
+ROOT = Path(__file__).parent
+PDF_DIR = ROOT / "pdfs"
+BLOB_DIR = PDF_DIR / ".blobs"
+
+# Chrome stamps every printout with its creation time - ignore that when
+# deciding whether two PDFs have the same content
+_DATE_RE = re.compile(rb"/(CreationDate|ModDate)\s*\(D:[^)]*\)")
+FICLONE = 0x40049409  # linux/fs.h
+LOCK_NAME = ".lock"
+
+
+def content_hash(path):
+    """sha256 of the file with the PDF creation/modification dates masked out"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for line in f:
+            if b"Date" in line:
+                line = _DATE_RE.sub(rb"/\1()", line)
+            h.update(line)
+    return h.hexdigest()
+
+
+def blob_path(digest, blob_dir=BLOB_DIR):
+    return Path(blob_dir) / digest[:2] / f"{digest}.pdf"
+
+
+def _reflink(src, dest):
+    """Copy-on-write clone (Linux FICLONE / macOS clonefile). False if unsupported."""
+    if sys.platform == "darwin":
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        return libc.clonefile(os.fsencode(str(src)), os.fsencode(str(dest)), 0) == 0
+    if sys.platform.startswith("linux"):
+        with open(src, "rb") as s, open(dest, "wb") as d:
+            try:
+                fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+                return True
+            except OSError:
+                pass
+        os.unlink(dest)
+    return False
+
+
+def _place_blob(src, blob, move):
+    """Put src's bytes at blob as cheaply as possible: rename > reflink > copy"""
+    blob.parent.mkdir(parents=True, exist_ok=True)
+    # Unique per call - concurrent ingests of the same content must not share it
+    # (not created up front: clonefile refuses an existing target)
+    tmp = blob.with_name(f".{blob.stem}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        if move:
+            try:
+                os.rename(src, tmp)
+                os.replace(tmp, blob)
+                return "rename"
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+        method = "reflink" if _reflink(src, tmp) else None
+        if method is None:
+            shutil.copyfile(src, tmp)
+            method = "copy"
+        os.replace(tmp, blob)
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+    if move:
+        os.unlink(src)
+    return method
+
+
+@contextlib.contextmanager
+def _store_lock(blob_dir, exclusive=False):
+    """flock on the store: ingests share it, garbage collection holds it alone"""
+    blob_dir = Path(blob_dir)
+    blob_dir.mkdir(parents=True, exist_ok=True)
+    with open(blob_dir / LOCK_NAME, "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _link(blob, dest):
+    """Named reference to a blob (hard link, or a copy across filesystems)"""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    # Unique per call, so a tmp left behind by a crashed run can't block the link
+    tmp = dest.with_name(f".{dest.name}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        try:
+            os.link(blob, tmp)
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+                raise
+            shutil.copyfile(blob, tmp)
+        os.replace(tmp, dest)
+    finally:
+        # Still there if replace failed, or was a no-op because dest already is the blob
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+
+
+def ingest(src, dest, move=False, blob_dir=BLOB_DIR):
+    """Store src under the name dest. Returns (dest, digest, method) where method is
+    "dedup" if the content was already stored, else how the blob was created."""
+    src, dest = Path(src), Path(dest)
+    digest = content_hash(src)
+    blob = blob_path(digest, blob_dir)
+    with _store_lock(blob_dir):
+        if blob.exists():
+            method = "dedup"
+            if move:
+                os.unlink(src)
+            _link(blob, dest)
+        else:
+            method = _place_blob(src, blob, move)
+            os.chmod(blob, 0o444)
+            _link(blob, dest)
+    return dest, digest, method
+
+
+def collect_garbage(blob_dir=BLOB_DIR):
+    """Delete blobs no name links to any more. Returns bytes freed."""
+    freed = 0
+    blob_dir = Path(blob_dir)
+    if not blob_dir.exists():
+        return 0
+    with _store_lock(blob_dir, exclusive=True):
+        for blob in blob_dir.glob("*/*.pdf"):
+            st = blob.stat()
+            if st.st_nlink <= 1:
+                blob.unlink()
+                freed += st.st_size
+    return freed
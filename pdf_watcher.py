@@ -0,0 +1,183 @@
+"""
+Watch folders for a newly saved PDF
+inotify on Linux, kqueue on macOS, directory-listing polling elsewhere.
+Armed before the save is triggered; a file only counts once its size has
+stopped changing, so half-written PDFs are never picked up.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+
+# Files still being written by the browser
+PARTIAL_SUFFIXES = (".crdownload", ".part", ".download", ".tmp")
+STABLE_FOR = 0.2       # seconds the size must stay unchanged
+POLL_INTERVAL = 0.25   # fallback backend only
+
+# inotify constants (linux/inotify.h)
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def is_pdf_name(name):
+    return name.lower().endswith(".pdf") and not name.startswith(".")
+
+
+class _InotifyBackend:
+    def __init__(self, dirs):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs = {}
+        mask = IN_CREATE | IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO
+        for d in dirs:
+            wd = libc.inotify_add_watch(self.fd, os.fsencode(str(d)), mask)
+            if wd >= 0:
+                self.dirs[wd] = Path(d)
+
+    def fileno(self):
+        return self.fd
+
+    def changed(self, timeout):
+        """Paths touched since the last call (waits up to timeout for the first)"""
+        ready, _, _ = select.select([self.fd], [], [], max(timeout, 0))
+        if not ready:
+            return set()
+        paths = set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return paths
+        offset = 0
+        while offset < len(data):
+            wd, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode("utf-8", "replace")
+            offset += length
+            if wd in self.dirs and name:
+                paths.add(self.dirs[wd] / name)
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _ScanBackend:
+    """Diffs directory listings - kqueue tells us when to look, otherwise we poll"""
+
+    def __init__(self, dirs, use_kqueue=False):
+        self.dirs = [Path(d) for d in dirs]
+        self.seen = {d: self._names(d) for d in self.dirs}
+        self.kq = None
+        self.fds = []
+        if use_kqueue:
+            self.kq = select.kqueue()
+            flags = getattr(os, "O_EVTONLY", os.O_RDONLY)
+            events = []
+            for d in self.dirs:
+                fd = os.open(str(d), flags)
+                self.fds.append(fd)
+                events.append(select.kevent(
+                    fd, filter=select.KQ_FILTER_VNODE,
+                    flags=select.KQ_EV_ADD | select.KQ_EV_CLEAR,
+                    fflags=select.KQ_NOTE_WRITE | select.KQ_NOTE_EXTEND,
+                ))
+            self.kq.control(events, 0, 0)
+
+    def _names(self, d):
+        try:
+            return set(os.listdir(d))
+        except OSError:
+            return set()
+
+    def changed(self, timeout):
+        if self.kq is not None:
+            if not self.kq.control(None, 8, max(timeout, 0)):
+                return set()
+        else:
+            time.sleep(min(max(timeout, 0), POLL_INTERVAL))
+        paths = set()
+        for d in self.dirs:
+            names = self._names(d)
+            paths.update(d / n for n in names - self.seen[d])
+            self.seen[d] = names
+        return paths
+
+    def close(self):
+        for fd in self.fds:
+            os.close(fd)
+        if self.kq is not None:
+            self.kq.close()
+
+
+class PdfWatcher:
+    """Reports the first new, fully written PDF in any watched folder"""
+
+    def __init__(self, dirs, stable_for=STABLE_FOR, backend=None):
+        self.dirs = [Path(d) for d in dirs if Path(d).is_dir()]
+        self.stable_for = stable_for
+        self.candidates = {}   # path -> (size, time the size was last seen changing)
+        self.backend = backend or self._make_backend()
+
+    def _make_backend(self):
+        if sys.platform.startswith("linux"):
+            try:
+                return _InotifyBackend(self.dirs)
+            except (OSError, AttributeError):
+                pass
+        if hasattr(select, "kqueue"):
+            try:
+                return _ScanBackend(self.dirs, use_kqueue=True)
+            except OSError:
+                pass
+        return _ScanBackend(self.dirs)
+
+    def _check_candidates(self):
+        now = time.monotonic()
+        for path, (size, since) in list(self.candidates.items()):
+            try:
+                current = path.stat().st_size
+            except FileNotFoundError:
+                del self.candidates[path]
+                continue
+            if current != size or current == 0:
+                self.candidates[path] = (current, now)
+            elif now - since >= self.stable_for:
+                del self.candidates[path]
+                return path
+        return None
+
+    def poll(self, timeout=0):
+        """Stable new PDF or None. Waits at most timeout seconds for file events."""
+        wait = min(timeout, self.stable_for) if self.candidates else timeout
+        for path in self.backend.changed(wait):
+            if is_pdf_name(path.name) and not path.name.endswith(PARTIAL_SUFFIXES):
+                self.candidates.setdefault(path, (-1, time.monotonic()))
+        return self._check_candidates()
+
+    def wait(self, timeout):
+        """Block until a stable new PDF appears (or timeout). Returns its path or None."""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            found = self.poll(timeout=max(min(remaining, 1.0), 0))
+            if found or remaining <= 0:
+                return found
+
+    def close(self):
+        self.backend.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
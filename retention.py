@@ -0,0 +1,182 @@
+"""
+Archive retention
+Keeps pdfs/ under a disk quota and/or maximum age by removing the oldest
+extractions first, a few files at a time, from a background thread. Pinned
+files and the newest PDF in every folder are never removed. Removed names
+leave the index, and content-store blobs nothing links to any more are freed.
+The sweeper also prunes old run records from the state store now and then.
+
+Usage: python retention.py [--quota-mb 500] [--max-age-days 365] [--dry-run]
+"""
+
+import argparse
+import threading
+import time
+from pathlib import Path
+
+import pdf_store
+from pdf_index import PdfIndex
+from state_store import StateStore
+
+ROOT = Path(__file__).parent
+PDF_DIR = ROOT / "pdfs"
+
+# Defaults (the app lets you change them): 1 GB, no age limit
+RETENTION_QUOTA = 1024 * 1024 * 1024
+RETENTION_MAX_AGE = None
+# Files removed per sweep - keeps each pass short next to running extractions
+SWEEP_BATCH = 20
+# Pause between sweeps while over budget, and between checks when within it
+SWEEP_PAUSE = 0.5
+SWEEP_INTERVAL = 300
+# Seconds between state store prunes (old runs, status history)
+PRUNE_INTERVAL = 3600
+
+
+def disk_usage(rows):
+    """Bytes held by the indexed files (names sharing content counted once)"""
+    return sum({r["sha256"]: r["size"] for r in rows}.values())
+
+
+def plan_eviction(rows, quota=RETENTION_QUOTA, max_age=RETENTION_MAX_AGE, pinned=(), now=None):
+    """Index rows to remove, oldest first: everything past max_age, then the
+    oldest files until usage fits the quota. Names whose content a kept file
+    (pinned/newest) also links are left alone by the quota pass - removing
+    them frees nothing. Returns (rows, usage after)."""
+    now = now or time.time()
+    pinned = set(pinned)
+    rows = sorted(rows, key=lambda r: r["extracted_at"])
+    newest = {r["dir"]: r["path"] for r in rows}
+    kept = {r["sha256"] for r in rows if r["path"] in pinned or newest[r["dir"]] == r["path"]}
+    names = {}
+    for r in rows:
+        names[r["sha256"]] = names.get(r["sha256"], 0) + 1
+    usage = disk_usage(rows)
+    cutoff = now - max_age if max_age else None
+    evict = []
+    for r in rows:
+        if r["path"] in pinned or newest[r["dir"]] == r["path"]:
+            continue
+        expired = cutoff is not None and r["extracted_at"] < cutoff
+        if not expired and (not quota or usage <= quota or r["sha256"] in kept):
+            continue
+        evict.append(r)
+        names[r["sha256"]] -= 1
+        if not names[r["sha256"]]:
+            usage -= r["size"]
+    return evict, usage
+
+
+class Retention:
+    """Quota/age-bounded archive, swept incrementally in the background"""
+
+    def __init__(self, index=None, store=None, quota=RETENTION_QUOTA, max_age=RETENTION_MAX_AGE,
+                 pdf_dir=PDF_DIR, batch=SWEEP_BATCH):
+        self.pdf_dir = Path(pdf_dir)
+        self.index = index or PdfIndex(self.pdf_dir)
+        self.store = store or StateStore()
+        self.blob_dir = self.pdf_dir / pdf_store.BLOB_DIR.name
+        self.quota = quota
+        self.max_age = max_age
+        self.batch = batch
+        self.removed = 0
+        self.freed = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pruned_at = None
+
+    def configure(self, quota=None, max_age=None):
+        """New limits (0/None = unlimited); wakes the sweeper"""
+        self.quota = quota or None
+        self.max_age = max_age or None
+        self._wake.set()
+
+    def usage(self):
+        self.index.refresh()
+        return disk_usage(self.index.rows())
+
+    def plan(self):
+        self.index.refresh()
+        return plan_eviction(self.index.rows(), self.quota, self.max_age, self.store.pinned())
+
+    def sweep(self, limit=None):
+        """Remove up to limit (default: batch) files due for eviction.
+        Returns how many files are still due afterwards."""
+        with self._lock:
+            due, _ = self.plan()
+            for row in due[:limit or self.batch]:
+                path = Path(row["path"])
+                try:
+                    path.unlink(missing_ok=True)
+                except OSError as e:
+                    print(f"[RETENTION] Could not remove {path}: {e}")
+                    continue
+                self.index.remove(path)
+                self.removed += 1
+            if due:
+                self.freed += pdf_store.collect_garbage(self.blob_dir)
+            return max(len(due) - (limit or self.batch), 0)
+
+    def prune_state(self):
+        """Prune the state store if it's been PRUNE_INTERVAL since the last time"""
+        now = time.monotonic()
+        if self._pruned_at is not None and now - self._pruned_at < PRUNE_INTERVAL:
+            return 0
+        self._pruned_at = now
+        return self.store.prune()
+
+    def pin(self, path):
+        self.store.pin(path)
+
+    def unpin(self, path):
+        self.store.unpin(path)
+        self._wake.set()
+
+    def is_pinned(self, path):
+        return str(path) in self.store.pinned()
+
+    def trigger(self):
+        """Check again now (e.g. after an extraction added files)"""
+        self._wake.set()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="retention", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                remaining = self.sweep()
+                self.prune_state()
+            except Exception as e:
+                print(f"[RETENTION] Sweep failed: {e}")
+                remaining = 0
+            self._wake.wait(SWEEP_PAUSE if remaining else SWEEP_INTERVAL)
+            self._wake.clear()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Trim the PDF archive to a size/age budget")
+    parser.add_argument("--quota-mb", type=float, default=RETENTION_QUOTA / 1024 / 1024,
+                        help="Disk quota in MB (0 = unlimited)")
+    parser.add_argument("--max-age-days", type=float, default=0, help="Remove PDFs older than this (0 = keep)")
+    parser.add_argument("--dry-run", action="store_true", help="Only list what would be removed")
+    args = parser.parse_args()
+    retention = Retention(quota=int(args.quota_mb * 1024 * 1024), max_age=args.max_age_days * 86400)
+    due, after = retention.plan()
+    before = retention.usage()
+    for row in due:
+        print(f"{'would remove' if args.dry_run else 'remove'} {row['path']}")
+    if not args.dry_run:
+        while retention.sweep():
+            pass
+        print(f"{retention.prune_state()} old run records pruned")
+    print(f"{len(due)} files, {before / 1024 / 1024:.1f} MB -> {after / 1024 / 1024:.1f} MB")
@@ -0,0 +1,128 @@
+"""
+Structured run event log
+Every extraction appends JSON lines to runs/events.jsonl: run start/end and
+a start/end span per step with duration and outcome. summarize() turns the
+recent runs into p50/p95 latencies per step.
+"""
+
+import json
+import math
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+ROOT = Path(__file__).parent
+EVENTS_FILE = ROOT / "runs" / "events.jsonl"
+
+# Only the tail of the log is read for summaries
+TAIL_BYTES = 4 * 1024 * 1024
+
+OK = "ok"
+TIMEOUT = "timeout"
+ERROR = "error"
+
+
+class RunLog:
+    def __init__(self, run_id=None, path=EVENTS_FILE, **meta):
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.started = time.time()
+        self.emit("run_start", **meta)
+
+    def emit(self, event, **fields):
+        record = {"event": event, "run_id": self.run_id, "ts": time.time()}
+        record.update(fields)
+        line = (json.dumps(record) + "\n").encode("utf-8")
+        # O_APPEND + one write per line keeps concurrent runs from interleaving
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+    def span_start(self, step):
+        self.emit("span_start", step=step)
+        return time.time()
+
+    def span_end(self, step, started, outcome=OK, **fields):
+        ended = time.time()
+        self.emit("span_end", step=step, start=started, end=ended,
+                  duration=ended - started, outcome=outcome, **fields)
+
+    @contextmanager
+    def span(self, step):
+        started = self.span_start(step)
+        try:
+            yield
+        except Exception as e:
+            self.span_end(step, started, ERROR, error=str(e)[:200])
+            raise
+        self.span_end(step, started)
+
+    def end(self, outcome, **fields):
+        self.emit("run_end", outcome=outcome, duration=time.time() - self.started, **fields)
+
+
+def read_events(path=EVENTS_FILE, tail_bytes=TAIL_BYTES):
+    """Events from the end of the log (a partial first line is skipped)"""
+    path = Path(path)
+    if not path.exists():
+        return []
+    with open(path, "rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(size - tail_bytes, 0))
+        data = f.read()
+    lines = data.split(b"\n")
+    if size > tail_bytes:
+        lines = lines[1:]
+    events = []
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            events.append(json.loads(line))
+        except ValueError:
+            continue
+    return events
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(path=EVENTS_FILE, recent=50):
+    """Per-step latency stats over the most recent runs:
+    [{"step", "count", "p50", "p95", "max", "timeouts", "errors"}] in flow order"""
+    events = read_events(path)
+    run_order = []
+    for e in events:
+        if e.get("event") == "run_start":
+            run_order.append(e["run_id"])
+    keep = set(run_order[-recent:])
+
+    steps = {}
+    for e in events:
+        if e.get("event") != "span_end" or e.get("run_id") not in keep:
+            continue
+        s = steps.setdefault(e["step"], {"durations": [], "timeouts": 0, "errors": 0})
+        s["durations"].append(e["duration"])
+        if e.get("outcome") == TIMEOUT:
+            s["timeouts"] += 1
+        elif e.get("outcome") == ERROR:
+            s["errors"] += 1
+
+    summary = []
+    for step, s in steps.items():
+        d = s["durations"]
+        summary.append({
+            "step": step, "count": len(d),
+            "p50": percentile(d, 50), "p95": percentile(d, 95), "max": max(d),
+            "timeouts": s["timeouts"], "errors": s["errors"],
+        })
+    return summary
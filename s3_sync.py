@@ -0,0 +1,269 @@
+"""
+S3 sync of the PDF archive
+Pushes new/changed PDFs to an S3-compatible bucket (AWS, MinIO, ...). A local
+journal remembers what was uploaded, so a repeated sync makes no requests for
+unchanged files. Objects carry their sha256 in metadata: a file whose object
+already has that checksum is skipped, a name whose content is already in the
+bucket is copied server-side (after checking the source object still has it -
+otherwise the stale journal entry is dropped and the file uploaded), and
+everything else is uploaded in parallel (multipart for large files). Needs boto3.
+
+Usage: python s3_sync.py --bucket my-invoices [--prefix linkedin/] [--endpoint-url http://localhost:9000]
+Credentials come from the usual AWS environment/config. Bucket, prefix and
+endpoint default to LIE_S3_BUCKET, LIE_S3_PREFIX and LIE_S3_ENDPOINT.
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+from pdf_index import PdfIndex
+
+ROOT = Path(__file__).parent
+PDF_DIR = ROOT / "pdfs"
+JOURNAL_FILE = ROOT / "sync_journal.sqlite3"
+
+S3_BUCKET = os.environ.get("LIE_S3_BUCKET", "")
+S3_PREFIX = os.environ.get("LIE_S3_PREFIX", "")
+S3_ENDPOINT = os.environ.get("LIE_S3_ENDPOINT") or None
+
+# Files uploaded at once, and parts in flight per multipart upload
+SYNC_WORKERS = 4
+PART_CONCURRENCY = 4
+MULTIPART_THRESHOLD = 8 * 1024 * 1024
+PART_SIZE = 8 * 1024 * 1024
+SHA256_META = "sha256"
+
+UPLOADED = "uploaded"
+COPIED = "copied"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS synced (
+    bucket TEXT NOT NULL,
+    key TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    synced_at REAL NOT NULL,
+    PRIMARY KEY (bucket, key)
+);
+CREATE INDEX IF NOT EXISTS synced_sha256 ON synced (bucket, sha256);
+"""
+
+
+class SyncError(Exception):
+    pass
+
+
+class Journal:
+    """What is known to be in the bucket (bucket, key) -> sha256"""
+
+    def __init__(self, db_path=JOURNAL_FILE):
+        self.db_path = Path(db_path)
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(str(self.db_path), timeout=10)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.row_factory = sqlite3.Row
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def synced(self, bucket):
+        """{key: sha256} for one bucket"""
+        with self._connect() as db:
+            rows = db.execute("SELECT key, sha256 FROM synced WHERE bucket = ?", (bucket,))
+            return {r["key"]: r["sha256"] for r in rows}
+
+    def record(self, bucket, key, sha256, size):
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO synced VALUES (?, ?, ?, ?, ?)",
+                       (bucket, key, sha256, size, time.time()))
+
+    def drop(self, bucket, key):
+        with self._connect() as db:
+            db.execute("DELETE FROM synced WHERE bucket = ? AND key = ?", (bucket, key))
+
+    def forget(self, bucket=None):
+        with self._connect() as db:
+            if bucket is None:
+                db.execute("DELETE FROM synced")
+            else:
+                db.execute("DELETE FROM synced WHERE bucket = ?", (bucket,))
+
+
+def make_client(endpoint_url=S3_ENDPOINT):
+    try:
+        import boto3
+        from botocore.config import Config
+    except ImportError:
+        raise SyncError("S3 sync needs boto3 (pip install boto3)")
+    # One pool connection per concurrent part upload
+    config = Config(max_pool_connections=SYNC_WORKERS * PART_CONCURRENCY, retries={"mode": "standard"})
+    return boto3.client("s3", endpoint_url=endpoint_url, config=config)
+
+
+def object_key(path, pdf_dir=PDF_DIR, prefix=S3_PREFIX):
+    return prefix + Path(path).relative_to(pdf_dir).as_posix()
+
+
+class S3Sync:
+    def __init__(self, bucket=S3_BUCKET, prefix=S3_PREFIX, client=None, endpoint_url=S3_ENDPOINT,
+                 index=None, journal=None, pdf_dir=PDF_DIR, workers=SYNC_WORKERS):
+        if not bucket:
+            raise SyncError("No bucket configured (--bucket or LIE_S3_BUCKET)")
+        self.bucket = bucket
+        self.prefix = prefix
+        self.pdf_dir = Path(pdf_dir)
+        self.index = index or PdfIndex(self.pdf_dir)
+        self.journal = journal or Journal()
+        self.client = client or make_client(endpoint_url)
+        self.workers = workers
+        self._by_sha = {}
+        self._lock = threading.Lock()
+
+    def _transfer_config(self):
+        from boto3.s3.transfer import TransferConfig
+        return TransferConfig(multipart_threshold=MULTIPART_THRESHOLD, multipart_chunksize=PART_SIZE,
+                              max_concurrency=PART_CONCURRENCY)
+
+    def _remote_sha256(self, key):
+        from botocore.exceptions import ClientError
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return head.get("Metadata", {}).get(SHA256_META)
+
+    def _sync_one(self, row, key, config):
+        sha256 = row["sha256"]
+        if self._remote_sha256(key) == sha256:
+            action = SKIPPED
+        else:
+            with self._lock:
+                source = self._by_sha.get(sha256)
+            action = None
+            if source and source != key:
+                action = self._copy(source, key, sha256)
+            if action is None:
+                self.client.upload_file(
+                    row["path"], self.bucket, key, Config=config,
+                    ExtraArgs={"ContentType": "application/pdf", "Metadata": {SHA256_META: sha256}},
+                )
+                action = UPLOADED
+        self.journal.record(self.bucket, key, sha256, row["size"])
+        with self._lock:
+            self._by_sha.setdefault(sha256, key)
+        return action
+
+    def _copy(self, source, key, sha256):
+        """Server-side copy from source if it still holds sha256. Returns COPIED, or
+        None (after forgetting the stale source) if the caller has to upload."""
+        from botocore.exceptions import ClientError
+        try:
+            if self._remote_sha256(source) == sha256:
+                self.client.copy_object(Bucket=self.bucket, Key=key, MetadataDirective="COPY",
+                                        CopySource={"Bucket": self.bucket, "Key": source})
+                return COPIED
+        except ClientError as e:
+            print(f"[S3] Copy from {source} failed ({e}) - uploading {key}")
+        # Deleted or overwritten in the bucket behind the journal's back
+        self.journal.drop(self.bucket, source)
+        with self._lock:
+            if self._by_sha.get(sha256) == source:
+                del self._by_sha[sha256]
+        return None
+
+    def pending(self, account=None):
+        """[(row, key)] for files the journal doesn't have at their current content"""
+        self.index.refresh()
+        synced = self.journal.synced(self.bucket)
+        with self._lock:
+            self._by_sha = {sha: key for key, sha in synced.items()}
+        todo = []
+        for row in self.index.rows():
+            if account and row["account"] != account:
+                continue
+            # A file rewritten in place leaves its folder's mtime alone, so check the file
+            try:
+                st = os.stat(row["path"])
+            except FileNotFoundError:
+                continue
+            if (st.st_size, st.st_mtime) != (row["size"], row["mtime"]):
+                self.index.add(row["path"], row["account"], row["extracted_at"])
+                row = self.index.get(row["path"])
+            key = object_key(row["path"], self.pdf_dir, self.prefix)
+            if synced.get(key) != row["sha256"]:
+                todo.append((row, key))
+        return todo
+
+    def sync(self, account=None, on_file=None):
+        """Push everything pending. on_file(path, key, action, error) is called per file.
+        Returns counts per action plus "bytes" uploaded."""
+        stats = {UPLOADED: 0, COPIED: 0, SKIPPED: 0, FAILED: 0, "bytes": 0}
+        todo = self.pending(account)
+        if not todo:
+            return stats
+        config = self._transfer_config()
+
+        def one(item):
+            row, key = item
+            try:
+                action, error = self._sync_one(row, key, config), None
+            except Exception as e:
+                action, error = FAILED, f"{type(e).__name__}: {e}"
+            with self._lock:
+                stats[action] += 1
+                if action == UPLOADED:
+                    stats["bytes"] += row["size"]
+            if on_file:
+                on_file(row["path"], key, action, error)
+
+        # One name per new content goes first; the other names can then be server-side copies
+        first, rest = [], []
+        seen = set(self._by_sha)
+        for item in todo:
+            (rest if item[0]["sha256"] in seen else first).append(item)
+            seen.add(item[0]["sha256"])
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="s3sync") as pool:
+            list(pool.map(one, first))
+            list(pool.map(one, rest))
+        return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync the PDF archive to an S3-compatible bucket")
+    parser.add_argument("--bucket", default=S3_BUCKET)
+    parser.add_argument("--prefix", default=S3_PREFIX, help="Key prefix, e.g. linkedin/")
+    parser.add_argument("--endpoint-url", default=S3_ENDPOINT, help="For MinIO and other S3-compatible stores")
+    parser.add_argument("--account", help="Only this account")
+    parser.add_argument("--workers", type=int, default=SYNC_WORKERS)
+    parser.add_argument("--dry-run", action="store_true", help="Only list what the journal says is pending")
+    args = parser.parse_args()
+    try:
+        syncer = S3Sync(args.bucket, args.prefix, endpoint_url=args.endpoint_url, workers=args.workers)
+        if args.dry_run:
+            for row, key in syncer.pending(args.account):
+                print(f"{row['path']} -> s3://{args.bucket}/{key}")
+            sys.exit(0)
+        stats = syncer.sync(args.account, on_file=lambda path, key, action, error: print(
+            f"{action:8} s3://{args.bucket}/{key}{f' ({error})' if error else ''}"))
+    except SyncError as e:
+        sys.exit(str(e))
+    print(f"{stats[UPLOADED]} uploaded ({stats['bytes'] / 1024 / 1024:.1f} MB), {stats[COPIED]} copied, "
+          f"{stats[SKIPPED]} already there, {stats[FAILED]} failed")
+    sys.exit(1 if stats[FAILED] else 0)
@@ -0,0 +1,199 @@
+"""
+Extraction job scheduler
+Jobs get IDs, run on a bounded worker pool, and submissions for an account
+that already has a job queued/running are coalesced into that job. Jobs go to
+the warm worker (worker_daemon.py) when one is running, else to a new process.
+Real-browser jobs all drive the same Chrome window, so they run one at a time,
+also across processes (app + CLI); only the fake driver runs jobs in parallel.
+"""
+
+import contextlib
+import fcntl
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import worker_daemon
+from state_store import STATE_FILE, StateStore
+from status_channel import STATUS, STATUS_SOCKET, make_event, send_event
+
+ROOT = Path(__file__).parent
+JOBS_DIR = ROOT / "jobs"
+PDF_DIR = ROOT / "pdfs"
+AUTOMATION_SCRIPT = ROOT / "linkedin_automation.py"
+# Held (flock) by whichever process is driving Chrome
+BROWSER_LOCK = ROOT / ".browser.lock"
+
+# Concurrent extractions (override with LIE_MAX_WORKERS; real-browser jobs are capped at 1)
+MAX_WORKERS = int(os.environ.get("LIE_MAX_WORKERS", "1"))
+DEFAULT_ACCOUNT = "default"
+
+QUEUED = "queued"
+RUNNING = "running"
+FINISHED = "finished"
+FAILED = "failed"
+
+
+def account_slug(account):
+    """Filesystem-safe directory name for an account"""
+    slug = re.sub(r"[^A-Za-z0-9._-]+", "_", (account or "").strip()).strip("._")
+    return slug or DEFAULT_ACCOUNT
+
+
+class Job:
+    def __init__(self, account, fast_mode=False, jobs_dir=JOBS_DIR, pdf_root=PDF_DIR, renderer=None,
+                 incremental=False, invoices=False, state=None):
+        self.job_id = time.strftime("%Y%m%d%H%M%S") + "-" + uuid.uuid4().hex[:6]
+        self.account = account_slug(account)
+        self.fast_mode = fast_mode
+        self.renderer = renderer
+        self.incremental = incremental
+        self.invoices = invoices
+        self.state = QUEUED
+        self.created = time.time()
+        self.finished = None
+        self.returncode = None
+        self.job_dir = Path(jobs_dir) / self.job_id
+        self.pdf_dir = Path(pdf_root) / self.account
+        self.store = state or StateStore()
+
+    @property
+    def signal_file(self):
+        return self.job_dir / "continue_signal.txt"
+
+    @property
+    def log_file(self):
+        return self.job_dir / "output.log"
+
+    @property
+    def active(self):
+        return self.state in (QUEUED, RUNNING)
+
+    def load_status(self):
+        """This job's status record (as written by linkedin_automation.py)"""
+        return self.store.get_status(self.job_id)
+
+    def set_state(self, state):
+        self.state = state
+        self.store.set_state(self.job_id, state)
+
+    def command(self, extra_args=()):
+        cmd = [
+            sys.executable, str(AUTOMATION_SCRIPT),
+            "--job-id", self.job_id,
+            "--job-dir", str(self.job_dir),
+            "--pdf-dir", str(self.pdf_dir),
+            "--state-file", str(self.store.db_path),
+        ]
+        if self.fast_mode:
+            cmd.append("--fast")
+        if self.renderer:
+            cmd += ["--renderer", self.renderer]
+        if self.incremental:
+            cmd.append("--incremental")
+        if self.invoices:
+            cmd.append("--invoices")
+        return cmd + list(extra_args)
+
+
+class JobScheduler:
+    """Runs extraction jobs on a bounded pool of worker threads (one subprocess each)"""
+
+    def __init__(self, max_workers=MAX_WORKERS, jobs_dir=JOBS_DIR, pdf_root=PDF_DIR, extra_args=(),
+                 state_file=STATE_FILE, use_worker=True, browser_lock=BROWSER_LOCK):
+        self.jobs_dir = Path(jobs_dir)
+        # Only the fake driver is isolated per job; Chrome is one shared window
+        self.isolated = "--fake-driver" in extra_args
+        if not self.isolated:
+            max_workers = 1
+        self.browser_lock = Path(browser_lock)
+        self.use_worker = use_worker
+        self.pdf_root = Path(pdf_root)
+        self.extra_args = tuple(extra_args)
+        self.store = StateStore(state_file)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="extract")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._by_account = {}
+
+    def submit(self, account=DEFAULT_ACCOUNT, fast_mode=False, renderer=None, incremental=False,
+               invoices=False):
+        """Queue a job - returns the already active job for this account if there is one"""
+        slug = account_slug(account)
+        with self._lock:
+            current = self._jobs.get(self._by_account.get(slug))
+            if current and current.active:
+                return current
+            job = Job(slug, fast_mode, self.jobs_dir, self.pdf_root, renderer, incremental, invoices,
+                      self.store)
+            job.set_state(QUEUED)
+            job.job_dir.mkdir(parents=True, exist_ok=True)
+            self._jobs[job.job_id] = job
+            self._by_account[slug] = job.job_id
+        self._pool.submit(self._run, job)
+        return job
+
+    @contextlib.contextmanager
+    def _browser(self):
+        """Exclusive use of the browser, waiting for other processes' jobs"""
+        if self.isolated:
+            yield
+            return
+        with open(self.browser_lock, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _run(self, job):
+        with self._browser():
+            self._run_locked(job)
+
+    def _run_locked(self, job):
+        job.set_state(RUNNING)
+        try:
+            cmd = job.command(self.extra_args)
+            returncode = None
+            if self.use_worker:
+                driver = worker_daemon.FAKE if "--fake-driver" in cmd else worker_daemon.APPLESCRIPT
+                returncode = worker_daemon.run_job(cmd[2:], driver)
+            if returncode is None:
+                # Worker output goes to the job's log, not whatever stdout the caller has
+                with open(job.log_file, "ab") as log:
+                    returncode = subprocess.run(cmd, cwd=str(ROOT), stdout=log, stderr=subprocess.STDOUT).returncode
+            job.returncode = returncode
+            status = job.load_status()
+            failed = returncode != 0 or "Error" in status.get("step", "")
+            job.set_state(FAILED if failed else FINISHED)
+        except Exception as e:
+            print(f"[JOB {job.job_id}] {e}")
+            job.set_state(FAILED)
+        job.finished = time.time()
+        # Wake the UI - the job state changed even if the worker's last status didn't
+        status = job.load_status()
+        send_event(STATUS_SOCKET, make_event(
+            STATUS, job_id=job.job_id, step=status["step"], waiting=status["waiting"],
+            button_text=status["button_text"], pdf_path=status["pdf_path"],
+        ))
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def jobs(self, limit=None):
+        """Jobs, newest first"""
+        with self._lock:
+            jobs = sorted(self._jobs.values(), key=lambda j: j.created, reverse=True)
+        return jobs[:limit] if limit else jobs
+
+    def active_jobs(self):
+        return [j for j in self.jobs() if j.active]
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
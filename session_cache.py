@@ -0,0 +1,100 @@
+"""
+Logged-in session cache
+Remembers per account that (and when) a login succeeded, plus the session
+cookies used for direct downloads and who was logged in (their profile URL),
+so a browser since logged in as someone else isn't taken for the account.
+The file is encrypted with Fernet when the `cryptography` package is
+installed; without it only the non-secret part (timestamps, profile) is
+written. Entries expire after SESSION_TTL.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent
+SESSION_FILE = ROOT / ".session_cache"
+KEY_FILE = ROOT / ".session_key"
+
+# LinkedIn sessions last much longer - this just bounds how stale a cache can be
+SESSION_TTL = 7 * 24 * 3600
+
+
+def _fernet(key_file):
+    """Fernet for the local key (created on first use), or None without cryptography"""
+    try:
+        from cryptography.fernet import Fernet
+    except ImportError:
+        return None
+    key = os.environ.get("LIE_SESSION_KEY")
+    if key:
+        return Fernet(key.encode())
+    key_file = Path(key_file)
+    try:
+        fd = os.open(key_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        return Fernet(key_file.read_bytes().strip())
+    key = Fernet.generate_key()
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return Fernet(key)
+
+
+class SessionCache:
+    def __init__(self, path=SESSION_FILE, key_file=KEY_FILE, ttl=SESSION_TTL):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.fernet = _fernet(key_file)
+
+    @property
+    def encrypted(self):
+        return self.fernet is not None
+
+    def _read(self):
+        if not self.path.exists():
+            return {}
+        data = self.path.read_bytes()
+        try:
+            if self.fernet:
+                data = self.fernet.decrypt(data)
+            return json.loads(data)
+        except Exception:
+            # Wrong key, a plaintext file from before cryptography was installed, ...
+            return {}
+
+    def _write(self, sessions):
+        data = json.dumps(sessions).encode("utf-8")
+        if self.fernet:
+            data = self.fernet.encrypt(data)
+        tmp = self.path.with_name(f".{self.path.name}.tmp")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self.path)
+
+    def load(self, account):
+        """Unexpired session for account, or None"""
+        session = self._read().get(account)
+        if not session or session.get("expires_at", 0) <= time.time():
+            return None
+        return session
+
+    def save(self, account, cookies="", profile=None, identity=""):
+        sessions = {k: v for k, v in self._read().items() if v.get("expires_at", 0) > time.time()}
+        now = time.time()
+        session = {"logged_in_at": now, "expires_at": now + self.ttl, "profile": profile,
+                   "identity": identity}
+        if self.fernet and cookies:
+            session["cookies"] = cookies  # never written in the clear
+        sessions[account] = session
+        self._write(sessions)
+        return session
+
+    def clear(self, account=None):
+        if account is None:
+            self.path.unlink(missing_ok=True)
+            return
+        sessions = self._read()
+        if sessions.pop(account, None) is not None:
+            self._write(sessions)
@@ -0,0 +1,216 @@
+"""
+Run state, settings and status history (SQLite, WAL)
+Replaces status.json / user_settings.json: every status update is one
+transaction (current state + a history row), so readers never see a torn
+record, any number of tabs/processes can read concurrently, and each run
+(standalone or scheduled job) has its own row. prune() keeps the history
+bounded: runs untouched for RUN_MAX_AGE are dropped with their history, and
+each run keeps its newest HISTORY_PER_RUN updates.
+"""
+
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+ROOT = Path(__file__).parent
+STATE_FILE = ROOT / "state.sqlite3"
+
+# Run key of linkedin_automation.py started by hand (jobs use their job id)
+MAIN_RUN = "main"
+
+# Finished runs older than this are forgotten; each run keeps this many status updates
+RUN_MAX_AGE = 30 * 24 * 3600
+HISTORY_PER_RUN = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_key TEXT PRIMARY KEY,
+    account TEXT,
+    state TEXT,
+    step TEXT NOT NULL DEFAULT '',
+    waiting INTEGER NOT NULL DEFAULT 0,
+    button_text TEXT NOT NULL DEFAULT '',
+    pdf_path TEXT NOT NULL DEFAULT '',
+    started_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_updated ON runs (updated_at DESC);
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    run_key TEXT NOT NULL,
+    step TEXT NOT NULL,
+    waiting INTEGER NOT NULL,
+    pdf_path TEXT NOT NULL,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_run ON history (run_key, ts);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pins (
+    path TEXT PRIMARY KEY,
+    pinned_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def empty_status():
+    return {"step": "", "waiting": False, "button_text": "", "pdf_path": ""}
+
+
+class StateStore:
+    def __init__(self, db_path=STATE_FILE):
+        self.db_path = Path(db_path)
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(str(self.db_path), timeout=10)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.row_factory = sqlite3.Row
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    @property
+    def files(self):
+        """Files whose mtime changes on every write (for mtime-keyed caches)"""
+        return [self.db_path, self.db_path.with_name(self.db_path.name + "-wal")]
+
+    # Run state
+
+    def set_status(self, run_key, step, waiting=False, button_text="", pdf_path="", account=None):
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO runs (run_key, account, step, waiting, button_text, pdf_path, started_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(run_key) DO UPDATE SET step = excluded.step, waiting = excluded.waiting,"
+                " button_text = excluded.button_text, pdf_path = excluded.pdf_path,"
+                " account = COALESCE(excluded.account, runs.account), updated_at = excluded.updated_at",
+                (run_key, account, step, int(waiting), button_text, pdf_path, now, now),
+            )
+            db.execute("INSERT INTO history (run_key, step, waiting, pdf_path, ts) VALUES (?, ?, ?, ?, ?)",
+                       (run_key, step, int(waiting), pdf_path, now))
+
+    def set_state(self, run_key, state):
+        """Lifecycle state of a scheduled job (queued/running/finished/failed)"""
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO runs (run_key, state, started_at, updated_at) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(run_key) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at",
+                (run_key, state, now, now),
+            )
+
+    def get_status(self, run_key=MAIN_RUN):
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM runs WHERE run_key = ?", (run_key,)).fetchone()
+        if row is None:
+            return empty_status()
+        status = dict(row)
+        status["waiting"] = bool(status["waiting"])
+        return status
+
+    def clear_status(self, run_key=MAIN_RUN):
+        """Forget a run's current state (its history stays)"""
+        with self._connect() as db:
+            db.execute("DELETE FROM runs WHERE run_key = ?", (run_key,))
+
+    def recent_runs(self, limit=10):
+        with self._connect() as db:
+            rows = db.execute("SELECT * FROM runs ORDER BY updated_at DESC LIMIT ?", (limit,))
+            return [dict(r, waiting=bool(r["waiting"])) for r in rows]
+
+    def history(self, run_key, limit=100):
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT step, waiting, pdf_path, ts FROM history WHERE run_key = ? ORDER BY ts DESC LIMIT ?",
+                (run_key, limit),
+            )
+            return [dict(r) for r in rows]
+
+    def prune(self, max_age=RUN_MAX_AGE, per_run=HISTORY_PER_RUN, now=None):
+        """Drop runs (and history) not updated for max_age - except the standalone
+        run's current status - and cap each run's history. Returns rows deleted."""
+        cutoff = (now or time.time()) - max_age
+        with self._connect() as db:
+            deleted = db.execute("DELETE FROM runs WHERE updated_at < ? AND run_key != ?",
+                                 (cutoff, MAIN_RUN)).rowcount
+            deleted += db.execute("DELETE FROM history WHERE ts < ?", (cutoff,)).rowcount
+            deleted += db.execute(
+                "DELETE FROM history WHERE ts < (SELECT h.ts FROM history h WHERE h.run_key = history.run_key"
+                " ORDER BY h.ts DESC LIMIT 1 OFFSET ?)",
+                (per_run - 1,),
+            ).rowcount
+        return deleted
+
+    # Settings
+
+    def get_settings(self):
+        with self._connect() as db:
+            return {k: json.loads(v) for k, v in db.execute("SELECT key, value FROM settings")}
+
+    def update_settings(self, settings):
+        """Write only keys whose value changed. Returns how many were written."""
+        current = self.get_settings()
+        changed = {k: v for k, v in settings.items() if k not in current or current[k] != v}
+        if changed:
+            now = time.time()
+            with self._connect() as db:
+                db.executemany("INSERT OR REPLACE INTO settings VALUES (?, ?, ?)",
+                               [(k, json.dumps(v), now) for k, v in changed.items()])
+        return len(changed)
+
+    # Pinned files (never removed by retention)
+
+    def pin(self, path):
+        with self._connect() as db:
+            db.execute("INSERT OR IGNORE INTO pins VALUES (?, ?)", (str(path), time.time()))
+
+    def unpin(self, path):
+        with self._connect() as db:
+            db.execute("DELETE FROM pins WHERE path = ?", (str(path),))
+
+    def pinned(self):
+        with self._connect() as db:
+            return {r["path"] for r in db.execute("SELECT path FROM pins")}
+
+    # Migration
+
+    def migrate_json(self, status_file=None, settings_file=None):
+        """One-time import of the old status.json / user_settings.json
+        (the files are left alone; later edits to them are ignored)"""
+        with self._connect() as db:
+            if db.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+                return
+        for path, load in ((settings_file, self._import_settings), (status_file, self._import_status)):
+            if not path or not Path(path).exists():
+                continue
+            try:
+                load(json.loads(Path(path).read_text()))
+            except (OSError, ValueError) as e:
+                print(f"[STATE] Could not migrate {path}: {e}")
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO meta VALUES ('json_migrated', ?)", (str(time.time()),))
+
+    def _import_settings(self, data):
+        existing = self.get_settings()
+        self.update_settings({k: v for k, v in data.items() if k not in existing})
+
+    def _import_status(self, data):
+        if data.get("step") and not self.get_status(MAIN_RUN)["step"]:
+            self.set_status(MAIN_RUN, data["step"], data.get("waiting", False),
+                            data.get("button_text", ""), data.get("pdf_path", ""))
@@ -0,0 +1,179 @@
+"""
+Status / signal channel between app.py and linkedin_automation.py
+Events go over local Unix datagram sockets. They only wake the reader: the
+status itself lives in state.sqlite3 (see state_store), and the continue
+signal falls back to continue_signal.txt when sockets aren't available.
+"""
+
+import json
+import os
+import select
+import socket
+import tempfile
+import threading
+import time
+import hashlib
+from pathlib import Path
+
+ROOT = Path(__file__).parent
+
+# Message types
+STATUS = "status"
+SIGNAL = "signal"
+
+
+def _socket_path(name):
+    """Short socket path in the temp dir (AF_UNIX paths are limited to ~100 chars)"""
+    tag = hashlib.md5(str(ROOT.resolve()).encode()).hexdigest()[:8]
+    return Path(tempfile.gettempdir()) / f"lie_{tag}_{name}.sock"
+
+
+STATUS_SOCKET = _socket_path("status")
+SIGNAL_SOCKET = _socket_path("signal")
+# Stream socket of the warm worker daemon (worker_daemon.py)
+WORKER_SOCKET = _socket_path("worker")
+
+
+def signal_socket_path(job_id=None):
+    """Each job gets its own signal socket so a click only reaches that job"""
+    return _socket_path(f"signal_{job_id}") if job_id else SIGNAL_SOCKET
+
+
+def sockets_supported():
+    return hasattr(socket, "AF_UNIX")
+
+
+def make_event(kind, **fields):
+    """Build a typed event: {"type", "ts", ...fields}"""
+    event = {"type": kind, "ts": time.time()}
+    if kind == STATUS:
+        event.update({
+            "step": fields.get("step", ""),
+            "waiting": bool(fields.get("waiting", False)),
+            "button_text": fields.get("button_text", ""),
+            "pdf_path": fields.get("pdf_path", ""),
+        })
+    elif kind == SIGNAL:
+        event["value"] = fields.get("value", "continue")
+    else:
+        raise ValueError(f"Unknown event type: {kind}")
+    if fields.get("job_id"):
+        event["job_id"] = fields["job_id"]
+    return event
+
+
+def parse_event(data):
+    """Decode an event, returns None for anything that isn't a known message"""
+    try:
+        event = json.loads(data.decode("utf-8"))
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(event, dict) or event.get("type") not in (STATUS, SIGNAL):
+        return None
+    return event
+
+
+def send_event(sock_path, event):
+    """Send one event to a listening socket. Returns False if nobody is listening."""
+    if not sockets_supported():
+        return False
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as s:
+            s.sendto(json.dumps(event).encode("utf-8"), str(sock_path))
+        return True
+    except OSError:
+        return False
+
+
+def bind_socket(sock_path):
+    """Bind a datagram socket at sock_path (replacing a stale one)"""
+    if not sockets_supported():
+        return None
+    try:
+        os.unlink(sock_path)
+    except OSError:
+        pass
+    try:
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        s.bind(str(sock_path))
+        return s
+    except OSError:
+        return None
+
+
+class SignalReceiver:
+    """Worker side: waits for the "continue" signal from the app"""
+
+    def __init__(self, signal_file, sock_path=SIGNAL_SOCKET):
+        self.signal_file = Path(signal_file)
+        self.sock_path = sock_path
+        self.sock = bind_socket(sock_path)
+
+    def wait(self, timeout=300, file_poll=1.0):
+        """Block until a signal arrives over the socket or via the signal file"""
+        deadline = time.time() + timeout
+        while True:
+            if self.signal_file.exists():
+                self.signal_file.unlink()
+                return True
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+            wait = min(remaining, file_poll)
+            if self.sock is None:
+                time.sleep(wait)
+                continue
+            ready, _, _ = select.select([self.sock], [], [], wait)
+            if ready:
+                event = parse_event(self.sock.recv(65536))
+                if event and event["type"] == SIGNAL:
+                    return True
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+            try:
+                os.unlink(self.sock_path)
+            except OSError:
+                pass
+
+
+class StatusListener:
+    """App side: one background thread per process receiving status events.
+
+    Sessions call wait_for_change() instead of sleeping, so a page only
+    reruns when the worker actually reported something.
+    """
+
+    def __init__(self, sock_path=STATUS_SOCKET):
+        self.sock_path = sock_path
+        self.sock = bind_socket(sock_path)
+        self.version = 0
+        self.last_event = None
+        self._cond = threading.Condition()
+        if self.sock is not None:
+            threading.Thread(target=self._loop, daemon=True).start()
+
+    @property
+    def active(self):
+        return self.sock is not None
+
+    def _loop(self):
+        while True:
+            try:
+                data = self.sock.recv(65536)
+            except OSError:
+                return
+            event = parse_event(data)
+            if event and event["type"] == STATUS:
+                with self._cond:
+                    self.version += 1
+                    self.last_event = event
+                    self._cond.notify_all()
+
+    def wait_for_change(self, since_version, timeout):
+        """Wait until version moves past since_version. Returns the current version."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.version != since_version, timeout=timeout)
+            return self.version
@@ -0,0 +1,87 @@
+"""
+Readiness-driven step engine
+Each step runs an action, then polls its readiness condition with backoff
+until it's true or the step deadline passes - no fixed sleeps.
+"""
+
+import time
+
+
+class StepTimeout(Exception):
+    """A required step didn't become ready before its deadline"""
+
+    def __init__(self, step):
+        super().__init__(f"Timeout waiting for: {step.name}")
+        self.step = step
+
+
+def wait_until(condition, timeout, initial=0.05, factor=1.5, max_interval=1.0):
+    """Poll condition() with exponential backoff. Returns True as soon as it holds."""
+    deadline = time.monotonic() + timeout
+    interval = initial
+    while True:
+        if condition():
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(interval, remaining))
+        interval = min(interval * factor, max_interval)
+
+
+class Step:
+    """One unit of the flow.
+
+    action   - callable run once when the step starts (optional)
+    ready    - callable polled until it returns True (optional)
+    timeout  - per-step deadline in seconds
+    required - if False, a timeout is logged and the flow carries on
+    status   - text reported via on_status when the step starts
+    """
+
+    def __init__(self, name, action=None, ready=None, timeout=30, required=True, status=None):
+        self.name = name
+        self.action = action
+        self.ready = ready
+        self.timeout = timeout
+        self.required = required
+        self.status = status
+
+
+class StepEngine:
+    """Runs steps in order. With a run_log, each step is recorded as a span."""
+
+    def __init__(self, on_status=None, run_log=None):
+        self.on_status = on_status
+        self.run_log = run_log
+        self.timings = []
+
+    def run_step(self, step):
+        if step.status and self.on_status:
+            self.on_status(step.status)
+        span = self.run_log.span_start(step.name) if self.run_log else None
+        start = time.monotonic()
+        try:
+            if step.action:
+                step.action()
+            ok = True
+            if step.ready:
+                ok = wait_until(step.ready, step.timeout)
+        except Exception as e:
+            if self.run_log:
+                self.run_log.span_end(step.name, span, "error", error=str(e)[:200])
+            raise
+        self.timings.append((step.name, time.monotonic() - start, ok))
+        if self.run_log:
+            self.run_log.span_end(step.name, span, "ok" if ok else "timeout", required=step.required)
+        if not ok:
+            if step.required:
+                raise StepTimeout(step)
+            print(f"[STEP] {step.name}: not ready after {step.timeout}s, continuing")
+        return ok
+
+    def run(self, steps):
+        """Run steps in order. Raises StepTimeout if a required step times out."""
+        for step in steps:
+            self.run_step(step)
+        return self.timings
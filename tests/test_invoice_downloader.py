@@ -0,0 +1,172 @@
+"""invoice_downloader against a local HTTP server serving fixture PDFs"""
+
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import invoice_downloader  # noqa: E402
+from invoice_downloader import (  # noqa: E402
+    MANIFEST_NAME, Downloader, Manifest, download_invoices, filename_for, find_invoice_links,
+)
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+PDF = b"%PDF-1.4\n1 0 obj<</Type/Catalog>>endobj\ntrailer<</Root 1 0 R>>\n%%EOF\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+            server.clients.add(self.client_address)
+            server.cookies.append(self.headers.get("Cookie"))
+            failures = server.fail.get(self.path, 0)
+            if failures:
+                server.fail[self.path] = failures - 1
+        if self.path in server.redirects:
+            self.send_response(302)
+            self.send_header("Location", server.redirects[self.path])
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if failures:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = PDF + self.path.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.clients = set()
+    server.cookies = []
+    server.fail = {}
+    server.redirects = {}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class FindInvoiceLinksTest(unittest.TestCase):
+    def setUp(self):
+        self.html = (FIXTURES / "purchase_history.html").read_text()
+
+    def test_linkedin_invoice_links_in_page_order(self):
+        self.assertEqual(find_invoice_links(self.html), [
+            "https://www.linkedin.com/payments/invoice?invoiceId=INV-1001",
+            "https://www.linkedin.com/payments/receipt/RCPT-1002.pdf",
+            "https://billing.linkedin.com/invoice/INV-1003.pdf?download=1",
+        ])
+
+    def test_other_hosts_are_dropped(self):
+        # A third-party and a lookalike host both carry invoice-looking links
+        links = find_invoice_links(self.html)
+        self.assertFalse([url for url in links if "example" in url])
+        self.assertEqual(find_invoice_links(self.html, domain="payments.example.com"),
+                         ["https://payments.example.com/invoice/INV-9999.pdf"])
+
+    def test_local_names(self):
+        self.assertEqual([filename_for(url) for url in find_invoice_links(self.html)],
+                         ["Invoice_INV-1001.pdf", "Invoice_RCPT-1002.pdf", "Invoice_INV-1003.pdf"])
+
+
+class DownloadInvoicesTest(unittest.TestCase):
+    def setUp(self):
+        self.server = _serve()
+        self.other = _serve()
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dest = Path(self.tmp.name) / "invoices"
+        self._retry_base = invoice_downloader.RETRY_BASE
+        invoice_downloader.RETRY_BASE = 0.01
+
+    def tearDown(self):
+        invoice_downloader.RETRY_BASE = self._retry_base
+        for server in (self.server, self.other):
+            server.shutdown()
+            server.server_close()
+        self.tmp.cleanup()
+
+    def urls(self, n):
+        return [f"{self.base}/invoices/INV-{i}.pdf" for i in range(n)]
+
+    def test_downloads_over_one_keep_alive_connection(self):
+        result = download_invoices(self.urls(5), self.dest, workers=1)
+        self.assertEqual(result, {"downloaded": 5, "skipped": 0, "failed": []})
+        self.assertEqual(len(self.server.clients), 1)
+        self.assertTrue((self.dest / "Invoice_INV-3.pdf").read_bytes().startswith(b"%PDF"))
+
+    def test_retries_transient_errors(self):
+        self.server.fail["/invoices/INV-0.pdf"] = 2
+        result = download_invoices(self.urls(2), self.dest, workers=1)
+        self.assertEqual(result["downloaded"], 2)
+        self.assertEqual(self.server.requests.count("/invoices/INV-0.pdf"), 3)
+        self.assertEqual(Manifest(self.dest / MANIFEST_NAME).entries[self.urls(1)[0]]["attempts"], 3)
+
+    def test_gives_up_after_max_attempts(self):
+        self.server.fail["/invoices/INV-1.pdf"] = 99
+        result = download_invoices(self.urls(2), self.dest, workers=2,
+                                   downloader=Downloader(max_attempts=2))
+        self.assertEqual(result["downloaded"], 1)
+        self.assertEqual([url for url, _ in result["failed"]], [self.urls(2)[1]])
+        self.assertEqual(self.server.requests.count("/invoices/INV-1.pdf"), 2)
+
+    def test_resume_only_fetches_what_is_missing(self):
+        self.server.fail["/invoices/INV-2.pdf"] = 99
+        first = download_invoices(self.urls(4), self.dest, workers=2, downloader=Downloader(max_attempts=1))
+        self.assertEqual((first["downloaded"], len(first["failed"])), (3, 1))
+        self.server.fail.clear()
+        self.server.requests.clear()
+        second = download_invoices(self.urls(4), self.dest, workers=2)
+        self.assertEqual(second, {"downloaded": 1, "skipped": 3, "failed": []})
+        self.assertEqual(self.server.requests, ["/invoices/INV-2.pdf"])
+
+    def test_on_file_error_fails_only_that_file(self):
+        def on_file(path):
+            if path.name == "Invoice_INV-1.pdf":
+                raise OSError("disk full")
+
+        result = download_invoices(self.urls(3), self.dest, workers=2, on_file=on_file)
+        self.assertEqual(result["downloaded"], 2)
+        self.assertEqual(result["failed"], [(self.urls(3)[1], "OSError: disk full")])
+        # Not marked done, so the next run fetches it again
+        self.server.requests.clear()
+        again = download_invoices(self.urls(3), self.dest, workers=2)
+        self.assertEqual(again["downloaded"], 1)
+        self.assertEqual(self.server.requests, ["/invoices/INV-1.pdf"])
+
+    def test_cookies_stay_on_the_cookie_domain(self):
+        # 127.0.0.1 plays linkedin.com; the redirect target ("localhost") is another host
+        other = f"http://localhost:{self.other.server_address[1]}/invoices/INV-9.pdf"
+        self.server.redirects["/r/INV-9.pdf"] = other
+        downloader = Downloader("li_at=SECRET", cookie_domain="127.0.0.1", https_only=False)
+        result = download_invoices([f"{self.base}/r/INV-9.pdf"], self.dest, downloader=downloader)
+        self.assertEqual(result["downloaded"], 1)
+        self.assertEqual(self.server.cookies, ["li_at=SECRET"])
+        self.assertEqual(self.other.requests, ["/invoices/INV-9.pdf"])
+        self.assertEqual(self.other.cookies, [None])
+
+    def test_no_cookies_over_plain_http(self):
+        download_invoices(self.urls(1), self.dest, downloader=Downloader("li_at=SECRET", cookie_domain="127.0.0.1"))
+        self.assertEqual(self.server.cookies, [None])
+
+
+if __name__ == "__main__":
+    unittest.main()
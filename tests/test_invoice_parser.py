@@ -0,0 +1,75 @@
+"""invoice_parser against fixture purchase history text and a small text PDF"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import invoice_parser  # noqa: E402
+from invoice_parser import InvoiceCache, parse_pdfs, parse_records  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+
+class ParseRecordsTest(unittest.TestCase):
+    def setUp(self):
+        self.records = parse_records((FIXTURES / "purchase_history.txt").read_text())
+
+    def test_one_record_per_charged_date(self):
+        self.assertEqual([r["date"] for r in self.records], ["2025-01-15", "2025-02-12", "2025-03-01"])
+
+    def test_fields(self):
+        first, second, third = self.records
+        self.assertEqual((first["invoice_number"], first["product"], first["amount"], first["currency"], first["tax"]),
+                         ("INV-2025-0001", "Premium Business", 59.99, "EUR", 11.40))
+        self.assertEqual((second["invoice_number"], second["amount"], second["currency"], second["tax"]),
+                         ("RCPT-88812", 1234.56, "USD", None))
+        self.assertEqual((third["product"], third["amount"], third["currency"], third["tax"]),
+                         ("Recruiter Lite", 1234.56, "EUR", 234.57))
+
+
+class ParsePdfsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.cache = InvoiceCache(root / "cache.sqlite3")
+        self.broken = root / "broken.pdf"
+        self.broken.write_bytes(b"not a pdf at all")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    @unittest.skipUnless(invoice_parser.have_extractor(), "needs pypdf or pdftotext")
+    def test_parses_fixture_pdf_once(self):
+        pdf = FIXTURES / "invoice.pdf"
+        records = parse_pdfs([pdf], cache=self.cache)
+        self.assertEqual([(r["invoice_number"], r["amount"], r["currency"], r["tax"], r["source"]) for r in records],
+                         [("INV-2025-0001", 59.99, "EUR", 11.40, "invoice.pdf")])
+        with mock.patch.object(invoice_parser, "parse_pdf", side_effect=AssertionError("re-parsed")):
+            self.assertEqual(parse_pdfs([pdf], cache=self.cache), records)
+
+    @unittest.skipUnless(invoice_parser.have_extractor(), "needs pypdf or pdftotext")
+    def test_parse_failures_are_cached(self):
+        self.assertEqual(parse_pdfs([self.broken], cache=self.cache), [])
+        sha = invoice_parser.file_sha256(self.broken)
+        self.assertIn(sha, self.cache.failures([sha]))
+        with mock.patch.object(invoice_parser, "parse_pdf", side_effect=AssertionError("re-parsed")):
+            self.assertEqual(parse_pdfs([self.broken], cache=self.cache), [])
+
+    def test_transient_errors_are_not_cached(self):
+        sha = invoice_parser.file_sha256(self.broken)
+        with mock.patch.object(invoice_parser, "have_extractor", return_value=True), \
+                mock.patch.object(invoice_parser, "parse_pdf", side_effect=OSError("stale NFS handle")):
+            self.assertEqual(parse_pdfs([self.broken], cache=self.cache), [])
+        self.assertEqual(self.cache.get_many([sha]), {})
+        with mock.patch.object(invoice_parser, "have_extractor", return_value=True), \
+                mock.patch.object(invoice_parser, "parse_pdf", return_value=[]) as parse:
+            parse_pdfs([self.broken], cache=self.cache)
+        parse.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
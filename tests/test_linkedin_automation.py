@@ -0,0 +1,69 @@
+"""run_automation end to end against the fake browser driver (no Chrome)"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import linkedin_automation  # noqa: E402
+from browser_driver import FAKE_PDF, FakeDriver  # noqa: E402
+from pdf_index import PdfIndex  # noqa: E402
+
+# Module globals a run reads or configure() sets
+GLOBALS = ["JOB_ID", "SIGNAL_FILE", "PDF_DIR", "PDF_ROOT", "STATE_FILE", "BLOB_DIR", "INDEX_FILE",
+           "RUN_LOG_FILE", "LEDGER_FILE", "SESSION_FILE"]
+
+
+class RunAutomationTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.saved = {name: getattr(linkedin_automation, name) for name in GLOBALS}
+        self.pdf_root = root / "pdfs"
+        self.state_file = root / "state.sqlite3"
+        linkedin_automation.configure("test-job", root / "job", self.pdf_root / "acme", self.state_file)
+        linkedin_automation.PDF_ROOT = self.pdf_root
+        linkedin_automation.BLOB_DIR = self.pdf_root / ".blobs"
+        linkedin_automation.INDEX_FILE = root / "index.sqlite3"
+        linkedin_automation.RUN_LOG_FILE = root / "events.jsonl"
+        linkedin_automation.LEDGER_FILE = root / "ledger.sqlite3"
+        linkedin_automation.SESSION_FILE = root / "session_cache"
+
+    def tearDown(self):
+        linkedin_automation.configure()  # releases the job's signal socket
+        for name, value in self.saved.items():
+            setattr(linkedin_automation, name, value)
+        linkedin_automation._state = None
+        self.tmp.cleanup()
+
+    def test_fast_mode_saves_the_printed_pdf(self):
+        driver = FakeDriver()
+        linkedin_automation.run_automation(fast_mode=True, driver=driver, use_session=False)
+
+        self.assertEqual(driver.calls, ["open_login", "navigate", "open_print_dialog",
+                                        "choose_save_as_pdf", "save_to"])
+        [pdf] = (self.pdf_root / "acme").glob("LinkedIn_Purchases_*.pdf")
+        self.assertEqual(pdf.read_bytes(), FAKE_PDF)
+
+        state = linkedin_automation.get_state()
+        status = state.get_status("test-job")
+        self.assertEqual(status["step"], f"Done! Saved: {pdf.name}")
+        self.assertEqual(status["pdf_path"], str(pdf))
+        steps = [row["step"] for row in reversed(state.history("test-job"))]
+        self.assertEqual(steps, [
+            "Opening LinkedIn in Chrome...",
+            f"⚡ Fast Mode: Waiting up to {linkedin_automation.FAST_LOGIN_TIMEOUT} seconds for login...",
+            "Navigating to purchases page...",
+            "Saving page as PDF...",
+            "Looking for saved PDF...",
+            f"Done! Saved: {pdf.name}",
+        ])
+
+        row = PdfIndex(self.pdf_root, linkedin_automation.INDEX_FILE).get(pdf)
+        self.assertEqual(row["account"], "acme")
+
+
+if __name__ == "__main__":
+    unittest.main()
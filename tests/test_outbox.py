@@ -0,0 +1,172 @@
+"""outbox against a local socket SMTP server"""
+
+import os
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from email.message import EmailMessage
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import outbox  # noqa: E402
+from outbox import FAILED, QUEUED, SENDING, SENT, Outbox, SmtpPool  # noqa: E402
+
+BODY = "First line\n.starts with a dot\nlast line\n"
+
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        self.reply("220 localhost test SMTP")
+        recipients = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip()
+            verb = command[:4].upper()
+            if verb in ("EHLO", "HELO", "RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "MAIL":
+                recipients = []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                address = command.split(":", 1)[1].strip().strip("<>")
+                if address in server.refuse:
+                    self.reply("550 No such user")
+                else:
+                    recipients.append(address)
+                    self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                for line in iter(self.rfile.readline, b""):
+                    if line == b".\r\n":
+                        break
+                    data.append(line[1:] if line.startswith(b".") else line)
+                with server.lock:
+                    server.data_attempts += 1
+                    failures = server.fail
+                    server.fail = max(failures - 1, 0)
+                    if not failures:
+                        server.messages.append((recipients, b"".join(data)))
+                self.reply("451 Try again later" if failures else "250 Queued")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Not implemented")
+
+
+def _serve():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _SmtpHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.messages = []
+    server.data_attempts = 0
+    server.fail = 0
+    server.refuse = set()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class OutboxTest(unittest.TestCase):
+    def setUp(self):
+        self.server = _serve()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name) / "outbox"
+        self._retry_base = outbox.RETRY_BASE
+        outbox.RETRY_BASE = 0.01
+        self.outboxes = []
+
+    def tearDown(self):
+        for box in self.outboxes:
+            box.stop()
+        outbox.RETRY_BASE = self._retry_base
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def outbox(self, **kwargs):
+        pool = SmtpPool("127.0.0.1", self.server.server_address[1], use_tls=False)
+        box = Outbox(pool, self.dir, workers=1, **kwargs)
+        self.outboxes.append(box)
+        return box
+
+    def enqueue(self, box, to="you@example.com"):
+        msg = EmailMessage()
+        msg["From"] = "me@example.com"
+        msg["To"] = to
+        msg["Subject"] = "Invoices"
+        msg.set_content(BODY)
+        return box.enqueue(msg)
+
+    def wait_for(self, box, msg_id, status, timeout=10):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            message = box.status(msg_id)
+            if message["status"] == status:
+                return message
+            time.sleep(0.02)
+        self.fail(f"{msg_id} still {box.status(msg_id)['status']}, expected {status}")
+
+    def test_claim_is_exclusive(self):
+        first, second = self.outbox(start=False), self.outbox(start=False)
+        msg_id = self.enqueue(first)
+        self.assertEqual(first.status(msg_id)["status"], QUEUED)
+        self.assertEqual(first._claim()["id"], msg_id)
+        self.assertIsNone(second._claim())
+        message = second.status(msg_id)
+        self.assertEqual((message["status"], message["claimed_by"]), (SENDING, os.getpid()))
+        # Claimed by a live process within the lease - not taken back
+        second._recover_stale()
+        self.assertEqual(second.status(msg_id)["status"], SENDING)
+
+    def test_sends_and_removes_the_queued_file(self):
+        box = self.outbox()
+        msg_id = self.enqueue(box)
+        eml = Path(box.status(msg_id)["eml_path"])
+        message = self.wait_for(box, msg_id, SENT)
+        self.assertEqual(message["attempts"], 1)
+        self.assertFalse(eml.exists())
+        [(recipients, data)] = self.server.messages
+        self.assertEqual(recipients, ["you@example.com"])
+        self.assertIn(b"\r\n.starts with a dot\r\n", data)
+
+    def test_retries_temporary_failures(self):
+        self.server.fail = 2
+        box = self.outbox()
+        msg_id = self.enqueue(box)
+        message = self.wait_for(box, msg_id, SENT)
+        self.assertEqual(message["attempts"], 3)
+        self.assertEqual(message["last_error"], "")
+        self.assertEqual(self.server.data_attempts, 3)
+        self.assertEqual(len(self.server.messages), 1)
+
+    def test_refused_recipient_fails_without_retry(self):
+        self.server.refuse.add("nobody@example.com")
+        box = self.outbox()
+        msg_id = self.enqueue(box, to="nobody@example.com")
+        message = self.wait_for(box, msg_id, FAILED)
+        self.assertEqual(message["attempts"], 1)
+        self.assertIn("No such user", message["last_error"])
+        self.assertEqual(self.server.data_attempts, 0)
+
+    def test_own_only_leaves_other_messages_alone(self):
+        other = self.outbox(start=False)
+        theirs = self.enqueue(other)
+        box = self.outbox(own_only=True)
+        mine = self.enqueue(box)
+        self.wait_for(box, mine, SENT)
+        self.assertEqual(box.status(theirs)["status"], QUEUED)
+
+
+if __name__ == "__main__":
+    unittest.main()
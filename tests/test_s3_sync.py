@@ -0,0 +1,104 @@
+"""s3_sync against a moto-mocked bucket (skipped without boto3/moto)"""
+
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+try:
+    import boto3
+    from moto import mock_aws
+except ImportError:
+    boto3 = None
+
+from pdf_index import PdfIndex  # noqa: E402
+from s3_sync import COPIED, FAILED, SKIPPED, UPLOADED, Journal, S3Sync  # noqa: E402
+
+BUCKET = "invoice-archive"
+
+
+@unittest.skipIf(boto3 is None, "needs boto3 and moto")
+class S3SyncTest(unittest.TestCase):
+    def setUp(self):
+        for name, value in {"AWS_ACCESS_KEY_ID": "testing", "AWS_SECRET_ACCESS_KEY": "testing",
+                            "AWS_DEFAULT_REGION": "us-east-1"}.items():
+            os.environ.setdefault(name, value)
+        self.mock = mock_aws()
+        self.mock.start()
+        self.client = boto3.client("s3", region_name="us-east-1")
+        self.client.create_bucket(Bucket=BUCKET)
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.pdf_dir = root / "pdfs"
+        (self.pdf_dir / "acme").mkdir(parents=True)
+        self.index = PdfIndex(self.pdf_dir, root / "index.sqlite3")
+        self.journal = Journal(root / "journal.sqlite3")
+
+    def tearDown(self):
+        self.mock.stop()
+        self.tmp.cleanup()
+
+    def write(self, name, data):
+        path = self.pdf_dir / "acme" / name
+        path.write_bytes(b"%PDF-1.4\n" + data)
+        return path
+
+    def sync(self):
+        syncer = S3Sync(BUCKET, "lie/", client=self.client, index=self.index, journal=self.journal,
+                        pdf_dir=self.pdf_dir, workers=2)
+        actions = {}
+        stats = syncer.sync(on_file=lambda path, key, action, error: actions.__setitem__(key, action))
+        return stats, actions
+
+    def body(self, key):
+        return self.client.get_object(Bucket=BUCKET, Key=key)["Body"].read()
+
+    def test_uploads_then_copies_duplicates_then_does_nothing(self):
+        self.write("a.pdf", b"one")
+        self.write("b.pdf", b"one")
+        self.write("c.pdf", b"two")
+        stats, actions = self.sync()
+        self.assertEqual(sorted(actions.values()), [COPIED, UPLOADED, UPLOADED])
+        self.assertEqual((stats[UPLOADED], stats[COPIED], stats[FAILED]), (2, 1, 0))
+        self.assertEqual(self.body("lie/acme/a.pdf"), self.body("lie/acme/b.pdf"))
+        stats, actions = self.sync()
+        self.assertEqual(actions, {})
+
+    def test_skips_objects_already_holding_the_content(self):
+        self.write("a.pdf", b"one")
+        self.sync()
+        self.journal.forget(BUCKET)
+        _, actions = self.sync()
+        self.assertEqual(actions, {"lie/acme/a.pdf": SKIPPED})
+
+    def test_uploads_when_the_copy_source_is_gone(self):
+        self.write("a.pdf", b"one")
+        self.sync()
+        self.client.delete_object(Bucket=BUCKET, Key="lie/acme/a.pdf")
+        self.write("b.pdf", b"one")
+        stats, actions = self.sync()
+        self.assertEqual(actions, {"lie/acme/b.pdf": UPLOADED})
+        self.assertEqual(stats[FAILED], 0)
+        self.assertEqual(self.body("lie/acme/b.pdf"), (self.pdf_dir / "acme" / "b.pdf").read_bytes())
+        # The stale entry is gone, so the deleted object is put back next time (from b's copy)
+        self.assertNotIn("lie/acme/a.pdf", self.journal.synced(BUCKET))
+        _, actions = self.sync()
+        self.assertEqual(actions, {"lie/acme/a.pdf": COPIED})
+        self.assertEqual(self.body("lie/acme/a.pdf"), b"%PDF-1.4\none")
+
+    def test_uploads_when_the_copy_source_was_overwritten(self):
+        self.write("a.pdf", b"one")
+        self.sync()
+        self.client.put_object(Bucket=BUCKET, Key="lie/acme/a.pdf", Body=b"%PDF-1.4\nother",
+                               Metadata={"sha256": "0" * 64})
+        self.write("b.pdf", b"one")
+        _, actions = self.sync()
+        self.assertEqual(actions, {"lie/acme/b.pdf": UPLOADED})
+        self.assertEqual(self.body("lie/acme/b.pdf"), b"%PDF-1.4\none")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+"""state_store pruning of old runs and status history"""
+
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from state_store import MAIN_RUN, StateStore  # noqa: E402
+
+DAY = 24 * 3600
+
+
+class PruneTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = StateStore(Path(self.tmp.name) / "state.sqlite3")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def set_status(self, run_key, step, at):
+        with mock.patch("state_store.time.time", return_value=at):
+            self.store.set_status(run_key, step)
+
+    def test_drops_old_runs_with_their_history(self):
+        now = time.time()
+        self.set_status("old-job", "Done!", now - 40 * DAY)
+        self.set_status(MAIN_RUN, "Done!", now - 40 * DAY)
+        self.set_status("new-job", "Done!", now - DAY)
+        self.store.prune(max_age=30 * DAY, now=now)
+        self.assertEqual({r["run_key"] for r in self.store.recent_runs()}, {MAIN_RUN, "new-job"})
+        self.assertEqual(self.store.history("old-job"), [])
+        self.assertEqual(self.store.history(MAIN_RUN), [])
+        self.assertEqual(self.store.get_status(MAIN_RUN)["step"], "Done!")
+        self.assertEqual(len(self.store.history("new-job")), 1)
+
+    def test_caps_history_per_run(self):
+        now = time.time()
+        for i in range(10):
+            self.set_status(MAIN_RUN, f"step {i}", now - 10 + i)
+        self.set_status("job", "only", now)
+        self.store.prune(per_run=3, now=now)
+        self.assertEqual([r["step"] for r in self.store.history(MAIN_RUN)], ["step 9", "step 8", "step 7"])
+        self.assertEqual([r["step"] for r in self.store.history("job")], ["only"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+"""
+First-page thumbnails for the PDF list
+Rendered once per file content and kept in a small on-disk cache with
+size-bounded LRU eviction. Last access is the file's atime, so the mtime
+(which the app's file cache keys on) only changes when a thumbnail is written.
+"""
+
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent
+THUMB_DIR = ROOT / ".thumb_cache"
+THUMB_CACHE_MAX_BYTES = 20 * 1024 * 1024
+THUMB_WIDTH = 200
+
+
+def _render_pdfium(pdf_path, out_path, width):
+    import pypdfium2 as pdfium
+    pdf = pdfium.PdfDocument(str(pdf_path))
+    try:
+        page = pdf[0]
+        scale = width / page.get_width()
+        page.render(scale=scale).to_pil().save(str(out_path), "PNG")
+    finally:
+        pdf.close()
+
+
+def _render_pdftoppm(pdf_path, out_path, width):
+    with tempfile.TemporaryDirectory() as tmp:
+        prefix = Path(tmp) / "thumb"
+        subprocess.run(
+            ["pdftoppm", "-png", "-f", "1", "-l", "1", "-singlefile",
+             "-scale-to-x", str(width), "-scale-to-y", "-1", str(pdf_path), str(prefix)],
+            check=True, capture_output=True, timeout=30,
+        )
+        shutil.move(str(prefix) + ".png", str(out_path))
+
+
+def render_first_page(pdf_path, out_path, width=THUMB_WIDTH):
+    """Render page 1 to PNG with pypdfium2, falling back to poppler's pdftoppm"""
+    try:
+        _render_pdfium(pdf_path, out_path, width)
+        return True
+    except ImportError:
+        pass
+    if shutil.which("pdftoppm"):
+        _render_pdftoppm(pdf_path, out_path, width)
+        return True
+    return False
+
+
+class ThumbnailCache:
+    def __init__(self, cache_dir=THUMB_DIR, max_bytes=THUMB_CACHE_MAX_BYTES, width=THUMB_WIDTH):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.width = width
+        self._lock = threading.Lock()
+        self._rendered = False
+
+    def _key(self, pdf_path, sha256=None):
+        if sha256:
+            return sha256
+        st = os.stat(pdf_path)
+        return hashlib.sha1(f"{pdf_path}:{st.st_size}:{st.st_mtime_ns}".encode()).hexdigest()
+
+    def get(self, pdf_path, sha256=None):
+        """Path of the cached thumbnail (rendered on first use), None if no renderer.
+        Call evict() once after a batch of gets."""
+        self.cache_dir.mkdir(exist_ok=True)
+        thumb = self.cache_dir / f"{self._key(pdf_path, sha256)}_{self.width}.png"
+        try:
+            st = thumb.stat()
+        except FileNotFoundError:
+            st = None
+        if st is not None:
+            os.utime(thumb, ns=(time.time_ns(), st.st_mtime_ns))  # mark as recently used
+            return thumb
+        tmp = thumb.with_suffix(".tmp")
+        try:
+            if not render_first_page(pdf_path, tmp, self.width):
+                return None
+            os.replace(tmp, thumb)
+        except Exception as e:
+            print(f"[THUMB] Could not render {pdf_path}: {e}")
+            tmp.unlink(missing_ok=True)
+            return None
+        self._rendered = True
+        return thumb
+
+    def evict(self):
+        """Drop least recently used thumbnails until the cache fits max_bytes
+        (only scans the cache if something was rendered since the last call)"""
+        with self._lock:
+            if not self._rendered:
+                return
+            self._rendered = False
+            entries = []
+            total = 0
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.endswith(".png"):
+                    st = entry.stat()
+                    entries.append((st.st_atime, st.st_size, entry.path))
+                    total += st.st_size
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.unlink(path)
+                    total -= size
+                except OSError:
+                    pass
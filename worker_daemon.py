@@ -0,0 +1,250 @@
+"""
+Warm extraction worker
+A long-lived process the scheduler hands jobs to over a local socket instead
+of starting a new interpreter per extraction. It keeps one browser driver (and
+its compiled AppleScripts) alive between runs, launches Chrome up front, and
+runs jobs one at a time on its main thread.
+
+Usage:
+    python worker_daemon.py [--fake-driver]   # start (foreground)
+    python worker_daemon.py --status
+    python worker_daemon.py --stop
+
+Protocol: one JSON object per line over WORKER_SOCKET.
+    {"op": "ping"}                  -> {"ok": true, "pid", "driver", "jobs_run", "queued"}
+    {"op": "run", "argv": [...]}    -> {"ok": true, "accepted": true} then {"ok": true, "returncode": N}
+    {"op": "stop"}                  -> {"ok": true}
+"run" takes linkedin_automation.py's command line; the reply comes when the job ends.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import queue
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+
+from status_channel import WORKER_SOCKET, sockets_supported
+
+APPLESCRIPT = "applescript"
+FAKE = "fake"
+
+# How long clients wait for the daemon to answer a ping / accept a job
+CONNECT_TIMEOUT = 2
+
+
+# Client side (used by the scheduler)
+
+def _request(message, sock_path=WORKER_SOCKET, timeout=CONNECT_TIMEOUT):
+    """Open a connection, send one message. Returns (socket file, first reply)."""
+    s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    s.settimeout(timeout)
+    try:
+        s.connect(str(sock_path))
+        f = s.makefile("rwb")
+        f.write(json.dumps(message).encode("utf-8") + b"\n")
+        f.flush()
+        reply = json.loads(f.readline() or b"null")
+    except (OSError, ValueError):
+        s.close()
+        return None, None
+    return (s, f), reply
+
+
+def ping(sock_path=WORKER_SOCKET):
+    """Daemon info, or None if no daemon is listening"""
+    if not sockets_supported():
+        return None
+    conn, reply = _request({"op": "ping"}, sock_path)
+    if conn:
+        conn[0].close()
+    return reply if reply and reply.get("ok") else None
+
+
+def run_job(argv, driver=APPLESCRIPT, sock_path=WORKER_SOCKET):
+    """Run one extraction in the daemon and wait for it.
+    Returns the job's return code, or None if the daemon can't take it
+    (not running, other driver kind) - the caller then runs it itself."""
+    if not sockets_supported():
+        return None
+    conn, reply = _request({"op": "run", "argv": list(argv), "driver": driver}, sock_path)
+    if not conn:
+        return None
+    s, f = conn
+    try:
+        if not (reply and reply.get("accepted")):
+            return None
+        # Accepted: from here on the job is the daemon's, however long it takes
+        s.settimeout(None)
+        done = json.loads(f.readline() or b"null")
+        return done.get("returncode", 1) if done else 1
+    except (OSError, ValueError):
+        return 1
+    finally:
+        s.close()
+
+
+def stop(sock_path=WORKER_SOCKET):
+    conn, reply = _request({"op": "stop"}, sock_path)
+    if conn:
+        conn[0].close()
+    return bool(reply and reply.get("ok"))
+
+
+# Daemon side
+
+class WorkerDaemon:
+    def __init__(self, driver_name=APPLESCRIPT, sock_path=WORKER_SOCKET):
+        # Import everything a job needs once, up front
+        import linkedin_automation
+        from browser_driver import get_driver
+
+        self.automation = linkedin_automation
+        self.driver_name = driver_name
+        self.driver = get_driver(driver_name)
+        self.sock_path = sock_path
+        self.jobs = queue.Queue()
+        self.jobs_run = 0
+        self._stop = threading.Event()
+        self.server = None
+
+    def bind(self):
+        if ping(self.sock_path):
+            raise RuntimeError(f"A worker is already listening on {self.sock_path}")
+        try:
+            os.unlink(self.sock_path)
+        except OSError:
+            pass
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(str(self.sock_path))
+        self.server.listen()
+        threading.Thread(target=self._accept_loop, name="worker-accept", daemon=True).start()
+
+    def _accept_loop(self):
+        while not self._stop.is_set():
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        with conn, conn.makefile("rwb") as f:
+            def reply(**fields):
+                f.write(json.dumps({"ok": True, **fields}).encode("utf-8") + b"\n")
+                f.flush()
+
+            try:
+                message = json.loads(f.readline() or b"null") or {}
+                op = message.get("op")
+                if op == "ping":
+                    reply(pid=os.getpid(), driver=self.driver_name, jobs_run=self.jobs_run,
+                          queued=self.jobs.qsize())
+                elif op == "run":
+                    if message.get("driver", APPLESCRIPT) != self.driver_name:
+                        reply(ok=False, error=f"worker runs the {self.driver_name} driver")
+                        return
+                    done = queue.Queue(maxsize=1)
+                    self.jobs.put((message["argv"], done))
+                    reply(accepted=True)
+                    reply(returncode=done.get())
+                elif op == "stop":
+                    reply()
+                    self.stop()
+                else:
+                    reply(ok=False, error=f"unknown op {op!r}")
+            except (OSError, ValueError, KeyError) as e:
+                print(f"[WORKER] Bad request: {e}")
+
+    def run_one(self, argv):
+        """Run one job in this process. Returns 0 on success, 1 on failure (like the script)."""
+        la = self.automation
+        try:
+            args = la.parse_args(argv)
+        except SystemExit:
+            print(f"[WORKER] Bad job arguments: {argv}")
+            return 2
+        if not args.job_id:
+            print("[WORKER] Refusing job without --job-id")
+            return 2
+        log_path = os.path.join(args.job_dir, "output.log") if args.job_dir else os.devnull
+        os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+        start = time.monotonic()
+        with open(log_path, "a") as log, contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+            try:
+                la.configure(args.job_id, args.job_dir, args.pdf_dir, args.state_file)
+                la.run_automation(fast_mode=args.fast, driver=self.driver, renderer=args.renderer,
+                                  incremental_mode=args.incremental, invoices=args.invoices,
+                                  use_session=not args.no_session, manual_save=not args.no_manual_save)
+                returncode = 0
+            except Exception as e:
+                traceback.print_exc()
+                la.update_status(f"Error: {e}")
+                returncode = 1
+            finally:
+                la.configure()
+        self.jobs_run += 1
+        print(f"[WORKER] Job {args.job_id} finished in {time.monotonic() - start:.2f}s (rc={returncode})")
+        return returncode
+
+    def serve(self):
+        """Run queued jobs on this (the main) thread until stopped"""
+        self.bind()
+        try:
+            self.driver.warm_up()
+        except Exception as e:
+            print(f"[WORKER] Warm-up failed: {e}")
+        print(f"[WORKER] Ready on {self.sock_path} ({self.driver_name} driver, pid {os.getpid()})")
+        try:
+            while not self._stop.is_set():
+                try:
+                    argv, done = self.jobs.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                try:
+                    returncode = self.run_one(argv)
+                except Exception as e:
+                    print(f"[WORKER] Job failed to start: {e}")
+                    returncode = 1
+                done.put(returncode)
+        finally:
+            self.close()
+
+    def stop(self):
+        self._stop.set()
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+            try:
+                os.unlink(self.sock_path)
+            except OSError:
+                pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep an extraction worker (and the browser) warm")
+    parser.add_argument("--fake-driver", action="store_true", help="Use the scripted fake browser")
+    parser.add_argument("--status", action="store_true", help="Show whether a worker is running")
+    parser.add_argument("--stop", action="store_true", help="Stop the running worker")
+    args = parser.parse_args()
+    if args.status:
+        info = ping()
+        print(json.dumps(info) if info else "No worker running")
+        sys.exit(0 if info else 1)
+    if args.stop:
+        sys.exit(0 if stop() else 1)
+    daemon = WorkerDaemon(FAKE if args.fake_driver else APPLESCRIPT)
+    signal.signal(signal.SIGTERM, lambda *_: daemon.stop())
+    try:
+        daemon.serve()
+    except KeyboardInterrupt:
+        pass
+    except RuntimeError as e:
+        sys.exit(str(e))